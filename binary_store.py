@@ -0,0 +1,382 @@
+"""
+Fixed-width binary telemetry store with a (machine, time) index.
+Records are packed numpy structs grouped by machine and sorted by time, so a
+numpy.memmap reader can slice any machine's time range without parsing.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+# Packed record layout (51 bytes); MachineID and ProductID are small int codes
+RECORD_DTYPE = np.dtype(
+    [
+        ("Timestamp", "<i8"),  # Epoch microseconds (UTC)
+        ("MachineID", "<u2"),
+        ("ProductID", "<u2"),
+        ("ScrewPosition", "u1"),
+        ("TargetTorque", "<f4"),
+        ("ActualTorque", "<f4"),
+        ("TargetAngle", "<i4"),
+        ("ActualAngle", "<i4"),
+        ("PulseCount", "<i4"),
+        ("CycleOK", "?"),
+        ("CycleTime_ms", "<i4"),
+        ("SpindleRotationCounter", "<i4"),
+        ("BitRotationCounter", "<i8"),
+        ("ErrorCode", "u1"),
+    ]
+)
+
+# Fields copied from the telemetry event as-is
+_VALUE_FIELDS = RECORD_DTYPE.names[3:]
+
+# Default time bucket of the sidecar index
+DEFAULT_BUCKET_SECONDS = 3600
+
+TimeLike = Union[datetime, int, None]
+
+
+def index_path(path: Union[str, Path]) -> Path:
+    """
+    Get the sidecar index path for a store file.
+
+    Args:
+        path: Store file (.bin)
+
+    Returns:
+        Index path (<name>.index.json)
+    """
+    path = Path(path)
+    return path.with_name(path.stem + ".index.json")
+
+
+def to_epoch_us(value: TimeLike) -> Optional[int]:
+    """
+    Convert a datetime (or epoch microseconds) to epoch microseconds.
+
+    Args:
+        value: Timezone-aware datetime, epoch microseconds or None
+
+    Returns:
+        Epoch microseconds, or None
+    """
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(round(value.timestamp() * 1_000_000))
+
+
+class BinaryStoreWriter:
+    """
+    Streams telemetry events into a binary store.
+
+    Events must arrive in time order (as the historical generator produces
+    them). Each time bucket is buffered in memory, sorted by machine and
+    appended to a temporary file; close() rewrites the file machine-major and
+    writes the sidecar index.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        bucket_seconds: int = DEFAULT_BUCKET_SECONDS,
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            path: Store file to create (.bin)
+            bucket_seconds: Time bucket of the sidecar index
+        """
+        self.path = Path(path)
+        self.bucket_us = bucket_seconds * 1_000_000
+        self.machine_codes: Dict[str, int] = {}
+        self.product_codes: Dict[str, int] = {}
+        self.records_written = 0
+
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._tmp = open(self._tmp_path, "wb")
+        self._buffer = np.zeros(4096, dtype=RECORD_DTYPE)
+        self._buffered = 0
+        self._bucket: Optional[int] = None
+        # Per machine code: list of (bucket start us, tmp offset, count)
+        self._segments: Dict[int, List[List[int]]] = {}
+        self._last_timestamp = ""
+        self._last_epoch_us = 0
+
+    def __enter__(self) -> "BinaryStoreWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _code(self, codes: Dict[str, int], value: str) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            if code > np.iinfo(np.uint16).max:
+                raise ValueError("Too many distinct machine or product IDs")
+        return code
+
+    def write(self, telemetry: Dict[str, Any]) -> None:
+        """
+        Append one telemetry event.
+
+        Args:
+            telemetry: Telemetry event dictionary from TelemetryGenerator
+
+        Raises:
+            ValueError: If the event belongs to an earlier time bucket
+        """
+        timestamp = telemetry["Timestamp"]
+        if timestamp != self._last_timestamp:
+            # All devices share each timestamp in historical output
+            self._last_timestamp = timestamp
+            self._last_epoch_us = to_epoch_us(datetime.fromisoformat(timestamp))
+        epoch_us = self._last_epoch_us
+
+        bucket = epoch_us - epoch_us % self.bucket_us
+        if bucket != self._bucket:
+            if self._bucket is not None and bucket < self._bucket:
+                raise ValueError("BinaryStoreWriter requires events in time order")
+            self._flush_bucket()
+            self._bucket = bucket
+
+        if self._buffered == len(self._buffer):
+            self._buffer = np.resize(self._buffer, 2 * len(self._buffer))
+        self._buffer[self._buffered] = (
+            epoch_us,
+            self._code(self.machine_codes, telemetry["MachineID"]),
+            self._code(self.product_codes, telemetry["ProductID"]),
+            *[telemetry[name] for name in _VALUE_FIELDS],
+        )
+        self._buffered += 1
+
+    def _flush_bucket(self) -> None:
+        """
+        Sort the buffered bucket by machine and time and append it.
+        """
+        if not self._buffered:
+            return
+        records = self._buffer[: self._buffered]
+        records = records[np.lexsort((records["Timestamp"], records["MachineID"]))]
+
+        machines, starts, counts = np.unique(
+            records["MachineID"], return_index=True, return_counts=True
+        )
+        for machine, start, count in zip(
+            machines.tolist(), starts.tolist(), counts.tolist()
+        ):
+            self._segments.setdefault(machine, []).append(
+                [self._bucket, self.records_written + start, count]
+            )
+
+        self._tmp.write(records.tobytes())
+        self.records_written += self._buffered
+        self._buffered = 0
+
+    def close(self) -> None:
+        """
+        Flush, rewrite machine-major and write the sidecar index.
+        """
+        if self._tmp is None:
+            return
+        self._flush_bucket()
+        self._tmp.close()
+        self._tmp = None
+
+        index_machines = {}
+        with open(self.path, "wb") as out:
+            source = (
+                np.memmap(self._tmp_path, dtype=RECORD_DTYPE, mode="r")
+                if self.records_written
+                else np.zeros(0, dtype=RECORD_DTYPE)
+            )
+            offset = 0
+            codes = sorted(self.machine_codes.items(), key=lambda item: item[1])
+            for machine_id, code in codes:
+                start = offset
+                buckets = []
+                for bucket, tmp_offset, count in self._segments.get(code, []):
+                    buckets.append([bucket, offset - start])
+                    out.write(source[tmp_offset : tmp_offset + count].tobytes())
+                    offset += count
+                index_machines[machine_id] = {
+                    "code": code,
+                    "offset": start,
+                    "count": offset - start,
+                    "buckets": buckets,
+                }
+            del source
+        os.remove(self._tmp_path)
+
+        index = {
+            "version": STORE_VERSION,
+            "dtype": [list(field) for field in RECORD_DTYPE.descr],
+            "records": self.records_written,
+            "bucketSeconds": self.bucket_us // 1_000_000,
+            "machines": index_machines,
+            "products": sorted(self.product_codes, key=self.product_codes.get),
+        }
+        with open(index_path(self.path), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+
+class BinaryStoreReader:
+    """
+    Zero-copy reader for a binary store.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open a store.
+
+        Args:
+            path: Store file (.bin) with its sidecar index next to it
+
+        Raises:
+            ValueError: If the store version or record layout is unsupported
+        """
+        self.path = Path(path)
+        with open(index_path(self.path), "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+
+        if self.index["version"] != STORE_VERSION:
+            raise ValueError(f"Unsupported store version {self.index['version']}")
+        if [tuple(field) for field in self.index["dtype"]] != RECORD_DTYPE.descr:
+            raise ValueError("Store record layout does not match RECORD_DTYPE")
+
+        self.records = (
+            np.memmap(self.path, dtype=RECORD_DTYPE, mode="r")
+            if self.index["records"]
+            else np.zeros(0, dtype=RECORD_DTYPE)
+        )
+        self.machines: Dict[str, Dict[str, Any]] = self.index["machines"]
+        self.machine_ids = sorted(self.machines, key=lambda m: self.machines[m]["code"])
+        self.products: List[str] = self.index["products"]
+        self.bucket_us = self.index["bucketSeconds"] * 1_000_000
+
+    def _bound(self, entry: Dict[str, Any], epoch_us: int) -> int:
+        """
+        Find the first record at or after a time within a machine's range.
+        The bucket index narrows the binary search to one bucket.
+        """
+        buckets = entry["buckets"]
+        starts = [bucket for bucket, _ in buckets]
+        i = np.searchsorted(starts, epoch_us - epoch_us % self.bucket_us)
+        if i >= len(buckets):
+            return entry["count"]
+        if starts[i] != epoch_us - epoch_us % self.bucket_us:
+            # No records in that bucket: the next bucket starts later
+            return buckets[i][1]
+
+        low = buckets[i][1]
+        high = buckets[i + 1][1] if i + 1 < len(buckets) else entry["count"]
+        base = entry["offset"]
+        timestamps = self.records["Timestamp"][base + low : base + high]
+        return low + int(np.searchsorted(timestamps, epoch_us, side="left"))
+
+    def machine(
+        self, machine_id: str, start: TimeLike = None, end: TimeLike = None
+    ) -> np.ndarray:
+        """
+        Get one machine's records in a time range as a zero-copy view.
+
+        Args:
+            machine_id: Machine identifier
+            start: Inclusive start (datetime or epoch microseconds; None: first)
+            end: Exclusive end (datetime or epoch microseconds; None: last)
+
+        Returns:
+            Structured array view (RECORD_DTYPE) backed by the memory map
+
+        Raises:
+            KeyError: If the machine is not in the store
+        """
+        entry = self.machines[machine_id]
+        start_us, end_us = to_epoch_us(start), to_epoch_us(end)
+        low = 0 if start_us is None else self._bound(entry, start_us)
+        high = entry["count"] if end_us is None else self._bound(entry, end_us)
+        base = entry["offset"]
+        return self.records[base + low : base + max(low, high)]
+
+    def to_telemetry(self, records: np.ndarray) -> Iterator[Dict[str, Any]]:
+        """
+        Decode records back into telemetry dictionaries (e.g. for replay).
+
+        Args:
+            records: Records from machine() or the full store
+
+        Yields:
+            Telemetry event dictionaries in the CSV/message schema
+        """
+        names = RECORD_DTYPE.names
+        for row in records.tolist():
+            event = dict(zip(names, row))
+            event["Timestamp"] = datetime.fromtimestamp(
+                event["Timestamp"] / 1_000_000, timezone.utc
+            ).isoformat()
+            event["MachineID"] = self.machine_ids[event["MachineID"]]
+            event["ProductID"] = self.products[event["ProductID"]]
+            event["TargetTorque"] = round(event["TargetTorque"], 2)
+            event["ActualTorque"] = round(event["ActualTorque"], 2)
+            yield event
+
+
+def main():
+    """Command-line entry point: summarize a store or print a slice as CSV."""
+    import argparse
+    import csv
+    import sys
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(description="Inspect a binary telemetry store")
+    parser.add_argument("store", help="Store file (.bin)")
+    parser.add_argument("--machine", help="Print this machine's records as CSV")
+    parser.add_argument("--start", help="Inclusive start (ISO-8601)")
+    parser.add_argument("--end", help="Exclusive end (ISO-8601)")
+    args = parser.parse_args()
+
+    reader = BinaryStoreReader(args.store)
+
+    if not args.machine:
+        logger.info(
+            f"{args.store}: {reader.index['records']:,} records, "
+            f"{len(reader.machines)} machines, {len(reader.products)} products, "
+            f"{reader.index['bucketSeconds']}s buckets"
+        )
+        for machine_id in reader.machine_ids:
+            records = reader.machine(machine_id)
+            if len(records):
+                first, last = records["Timestamp"][0], records["Timestamp"][-1]
+                logger.info(
+                    f"  {machine_id}: {len(records):,} records, "
+                    f"{datetime.fromtimestamp(first / 1e6, timezone.utc).isoformat()}"
+                    f" .. {datetime.fromtimestamp(last / 1e6, timezone.utc).isoformat()}"
+                )
+        return
+
+    start = datetime.fromisoformat(args.start) if args.start else None
+    end = datetime.fromisoformat(args.end) if args.end else None
+    records = reader.machine(args.machine, start, end)
+    writer = csv.DictWriter(sys.stdout, fieldnames=RECORD_DTYPE.names)
+    writer.writeheader()
+    writer.writerows(reader.to_telemetry(records))
+
+
+if __name__ == "__main__":
+    main()
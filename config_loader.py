@@ -11,6 +11,9 @@ from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on NUM_DEVICES for a single simulator host
+MAX_DEVICES = 10000
+
 
 class ConfigLoader:
     """
@@ -18,14 +21,17 @@ class ConfigLoader:
     Tracks .env file modification time and reloads only when changed.
     """
 
-    def __init__(self, env_file: str = ".env"):
+    def __init__(self, env_file: str = ".env", validate_transport: bool = True):
         """
         Initialize the configuration loader.
 
         Args:
             env_file: Path to the .env file (default: ".env")
+            validate_transport: Require the IoT Hub settings (hostname, device
+                keys). Offline tools pass False so they run without secrets.
         """
         self.env_file = Path(env_file)
+        self.validate_transport = validate_transport
         self.last_mtime: Optional[float] = None
         self.config: Dict[str, Any] = {}
         self.load_config()
@@ -46,16 +52,52 @@ class ConfigLoader:
                 self.last_mtime = self.env_file.stat().st_mtime
 
             # Parse and validate configuration
+            num_devices = int(os.getenv("NUM_DEVICES", "10"))
+            shared_access_key = os.getenv("IOTHUB_SHARED_ACCESS_KEY", "")
+            iothub_hostname = os.getenv("IOTHUB_HOSTNAME", "")
             new_config = {
                 # IoT Hub configuration
-                "iothub_hostname": os.getenv("IOTHUB_HOSTNAME", ""),
+                "iothub_hostname": iothub_hostname,
+                # Hubs the fleet is sharded across (default: IOTHUB_HOSTNAME)
+                "iothub_hostnames": [
+                    value.strip()
+                    for value in os.getenv(
+                        "IOTHUB_HOSTNAMES", iothub_hostname
+                    ).split(",")
+                    if value.strip()
+                ],
+                "iothub_max_devices_per_hub": int(
+                    os.getenv("IOTHUB_MAX_DEVICES_PER_HUB", "0")
+                ),
                 "device_id_prefix": os.getenv("DEVICE_ID_PREFIX", "screw-robot"),
-                "num_devices": int(os.getenv("NUM_DEVICES", "10")),
-                # Device keys (individual keys per device)
+                "num_devices": num_devices,
+                # Device keys (individual keys per device, falling back to
+                # the shared access key for large fleets)
                 "device_keys": [
-                    os.getenv(f"DEVICE_KEY_{i}", "")
-                    for i in range(1, 11)
+                    os.getenv(f"DEVICE_KEY_{i}", "") or shared_access_key
+                    for i in range(1, max(num_devices, 10) + 1)
                 ],
+                # Fleet startup pacing
+                "startup_connect_rate": float(
+                    os.getenv("STARTUP_CONNECT_RATE", "20")
+                ),
+                "startup_max_inflight": int(os.getenv("STARTUP_MAX_INFLIGHT", "50")),
+                # Reconnect coordination
+                "reconnect_base_seconds": float(
+                    os.getenv("RECONNECT_BASE_SECONDS", "1")
+                ),
+                "reconnect_max_seconds": float(
+                    os.getenv("RECONNECT_MAX_SECONDS", "60")
+                ),
+                "reconnect_max_concurrent": int(
+                    os.getenv("RECONNECT_MAX_CONCURRENT", "20")
+                ),
+                "circuit_breaker_failure_threshold": int(
+                    os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5")
+                ),
+                "circuit_breaker_reset_seconds": float(
+                    os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30")
+                ),
                 # Simulation parameters
                 "screwing_interval_seconds": int(
                     os.getenv("SCREWING_INTERVAL_SECONDS", "60")
@@ -78,8 +120,100 @@ class ConfigLoader:
                 # Degradation simulation
                 "enable_degradation": os.getenv("ENABLE_DEGRADATION", "false").lower()
                 == "true",
+                "initial_operational_hours": float(
+                    os.getenv("INITIAL_OPERATIONAL_HOURS", "0")
+                ),
+                # Bit replacement (0 rotations: the bit is never replaced)
+                "bit_lifetime_rotations": int(
+                    os.getenv("BIT_LIFETIME_ROTATIONS", "100000")
+                ),
+                "bit_lifetime_noise_percent": float(
+                    os.getenv("BIT_LIFETIME_NOISE_PERCENT", "10")
+                ),
+                # Scenario file (compiled once at startup)
+                "scenario_file": os.getenv("SCENARIO_FILE", "").strip(),
+                # Machine snapshots (sample_screw_machine_data.csv format)
+                "snapshot_file": os.getenv("SNAPSHOT_FILE", "").strip(),
+                "snapshot_interval_seconds": float(
+                    os.getenv("SNAPSHOT_INTERVAL_SECONDS", "60")
+                ),
+                # Per-machine rollup tables of generated events (empty: off)
+                "rollup_dir": os.getenv("ROLLUP_DIR", "").strip(),
+                "rollup_resolutions": [
+                    value.strip().lower()
+                    for value in os.getenv(
+                        "ROLLUP_RESOLUTIONS", "minute,hour,day"
+                    ).split(",")
+                    if value.strip()
+                ],
+                # Cache of generated historical datasets (empty: off)
+                "dataset_cache_dir": os.getenv("DATASET_CACHE_DIR", "").strip(),
+                "dataset_cache_max_mb": float(
+                    os.getenv("DATASET_CACHE_MAX_MB", "10240")
+                ),
+                # CA certificate trusted for the IoT Hub TLS connection, e.g.
+                # for the local ingest_server.py stand-in (empty: system CAs)
+                "iothub_ca_cert": os.getenv("IOTHUB_CA_CERT", "").strip(),
+                # Local query API over recently sent telemetry
+                "query_api_host": os.getenv("QUERY_API_HOST", "127.0.0.1"),
+                "query_api_port": int(os.getenv("QUERY_API_PORT", "0")),
+                "telemetry_buffer_size": int(
+                    os.getenv("TELEMETRY_BUFFER_SIZE", "1000")
+                ),
+                # Reporting policy (all events, report-by-exception or
+                # per-window summaries)
+                "reporting_mode": os.getenv("REPORTING_MODE", "all").lower(),
+                "report_deadband_torque": float(
+                    os.getenv("REPORT_DEADBAND_TORQUE", "1.0")
+                ),
+                "report_deadband_angle": float(
+                    os.getenv("REPORT_DEADBAND_ANGLE", "30")
+                ),
+                "report_deadband_cycle_time_ms": float(
+                    os.getenv("REPORT_DEADBAND_CYCLE_TIME_MS", "1000")
+                ),
+                "report_heartbeat_seconds": float(
+                    os.getenv("REPORT_HEARTBEAT_SECONDS", "300")
+                ),
+                "report_window_seconds": float(
+                    os.getenv("REPORT_WINDOW_SECONDS", "60")
+                ),
+                "report_bit_rotation_thresholds": sorted(
+                    int(value)
+                    for value in os.getenv(
+                        "REPORT_BIT_ROTATION_THRESHOLDS", "80000,100000"
+                    ).split(",")
+                    if value.strip()
+                ),
+                # Store-and-forward spool for unsent telemetry (empty: off)
+                "spool_dir": os.getenv("SPOOL_DIR", "").strip(),
+                "spool_segment_mb": float(os.getenv("SPOOL_SEGMENT_MB", "16")),
+                "spool_max_mb": float(os.getenv("SPOOL_MAX_MB", "1024")),
+                "spool_fsync_interval_seconds": float(
+                    os.getenv("SPOOL_FSYNC_INTERVAL_SECONDS", "1")
+                ),
+                "spool_drain_rate": float(os.getenv("SPOOL_DRAIN_RATE", "200")),
+                # Send attempts per message and scripted network impairment
+                # (empty IMPAIRMENT_FILE: off)
+                "send_max_retries": int(os.getenv("SEND_MAX_RETRIES", "3")),
+                "impairment_file": os.getenv("IMPAIRMENT_FILE", "").strip(),
+                "impairment_report_file": os.getenv(
+                    "IMPAIRMENT_REPORT_FILE", ""
+                ).strip(),
+                # Runtime control API (0 disables it) and .env polling
+                "control_api_host": os.getenv("CONTROL_API_HOST", "127.0.0.1"),
+                "control_api_port": int(os.getenv("CONTROL_API_PORT", "0")),
+                "config_hot_reload": os.getenv("CONFIG_HOT_RELOAD", "true").lower()
+                == "true",
                 # Logging
                 "log_level": os.getenv("LOG_LEVEL", "INFO").upper(),
+                "log_mode": os.getenv("LOG_MODE", "standard").lower(),
+                "log_summary_interval_seconds": float(
+                    os.getenv("LOG_SUMMARY_INTERVAL_SECONDS", "60")
+                ),
+                "log_event_sample_rate": float(
+                    os.getenv("LOG_EVENT_SAMPLE_RATE", "0.0")
+                ),
             }
 
             # Validate configuration
@@ -124,7 +258,8 @@ class ConfigLoader:
             # Check if file has been modified
             if self.last_mtime is None or current_mtime > self.last_mtime:
                 logger.debug(
-                    f"Configuration file changed (mtime: {current_mtime}), reloading..."
+                    "Configuration file changed (mtime: %s), reloading...",
+                    current_mtime,
                 )
                 self.load_config()
                 return True
@@ -145,6 +280,39 @@ class ConfigLoader:
         """
         return self.config
 
+    def with_overrides(self, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get the current configuration with per-device overrides applied.
+
+        Args:
+            overrides: Configuration keys and values replacing the .env values
+
+        Returns:
+            Merged configuration dictionary
+
+        Raises:
+            ValueError: If the merged configuration is invalid
+        """
+        merged = {**self.config, **overrides}
+        self._validate_config(merged)
+        return merged
+
+    def device_key(self, index: int) -> str:
+        """
+        Get the access key for a device, including devices beyond NUM_DEVICES.
+
+        Args:
+            index: Zero-based device index
+
+        Returns:
+            DEVICE_KEY_<n>, falling back to IOTHUB_SHARED_ACCESS_KEY (may be empty)
+        """
+        if index < len(self.config["device_keys"]):
+            return self.config["device_keys"][index]
+        return os.getenv(f"DEVICE_KEY_{index + 1}", "") or os.getenv(
+            "IOTHUB_SHARED_ACCESS_KEY", ""
+        )
+
     def _validate_config(self, config: Dict[str, Any]) -> None:
         """
         Validate configuration values.
@@ -156,8 +324,8 @@ class ConfigLoader:
             ValueError: If configuration is invalid
         """
         # Validate number of devices
-        if not 1 <= config["num_devices"] <= 10:
-            raise ValueError("NUM_DEVICES must be between 1 and 10")
+        if not 1 <= config["num_devices"] <= MAX_DEVICES:
+            raise ValueError(f"NUM_DEVICES must be between 1 and {MAX_DEVICES}")
 
         # Validate intervals
         if config["screwing_interval_seconds"] <= 0:
@@ -170,20 +338,126 @@ class ConfigLoader:
         if not 0.0 <= config["anomaly_rate"] <= 1.0:
             raise ValueError("ANOMALY_RATE must be between 0.0 and 1.0")
 
+        # Validate startup pacing
+        if config["startup_connect_rate"] <= 0:
+            raise ValueError("STARTUP_CONNECT_RATE must be positive")
+
+        if config["startup_max_inflight"] < 1:
+            raise ValueError("STARTUP_MAX_INFLIGHT must be at least 1")
+
+        # Validate reconnect coordination
+        if not 0 < config["reconnect_base_seconds"] <= config["reconnect_max_seconds"]:
+            raise ValueError(
+                "RECONNECT_BASE_SECONDS must be positive and not exceed "
+                "RECONNECT_MAX_SECONDS"
+            )
+
+        if config["reconnect_max_concurrent"] < 1:
+            raise ValueError("RECONNECT_MAX_CONCURRENT must be at least 1")
+
+        if config["circuit_breaker_failure_threshold"] < 1:
+            raise ValueError("CIRCUIT_BREAKER_FAILURE_THRESHOLD must be at least 1")
+
+        if config["circuit_breaker_reset_seconds"] <= 0:
+            raise ValueError("CIRCUIT_BREAKER_RESET_SECONDS must be positive")
+
+        # Validate initial wear
+        if config["initial_operational_hours"] < 0:
+            raise ValueError("INITIAL_OPERATIONAL_HOURS must be non-negative")
+
+        # Validate bit lifetime
+        if config["bit_lifetime_rotations"] < 0:
+            raise ValueError("BIT_LIFETIME_ROTATIONS must be non-negative")
+
+        if not 0 <= config["bit_lifetime_noise_percent"] < 100:
+            raise ValueError("BIT_LIFETIME_NOISE_PERCENT must be between 0 and 100")
+
+        # Validate scenario file
+        if config["scenario_file"] and not Path(config["scenario_file"]).is_file():
+            raise ValueError(f"SCENARIO_FILE not found: {config['scenario_file']}")
+
+        # Validate snapshot interval
+        if config["snapshot_interval_seconds"] <= 0:
+            raise ValueError("SNAPSHOT_INTERVAL_SECONDS must be positive")
+
+        # Validate rollup resolutions
+        valid_rollup_resolutions = ["minute", "hour", "day"]
+        if not config["rollup_resolutions"] or any(
+            value not in valid_rollup_resolutions
+            for value in config["rollup_resolutions"]
+        ):
+            raise ValueError(
+                f"ROLLUP_RESOLUTIONS must be a comma-separated subset of "
+                f"{valid_rollup_resolutions}"
+            )
+
+        # Validate dataset cache size
+        if config["dataset_cache_max_mb"] <= 0:
+            raise ValueError("DATASET_CACHE_MAX_MB must be positive")
+
+        # Validate CA certificate
+        if config["iothub_ca_cert"] and not Path(config["iothub_ca_cert"]).is_file():
+            raise ValueError(f"IOTHUB_CA_CERT not found: {config['iothub_ca_cert']}")
+
+        # Validate query API
+        if not 0 <= config["query_api_port"] <= 65535:
+            raise ValueError("QUERY_API_PORT must be between 0 and 65535")
+
+        if config["telemetry_buffer_size"] < 1:
+            raise ValueError("TELEMETRY_BUFFER_SIZE must be at least 1")
+
+        # Validate spool
+        if config["spool_segment_mb"] <= 0:
+            raise ValueError("SPOOL_SEGMENT_MB must be positive")
+
+        if config["spool_max_mb"] < config["spool_segment_mb"]:
+            raise ValueError("SPOOL_MAX_MB must be at least SPOOL_SEGMENT_MB")
+
+        if config["spool_fsync_interval_seconds"] <= 0:
+            raise ValueError("SPOOL_FSYNC_INTERVAL_SECONDS must be positive")
+
+        if config["spool_drain_rate"] <= 0:
+            raise ValueError("SPOOL_DRAIN_RATE must be positive")
+
+        # Validate send retries and network impairment
+        if config["send_max_retries"] < 1:
+            raise ValueError("SEND_MAX_RETRIES must be at least 1")
+
+        if config["impairment_file"] and not Path(config["impairment_file"]).is_file():
+            raise ValueError(f"IMPAIRMENT_FILE not found: {config['impairment_file']}")
+
+        # Validate control API
+        if not 0 <= config["control_api_port"] <= 65535:
+            raise ValueError("CONTROL_API_PORT must be between 0 and 65535")
+
+        # Validate reporting policy
+        valid_reporting_modes = ["all", "deadband", "window"]
+        if config["reporting_mode"] not in valid_reporting_modes:
+            raise ValueError(
+                f"REPORTING_MODE must be one of {valid_reporting_modes}, "
+                f"got {config['reporting_mode']}"
+            )
+
+        for key in (
+            "report_deadband_torque",
+            "report_deadband_angle",
+            "report_deadband_cycle_time_ms",
+        ):
+            if config[key] < 0:
+                raise ValueError(f"{key.upper()} must be non-negative")
+
+        if config["report_heartbeat_seconds"] <= 0:
+            raise ValueError("REPORT_HEARTBEAT_SECONDS must be positive")
+
+        if config["report_window_seconds"] <= 0:
+            raise ValueError("REPORT_WINDOW_SECONDS must be positive")
+
         # Validate speed
         if config["constant_speed_rpm"] <= 0:
             raise ValueError("CONSTANT_SPEED_RPM must be positive")
 
-        # Validate IoT Hub configuration
-        if not config["iothub_hostname"]:
-            raise ValueError("IOTHUB_HOSTNAME is required")
-        
-        # Validate device keys for active devices
-        for i in range(config["num_devices"]):
-            if not config["device_keys"][i]:
-                raise ValueError(
-                    f"Missing device key for device {i + 1} (DEVICE_KEY_{i + 1})"
-                )
+        if self.validate_transport:
+            self._validate_transport(config)
 
         # Validate log level
         valid_log_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
@@ -192,6 +466,54 @@ class ConfigLoader:
                 f"LOG_LEVEL must be one of {valid_log_levels}, got {config['log_level']}"
             )
 
+        # Validate logging mode
+        valid_log_modes = ["standard", "fast"]
+        if config["log_mode"] not in valid_log_modes:
+            raise ValueError(
+                f"LOG_MODE must be one of {valid_log_modes}, got {config['log_mode']}"
+            )
+
+        if config["log_summary_interval_seconds"] <= 0:
+            raise ValueError("LOG_SUMMARY_INTERVAL_SECONDS must be positive")
+
+        if not 0.0 <= config["log_event_sample_rate"] <= 1.0:
+            raise ValueError("LOG_EVENT_SAMPLE_RATE must be between 0.0 and 1.0")
+
+    def _validate_transport(self, config: Dict[str, Any]) -> None:
+        """
+        Validate the IoT Hub connection settings.
+
+        Args:
+            config: Configuration dictionary to validate
+
+        Raises:
+            ValueError: If a hostname or device key is missing or invalid
+        """
+        if not config["iothub_hostnames"]:
+            raise ValueError("IOTHUB_HOSTNAME or IOTHUB_HOSTNAMES is required")
+
+        hub_count = len(config["iothub_hostnames"])
+        if len(set(config["iothub_hostnames"])) != hub_count:
+            raise ValueError("IOTHUB_HOSTNAMES must not contain duplicates")
+
+        max_per_hub = config["iothub_max_devices_per_hub"]
+        if max_per_hub < 0:
+            raise ValueError("IOTHUB_MAX_DEVICES_PER_HUB must be non-negative")
+
+        if max_per_hub and max_per_hub * hub_count < config["num_devices"]:
+            raise ValueError(
+                f"IOTHUB_MAX_DEVICES_PER_HUB is too low for NUM_DEVICES across "
+                f"{hub_count} hubs"
+            )
+
+        # Validate device keys for active devices
+        for i in range(config["num_devices"]):
+            if not config["device_keys"][i]:
+                raise ValueError(
+                    f"Missing device key for device {i + 1} "
+                    f"(DEVICE_KEY_{i + 1} or IOTHUB_SHARED_ACCESS_KEY)"
+                )
+
     def _log_config_changes(
         self, old_config: Dict[str, Any], new_config: Dict[str, Any]
     ) -> None:
@@ -205,7 +527,7 @@ class ConfigLoader:
         changes = []
 
         # Check for changed values (excluding sensitive data for security)
-        sensitive_keys = ["device_keys", "iothub_hostname"]
+        sensitive_keys = ["device_keys", "iothub_hostname", "iothub_hostnames"]
         for key in new_config:
             if key in sensitive_keys:
                 continue  # Don't log sensitive data
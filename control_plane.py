@@ -0,0 +1,341 @@
+"""
+Runtime control API for the live simulator.
+Pushes per-device or per-group overrides (rate, anomaly rate, degradation,
+reporting mode), pause/resume and live device add/remove into the running
+simulators over local HTTP, touching only the devices that change.
+"""
+
+import asyncio
+import logging
+from fnmatch import fnmatch
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from config_loader import MAX_DEVICES, ConfigLoader
+from device_simulator import DeviceSimulator
+from hub_ring import HubRing
+from local_http import LocalHttpServer
+
+logger = logging.getLogger(__name__)
+
+# Configuration keys a device can override, with their value types
+OVERRIDABLE_KEYS: Dict[str, type] = {
+    "screwing_interval_seconds": float,
+    "interval_jitter_seconds": float,
+    "anomaly_rate": float,
+    "enable_degradation": bool,
+    "reporting_mode": str,
+}
+
+# Most devices added by one request
+MAX_ADD_PER_REQUEST = 1000
+
+
+class ControlPlane:
+    """
+    Applies control requests to the simulators of one process.
+
+    The simulator list is shared with the caller and updated in place when
+    devices are added or removed; every started device's task is tracked so
+    the caller can wait for the whole (changing) fleet with join().
+    """
+
+    def __init__(
+        self,
+        config_loader: ConfigLoader,
+        simulators: List[DeviceSimulator],
+        device_indices: Iterable[int],
+        create_devices: Callable[[List[int]], List[DeviceSimulator]],
+        start_devices: Callable[[List[DeviceSimulator]], Awaitable[List[asyncio.Task]]],
+        worker_index: int = 0,
+        num_workers: int = 1,
+        hub_ring: Optional[HubRing] = None,
+    ):
+        """
+        Initialize the control plane.
+
+        Args:
+            config_loader: Shared configuration loader instance
+            simulators: Running simulators (updated in place)
+            device_indices: Zero-based indices of the initial devices
+            create_devices: Creates simulators for device indices
+            start_devices: Connects simulators and returns their run tasks
+            worker_index: Index of this fleet worker (devices added here use
+                indices assigned to it round-robin)
+            num_workers: Number of fleet workers
+            hub_ring: Hub assignment that removed devices are released from
+        """
+        self.config_loader = config_loader
+        self.simulators = simulators
+        self.devices: Dict[str, DeviceSimulator] = {s.device_id: s for s in simulators}
+        self.indices: Dict[str, int] = dict(
+            zip((s.device_id for s in simulators), device_indices)
+        )
+        self.create_devices = create_devices
+        self.start_devices = start_devices
+        self.worker_index = worker_index
+        self.num_workers = num_workers
+        self.hub_ring = hub_ring
+        self.tasks: Set[asyncio.Task] = set()
+        self._background: Set[asyncio.Task] = set()
+
+    def track(self, tasks: Iterable[asyncio.Task]) -> None:
+        """
+        Track simulator run tasks so join() waits for them.
+
+        Args:
+            tasks: Tasks returned by start_simulators()
+        """
+        self.tasks.update(tasks)
+
+    async def join(self) -> None:
+        """
+        Wait until every tracked device task has finished, including devices
+        added while waiting.
+        """
+        while self.tasks:
+            done, _ = await asyncio.wait(self.tasks)
+            self.tasks -= done
+
+    def add_routes(self, server: LocalHttpServer) -> None:
+        """
+        Register the control endpoints on a local HTTP server.
+
+        GET    /control/devices?match=glob     device states (optionally filtered)
+        PATCH  /control/devices?match=glob     update all matching devices
+        GET    /control/devices/{id}           one device's state
+        PATCH  /control/devices/{id}           update one device
+        POST   /control/devices                add devices: {"count": n}
+        DELETE /control/devices/{id}           stop and remove a device
+        POST   /control/reload                 reload .env now
+
+        PATCH bodies hold override keys (null clears an override) and/or
+        "paused": true/false.
+
+        Args:
+            server: Server to register the routes on
+        """
+        device = r"/control/devices/(?P<device_id>[^/]+)"
+        server.route("GET", r"/control/devices", self._handle_list)
+        server.route("PATCH", r"/control/devices", self._handle_update_group)
+        server.route("POST", r"/control/devices", self._handle_add)
+        server.route("GET", device, self._handle_get)
+        server.route("PATCH", device, self._handle_update_device)
+        server.route("DELETE", device, self._handle_remove)
+        server.route("POST", r"/control/reload", self._handle_reload)
+
+    def _device(self, device_id: str) -> DeviceSimulator:
+        simulator = self.devices.get(device_id)
+        if simulator is None:
+            raise KeyError(f"Unknown device: {device_id}")
+        return simulator
+
+    def _matching(self, params: Dict[str, str]) -> List[DeviceSimulator]:
+        pattern = params.get("match", "*")
+        return [
+            self.devices[device_id]
+            for device_id in sorted(self.devices)
+            if fnmatch(device_id, pattern)
+        ]
+
+    @staticmethod
+    def state(simulator: DeviceSimulator) -> Dict[str, Any]:
+        """
+        Get the control state of a device.
+
+        Args:
+            simulator: Device simulator
+
+        Returns:
+            Dictionary with hub, run state, overrides and message count
+        """
+        return {
+            "MachineID": simulator.device_id,
+            "hub": simulator.hostname,
+            "running": simulator.running,
+            "paused": simulator.paused,
+            "overrides": dict(simulator.overrides),
+            "messagesSent": simulator.messages_sent,
+            "reportingMode": simulator.reporting_policy.mode,
+        }
+
+    def parse_update(self, body: Any) -> Dict[str, Any]:
+        """
+        Validate an update request body.
+
+        Args:
+            body: Decoded JSON object
+
+        Returns:
+            Dictionary of override changes (None clears) plus optional "paused"
+
+        Raises:
+            ValueError: If the body or a value is invalid
+        """
+        if not isinstance(body, dict) or not body:
+            raise ValueError("Body must be a non-empty JSON object")
+
+        update: Dict[str, Any] = {}
+        for key, value in body.items():
+            if key == "paused":
+                if not isinstance(value, bool):
+                    raise ValueError("paused must be true or false")
+            elif key not in OVERRIDABLE_KEYS:
+                raise ValueError(
+                    f"Unknown key {key!r} (allowed: paused, "
+                    f"{', '.join(OVERRIDABLE_KEYS)})"
+                )
+            elif value is not None:
+                value_type = OVERRIDABLE_KEYS[key]
+                if value_type is bool:
+                    if not isinstance(value, bool):
+                        raise ValueError(f"{key} must be true or false")
+                elif value_type is str:
+                    value = str(value).lower()
+                elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise ValueError(f"{key} must be a number")
+                else:
+                    value = value_type(value)
+            update[key] = value
+
+        # Check the new values against the same rules as .env
+        self.config_loader.with_overrides(
+            {k: v for k, v in update.items() if k != "paused" and v is not None}
+        )
+        return update
+
+    def apply(self, simulator: DeviceSimulator, update: Dict[str, Any]) -> None:
+        """
+        Apply a validated update to one device.
+
+        Args:
+            simulator: Device simulator
+            update: Result of parse_update()
+        """
+        changes = {k: v for k, v in update.items() if k != "paused"}
+        if changes:
+            overrides = dict(simulator.overrides)
+            for key, value in changes.items():
+                if value is None:
+                    overrides.pop(key, None)
+                else:
+                    overrides[key] = value
+            simulator.set_overrides(overrides)
+
+        if "paused" in update:
+            if update["paused"]:
+                simulator.pause()
+            else:
+                simulator.resume()
+
+    def _update(self, targets: List[DeviceSimulator], body: Any) -> Any:
+        update = self.parse_update(body)
+        for simulator in targets:
+            self.apply(simulator, update)
+        if targets:
+            logger.info(f"Control API: updated {len(targets)} devices with {update}")
+        return [self.state(simulator) for simulator in targets]
+
+    def _handle_list(self, params: Dict[str, str], body: Any) -> Any:
+        return [self.state(simulator) for simulator in self._matching(params)]
+
+    def _handle_get(self, params: Dict[str, str], body: Any) -> Any:
+        return self.state(self._device(params["device_id"]))
+
+    def _handle_update_group(self, params: Dict[str, str], body: Any) -> Any:
+        return self._update(self._matching(params), body)
+
+    def _handle_update_device(self, params: Dict[str, str], body: Any) -> Any:
+        return self._update([self._device(params["device_id"])], body)[0]
+
+    def _next_indices(self, count: int) -> List[int]:
+        """
+        Pick unused device indices assigned to this worker.
+        """
+        used = set(self.indices.values())
+        indices = []
+        index = self.worker_index
+        while len(indices) < count:
+            if index >= MAX_DEVICES:
+                raise ValueError(f"Device limit of {MAX_DEVICES} reached")
+            if index not in used:
+                if not self.config_loader.device_key(index):
+                    raise ValueError(
+                        f"Missing device key for device {index + 1} "
+                        f"(DEVICE_KEY_{index + 1} or IOTHUB_SHARED_ACCESS_KEY)"
+                    )
+                indices.append(index)
+            index += self.num_workers
+        return indices
+
+    def _handle_add(self, params: Dict[str, str], body: Any) -> Any:
+        count = body.get("count", 1) if isinstance(body, dict) else 1
+        if (
+            isinstance(count, bool)
+            or not isinstance(count, int)
+            or not 1 <= count <= MAX_ADD_PER_REQUEST
+        ):
+            raise ValueError(f"count must be between 1 and {MAX_ADD_PER_REQUEST}")
+
+        indices = self._next_indices(count)
+        added = self.create_devices(indices)
+        for index, simulator in zip(indices, added):
+            self.devices[simulator.device_id] = simulator
+            self.indices[simulator.device_id] = index
+            self.simulators.append(simulator)
+
+        # Connecting takes a while; the request returns immediately
+        self._spawn(self._start(added))
+        logger.info(f"Control API: adding {len(added)} devices")
+        return [self.state(simulator) for simulator in added]
+
+    async def _start(self, added: List[DeviceSimulator]) -> None:
+        self.track(await self.start_devices(added))
+
+    def _handle_remove(self, params: Dict[str, str], body: Any) -> Any:
+        simulator = self._device(params["device_id"])
+        del self.devices[simulator.device_id]
+        del self.indices[simulator.device_id]
+        self.simulators.remove(simulator)
+        if self.hub_ring:
+            self.hub_ring.release(simulator.device_id)
+        self._spawn(simulator.stop())
+        logger.info(f"Control API: removing {simulator.device_id}")
+        return self.state(simulator)
+
+    def _handle_reload(self, params: Dict[str, str], body: Any) -> Any:
+        self.config_loader.load_config()
+        return {"reloaded": True, "devices": len(self.devices)}
+
+    def _spawn(self, coroutine: Awaitable) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+async def start_control_api(
+    config: Dict[str, Any], control_plane: ControlPlane, port_offset: int = 0
+) -> Optional[LocalHttpServer]:
+    """
+    Start the control API if CONTROL_API_PORT is set.
+
+    Args:
+        config: Configuration dictionary
+        control_plane: Control plane for this process
+        port_offset: Added to CONTROL_API_PORT (one port per fleet worker)
+
+    Returns:
+        Running server, or None when the API is disabled or failed to start
+    """
+    if not config["control_api_port"]:
+        return None
+
+    server = LocalHttpServer(
+        config["control_api_host"], config["control_api_port"] + port_offset
+    )
+    control_plane.add_routes(server)
+    try:
+        await server.start()
+    except OSError as e:
+        logger.error(f"Could not start control API: {e}")
+        return None
+    return server
@@ -0,0 +1,483 @@
+"""
+Streaming data-quality profiler for generated telemetry datasets.
+Reads generate_historical_data.py output in chunks, parses them with numpy's
+C reader and reports per-machine and overall counts, NOK rates, error-code
+histograms, quantiles and BitRotationCounter consistency in constant memory.
+Chunks can be parsed in parallel worker processes.
+"""
+
+import io
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bytes per chunk
+CHUNK_BYTES = 8 * 1024 * 1024
+
+# Error codes: 0=OK, 1=Torque, 2=Angle, 3=Timeout, 4=Multiple
+NUM_ERROR_CODES = 5
+
+# Quantile sketches: name -> resolution (values are exact to the resolution)
+SKETCHES: Dict[str, float] = {
+    "ActualTorque": 0.01,
+    "AngleDeviation": 1.0,
+    "CycleTime_ms": 1.0,
+}
+
+QUANTILES = (0.01, 0.5, 0.95, 0.99)
+
+# Odd 64-bit multipliers for hashing fixed-width MachineID bytes
+_HASH_MULTIPLIERS = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5],
+    dtype=np.uint64,
+)
+
+# Columns parsed from the CSV and their dtypes
+PARSED_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("MachineID", "S32"),
+    ("ActualTorque", "f8"),
+    ("TargetAngle", "i8"),
+    ("ActualAngle", "i8"),
+    ("CycleOK", "S5"),
+    ("CycleTime_ms", "i8"),
+    ("SpindleRotationCounter", "i8"),
+    ("BitRotationCounter", "i8"),
+    ("ErrorCode", "i8"),
+)
+
+
+class HistogramSketch:
+    """
+    Mergeable quantile sketch over dense fixed-resolution bins.
+    Memory grows with the value range, not the number of values, and the
+    generated columns are already rounded, so quantiles are exact.
+    """
+
+    def __init__(self, resolution: float):
+        """
+        Initialize the sketch.
+
+        Args:
+            resolution: Bin width
+        """
+        self.resolution = resolution
+        self.low = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.count = 0
+
+    def add_counts(self, low: int, counts: np.ndarray) -> None:
+        """
+        Add a dense run of bin counts.
+
+        Args:
+            low: Bin index (value / resolution, rounded) of counts[0]
+            counts: Values per consecutive bin
+        """
+        if not len(self.counts):
+            self.low, self.counts = low, counts.astype(np.int64)
+        else:
+            new_low = min(self.low, low)
+            new_high = max(self.low + len(self.counts), low + len(counts))
+            if new_low != self.low or new_high != self.low + len(self.counts):
+                grown = np.zeros(new_high - new_low, dtype=np.int64)
+                start = self.low - new_low
+                grown[start : start + len(self.counts)] = self.counts
+                self.low, self.counts = new_low, grown
+            start = low - self.low
+            self.counts[start : start + len(counts)] += counts
+        self.count += int(counts.sum())
+
+    def quantiles(self, qs=QUANTILES) -> Dict[str, Optional[float]]:
+        """
+        Get quantiles.
+
+        Args:
+            qs: Quantiles to compute (0.0 to 1.0)
+
+        Returns:
+            Dictionary like {"p50": value}; values are None without data
+        """
+        names = [f"p{q * 100:g}" for q in qs]
+        if not self.count:
+            return dict.fromkeys(names)
+
+        cumulative = np.cumsum(self.counts)
+        result = {}
+        for name, q in zip(names, qs):
+            rank = min(int(q * self.count), self.count - 1)
+            index = int(np.searchsorted(cumulative, rank, side="right"))
+            result[name] = round((self.low + index) * self.resolution, 6)
+        return result
+
+
+class MachineProfile:
+    """
+    Profile figures for one machine (or the whole dataset).
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.nok = 0
+        self.error_codes = np.zeros(NUM_ERROR_CODES, dtype=np.int64)
+        self.sketches = {
+            name: HistogramSketch(resolution) for name, resolution in SKETCHES.items()
+        }
+        self.counter_decreases = 0
+        self.counter_resets = 0
+        self.counter_gaps = 0
+        self.last_counter: Optional[int] = None
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the profile as a JSON-serializable dictionary.
+        """
+        return {
+            "rows": self.rows,
+            "nokRate": round(self.nok / self.rows, 5) if self.rows else 0.0,
+            "errorCodes": {
+                str(code): int(n) for code, n in enumerate(self.error_codes) if n
+            },
+            "quantiles": {
+                name: sketch.quantiles() for name, sketch in self.sketches.items()
+            },
+            "bitRotationCounter": {
+                "decreases": self.counter_decreases,
+                "resets": self.counter_resets,
+                "gaps": self.counter_gaps,
+            },
+        }
+
+
+def profile_chunk(chunk: bytes, usecols: List[int]) -> Dict[str, Any]:
+    """
+    Parse and profile one chunk of complete CSV rows.
+    Runs in worker processes; the result is small and picklable.
+
+    Args:
+        chunk: Complete CSV rows (no header)
+        usecols: Column positions of PARSED_COLUMNS in the file
+
+    Returns:
+        Partial profile per machine, merged in file order by DataProfiler
+    """
+    rows = np.loadtxt(
+        io.BytesIO(chunk),
+        delimiter=",",
+        dtype=np.dtype(list(PARSED_COLUMNS)),
+        usecols=usecols,
+        comments=None,
+        ndmin=1,
+    )
+    # Group rows by machine via a hash of the fixed-width ID bytes (much
+    # faster than sorting strings)
+    machine_ids = rows["MachineID"]
+    words = np.ascontiguousarray(machine_ids).view(np.uint64)
+    words = words.reshape(len(rows), -1)
+    hashes = (words * _HASH_MULTIPLIERS[: words.shape[1]]).sum(axis=1)
+    _, first_rows, machine = np.unique(
+        hashes, return_index=True, return_inverse=True
+    )
+    names = machine_ids[first_rows]
+    machine = machine.ravel()
+    num_machines = len(names)
+
+    cycle_ok = rows["CycleOK"] == b"True"
+    error_code = np.clip(rows["ErrorCode"], 0, NUM_ERROR_CODES - 1)
+    values = {
+        "ActualTorque": rows["ActualTorque"],
+        "AngleDeviation": rows["ActualAngle"] - rows["TargetAngle"],
+        "CycleTime_ms": rows["CycleTime_ms"],
+    }
+
+    result: Dict[str, Any] = {
+        "machines": [name.decode("utf-8") for name in names],
+        "rows": np.bincount(machine, minlength=num_machines),
+        "nok": np.bincount(machine, weights=~cycle_ok, minlength=num_machines),
+        "errors": np.bincount(
+            machine * NUM_ERROR_CODES + error_code,
+            minlength=num_machines * NUM_ERROR_CODES,
+        ).reshape(num_machines, NUM_ERROR_CODES),
+        "sketches": {},
+    }
+
+    # Dense quantile sketch bins: one row of counts per machine
+    for name, resolution in SKETCHES.items():
+        bins = np.rint(values[name] / resolution).astype(np.int64)
+        low = int(bins.min())
+        span = int(bins.max()) - low + 1
+        counts = np.bincount(
+            machine * span + (bins - low), minlength=num_machines * span
+        ).reshape(num_machines, span)
+        result["sketches"][name] = (low, counts)
+
+    # BitRotationCounter must never decrease except on a bit replacement, where
+    # it restarts at the row's SpindleRotationCounter, and each step should
+    # equal the row's SpindleRotationCounter; first rows are checked against
+    # the previous chunk during the merge
+    order = np.argsort(machine, kind="stable")
+    machine = machine[order]
+    counter = rows["BitRotationCounter"][order]
+    spindle = rows["SpindleRotationCounter"][order]
+    first = np.ones(len(machine), dtype=bool)
+    first[1:] = machine[1:] != machine[:-1]
+    first_rows = np.flatnonzero(first)
+    last_rows = np.append(first_rows[1:] - 1, len(machine) - 1)
+
+    delta = np.empty_like(counter)
+    delta[0] = 0
+    delta[1:] = counter[1:] - counter[:-1]
+    inner = ~first
+    decreased = inner & (delta < 0)
+    reset = counter == spindle
+    result["decreases"] = np.bincount(
+        machine, weights=decreased & ~reset, minlength=num_machines
+    )
+    result["resets"] = np.bincount(
+        machine, weights=decreased & reset, minlength=num_machines
+    )
+    result["gaps"] = np.bincount(
+        machine,
+        weights=inner & (delta >= 0) & (delta != spindle),
+        minlength=num_machines,
+    )
+    result["first_counter"] = counter[first_rows]
+    result["first_spindle"] = spindle[first_rows]
+    result["last_counter"] = counter[last_rows]
+    return result
+
+
+class DataProfiler:
+    """
+    Streaming profiler over a telemetry CSV.
+    """
+
+    def __init__(self, chunk_bytes: int = CHUNK_BYTES, workers: int = 1):
+        """
+        Initialize the profiler.
+
+        Args:
+            chunk_bytes: Bytes per chunk (bounds memory use per worker)
+            workers: Processes parsing chunks in parallel (1: in-process)
+        """
+        self.chunk_bytes = chunk_bytes
+        self.workers = max(1, workers)
+        self.overall = MachineProfile()
+        self.machines: Dict[str, MachineProfile] = {}
+        self.bytes_read = 0
+        self.elapsed = 0.0
+
+    def _chunks(self, f) -> Iterator[bytes]:
+        """
+        Yield chunks of complete lines from a file positioned after the header.
+        """
+        leftover = b""
+        while True:
+            block = f.read(self.chunk_bytes)
+            if not block:
+                break
+            self.bytes_read += len(block)
+            block = leftover + block
+            cut = block.rfind(b"\n") + 1
+            leftover = block[cut:]
+            if cut:
+                yield block[:cut]
+        if leftover.strip():
+            yield leftover
+
+    def profile(self, path: Union[str, Path]) -> Dict[str, Any]:
+        """
+        Profile a telemetry CSV.
+
+        Args:
+            path: CSV written by generate_historical_data.py
+
+        Returns:
+            Report dictionary (see report())
+        """
+        started = time.perf_counter()
+        with open(path, "rb") as f:
+            header = f.readline()
+            self.bytes_read += len(header)
+            columns = [c.strip() for c in header.decode("utf-8").split(",")]
+            missing = [name for name, _ in PARSED_COLUMNS if name not in columns]
+            if missing:
+                raise ValueError(f"Missing columns in {path}: {missing}")
+            usecols = [columns.index(name) for name, _ in PARSED_COLUMNS]
+
+            if self.workers == 1:
+                for chunk in self._chunks(f):
+                    self._merge(profile_chunk(chunk, usecols))
+            else:
+                self._profile_parallel(f, usecols)
+
+        self.elapsed = time.perf_counter() - started
+        return self.report()
+
+    def _profile_parallel(self, f, usecols: List[int]) -> None:
+        """
+        Parse chunks in worker processes, merging results in file order.
+        At most two chunks per worker are in flight, so memory stays bounded.
+        """
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(self.workers) as pool:
+            pending: deque = deque()
+            for chunk in self._chunks(f):
+                pending.append(pool.apply_async(profile_chunk, (chunk, usecols)))
+                if len(pending) >= 2 * self.workers:
+                    self._merge(pending.popleft().get())
+            while pending:
+                self._merge(pending.popleft().get())
+
+    def _merge(self, partial: Dict[str, Any]) -> None:
+        """
+        Merge a chunk's partial profile (chunks must arrive in file order).
+        """
+        overall = self.overall
+        profiles = []
+        for name in partial["machines"]:
+            profile = self.machines.get(name)
+            if profile is None:
+                profile = self.machines[name] = MachineProfile()
+            profiles.append(profile)
+
+        for m, profile in enumerate(profiles):
+            profile.rows += int(partial["rows"][m])
+            profile.nok += int(partial["nok"][m])
+            profile.error_codes += partial["errors"][m]
+            profile.counter_decreases += int(partial["decreases"][m])
+            profile.counter_resets += int(partial["resets"][m])
+            profile.counter_gaps += int(partial["gaps"][m])
+
+            # Continue the counter sequence across the chunk boundary
+            if profile.last_counter is not None:
+                first_counter = int(partial["first_counter"][m])
+                first_spindle = int(partial["first_spindle"][m])
+                delta = first_counter - profile.last_counter
+                if delta < 0 and first_counter == first_spindle:
+                    profile.counter_resets += 1
+                elif delta < 0:
+                    profile.counter_decreases += 1
+                elif delta != first_spindle:
+                    profile.counter_gaps += 1
+            profile.last_counter = int(partial["last_counter"][m])
+
+        overall.rows += int(partial["rows"].sum())
+        overall.nok += int(partial["nok"].sum())
+        overall.error_codes += partial["errors"].sum(axis=0)
+
+        for name, (low, counts) in partial["sketches"].items():
+            for m, profile in enumerate(profiles):
+                profile.sketches[name].add_counts(low, counts[m])
+            overall.sketches[name].add_counts(low, counts.sum(axis=0))
+
+        machines = self.machines.values()
+        overall.counter_decreases = sum(p.counter_decreases for p in machines)
+        overall.counter_resets = sum(p.counter_resets for p in machines)
+        overall.counter_gaps = sum(p.counter_gaps for p in machines)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the full report.
+
+        Returns:
+            Dictionary with overall and per-machine profiles
+        """
+        elapsed = self.elapsed
+        return {
+            "bytes": self.bytes_read,
+            "seconds": round(elapsed, 3),
+            "megabytesPerSecond": (
+                round(self.bytes_read / 1e6 / elapsed, 1) if elapsed else None
+            ),
+            "overall": self.overall.report(),
+            "machines": {m: self.machines[m].report() for m in sorted(self.machines)},
+        }
+
+
+def log_report(report: Dict[str, Any]) -> None:
+    """
+    Log a human-readable summary of a profile report.
+
+    Args:
+        report: Report from DataProfiler.profile()
+    """
+
+    def line(name: str, p: Dict[str, Any]) -> str:
+        torque = p["quantiles"]["ActualTorque"]
+        cycle = p["quantiles"]["CycleTime_ms"]
+        counter = p["bitRotationCounter"]
+        return (
+            f"{name:<18} {p['rows']:>12,} {p['nokRate']:>8.2%} "
+            f"{torque['p50']!s:>8} {torque['p99']!s:>8} "
+            f"{cycle['p50']!s:>8} {cycle['p99']!s:>8} "
+            f"{counter['decreases']:>6} {counter['resets']:>6} {counter['gaps']:>6}  "
+            f"{p['errorCodes']}"
+        )
+
+    logger.info(
+        f"Profiled {report['bytes'] / 1e6:,.1f} MB in {report['seconds']:.2f}s "
+        f"({report['megabytesPerSecond']} MB/s)"
+    )
+    logger.info(
+        f"{'Machine':<18} {'Rows':>12} {'NOK':>8} {'Tq p50':>8} {'Tq p99':>8} "
+        f"{'CT p50':>8} {'CT p99':>8} {'Decr':>6} {'Resets':>6} {'Gaps':>6}  "
+        f"ErrorCodes"
+    )
+    for machine_id, profile in report["machines"].items():
+        logger.info(line(machine_id, profile))
+    logger.info(line("ALL", report["overall"]))
+
+
+def main():
+    """Command-line entry point."""
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Profile data quality of a generated telemetry CSV"
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="historical_telemetry.csv",
+        help="Telemetry CSV (default: historical_telemetry.csv)",
+    )
+    parser.add_argument("--json", type=str, help="Also write the report as JSON")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes parsing chunks (default: CPU count)",
+    )
+    parser.add_argument(
+        "--chunk-mb",
+        type=int,
+        default=CHUNK_BYTES // (1024 * 1024),
+        help=f"Chunk size in MB (default: {CHUNK_BYTES // (1024 * 1024)})",
+    )
+    args = parser.parse_args()
+
+    profiler = DataProfiler(args.chunk_mb * 1024 * 1024, args.workers)
+    report = profiler.profile(args.input)
+    log_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""
+Content-addressed cache of generated historical datasets.
+Entries are keyed by a hash of the generator parameters, the effective
+configuration, the seed and the generator code, and are restored into place
+as hard links. The cache is kept under a total size by evicting the least
+recently used entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+# Cached name of the main output file; sidecars append their suffix to it
+DATA_NAME = "data"
+
+
+def fingerprint(spec: Dict[str, Any]) -> str:
+    """
+    Hash a dataset specification.
+
+    Args:
+        spec: JSON-serializable parameters that determine the dataset
+
+    Returns:
+        Hex SHA-256 of the canonical JSON encoding
+    """
+    encoded = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """
+    Hash a file's contents.
+
+    Args:
+        path: File to hash
+
+    Returns:
+        Hex SHA-256 of the contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version(paths: Iterable[Union[str, Path]]) -> str:
+    """
+    Hash the source files that produce a dataset.
+
+    Args:
+        paths: Source files
+
+    Returns:
+        Hex SHA-256 over the file names and contents and the Python version
+    """
+    python = "python{}.{}".format(*sys.version_info[:2])
+    digest = hashlib.sha256(python.encode("ascii"))
+    for path in sorted(Path(p) for p in paths):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(file_digest(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def _link(source: Path, target: Path) -> None:
+    """
+    Hard-link source to target, copying across file systems.
+    """
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class DatasetCache:
+    """
+    Directory of cached datasets, one subdirectory per key.
+
+    Each entry holds the cached files (the main output as "data", sidecars
+    as "data<suffix>") and a manifest with the specification, size, creation
+    time, last use and hit count.
+    """
+
+    def __init__(self, root: Union[str, Path], max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            root: Cache directory (created if missing)
+            max_bytes: Total size above which least recently used entries
+                are evicted
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["DatasetCache"]:
+        """
+        Create the cache configured in .env.
+
+        Args:
+            config: Configuration from ConfigLoader
+
+        Returns:
+            DatasetCache, or None if DATASET_CACHE_DIR is not set
+        """
+        if not config["dataset_cache_dir"]:
+            return None
+        return cls(
+            config["dataset_cache_dir"],
+            int(config["dataset_cache_max_mb"] * 1024 * 1024),
+        )
+
+    def manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read an entry's manifest.
+
+        Args:
+            key: Full key
+
+        Returns:
+            Manifest dictionary, or None if there is no complete entry
+        """
+        path = self.root / key / MANIFEST_NAME
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, directory: Path, manifest: Dict[str, Any]) -> None:
+        tmp_path = directory / (MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_path, directory / MANIFEST_NAME)
+
+    def resolve(self, prefix: str) -> str:
+        """
+        Expand a key prefix to a full key.
+
+        Args:
+            prefix: Leading characters of a key
+
+        Returns:
+            Full key
+
+        Raises:
+            KeyError: If no entry or more than one entry matches
+        """
+        keys = [entry["key"] for entry in self.entries()]
+        matches = [key for key in keys if key.startswith(prefix)]
+        if len(matches) != 1:
+            raise KeyError(
+                f"{'Ambiguous' if matches else 'Unknown'} cache key: {prefix}"
+            )
+        return matches[0]
+
+    def restore(self, key: str, files: Dict[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        Link a cached dataset into place.
+
+        Args:
+            key: Dataset key from fingerprint()
+            files: Target path per file suffix ("" for the main output)
+
+        Returns:
+            The entry's manifest on a hit, None on a miss
+        """
+        manifest = self.manifest(key)
+        if manifest is None:
+            return None
+        directory = self.root / key
+        if sorted(manifest["files"]) != sorted(files) or not all(
+            (directory / (DATA_NAME + suffix)).is_file() for suffix in files
+        ):
+            logger.warning(f"Dropping incomplete dataset cache entry {key[:12]}")
+            self.remove(key)
+            return None
+
+        for suffix, target in files.items():
+            target.unlink(missing_ok=True)
+            _link(directory / (DATA_NAME + suffix), target)
+
+        manifest["lastUsed"] = time.time()
+        manifest["hits"] = manifest.get("hits", 0) + 1
+        self._write_manifest(directory, manifest)
+        return manifest
+
+    def store(self, key: str, files: Dict[str, Path], spec: Dict[str, Any]) -> None:
+        """
+        Add a freshly generated dataset and evict entries over the size limit.
+
+        Args:
+            key: Dataset key from fingerprint(spec)
+            files: Generated path per file suffix ("" for the main output)
+            spec: Specification the key was computed from (kept for inspection)
+        """
+        directory = self.root / key
+        if directory.exists():
+            return
+        tmp_dir = self.root / f".tmp-{key}-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+        try:
+            for suffix, path in files.items():
+                _link(path, tmp_dir / (DATA_NAME + suffix))
+            now = time.time()
+            self._write_manifest(
+                tmp_dir,
+                {
+                    "key": key,
+                    "spec": spec,
+                    "files": sorted(files),
+                    "bytes": sum(path.stat().st_size for path in files.values()),
+                    "created": now,
+                    "lastUsed": now,
+                    "hits": 0,
+                },
+            )
+            # Publish atomically; a concurrent writer may have won the race
+            os.rename(tmp_dir, directory)
+        except OSError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not directory.exists():
+                logger.warning(f"Could not cache dataset {key[:12]}: {e}")
+            return
+        self.evict()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        List cache entries, least recently used first.
+
+        Returns:
+            Manifests of all complete entries
+        """
+        manifests = []
+        for directory in self.root.iterdir():
+            if directory.is_dir() and not directory.name.startswith("."):
+                manifest = self.manifest(directory.name)
+                if manifest is not None:
+                    manifests.append(manifest)
+        return sorted(manifests, key=lambda manifest: manifest["lastUsed"])
+
+    def total_bytes(self) -> int:
+        """
+        Get the total size of all entries.
+        """
+        return sum(entry["bytes"] for entry in self.entries())
+
+    def evict(self, max_bytes: Optional[int] = None) -> List[str]:
+        """
+        Remove least recently used entries until the cache fits.
+
+        Args:
+            max_bytes: Size limit (default: the cache's max_bytes)
+
+        Returns:
+            Keys of the evicted entries
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(entry["bytes"] for entry in entries)
+        evicted = []
+        for entry in entries:
+            if total <= limit:
+                break
+            self.remove(entry["key"])
+            total -= entry["bytes"]
+            evicted.append(entry["key"])
+            logger.info(
+                f"Evicted dataset cache entry {entry['key'][:12]} "
+                f"({entry['bytes'] / 1024 / 1024:.1f} MB)"
+            )
+        return evicted
+
+    def remove(self, key: str) -> None:
+        """
+        Remove one entry (linked outputs elsewhere are unaffected).
+
+        Args:
+            key: Full key
+        """
+        shutil.rmtree(self.root / key, ignore_errors=True)
+
+    def clear(self) -> int:
+        """
+        Remove all entries.
+
+        Returns:
+            Number of entries removed
+        """
+        entries = self.entries()
+        for entry in entries:
+            self.remove(entry["key"])
+        return len(entries)
+
+
+def _format_time(epoch: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(epoch))
+
+
+def main():
+    """Command-line entry point."""
+    import argparse
+
+    from config_loader import ConfigLoader
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Inspect and manage the generated dataset cache"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default="",
+        help="Cache directory (default: DATASET_CACHE_DIR from .env)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List entries, least recently used first")
+    show = subparsers.add_parser("show", help="Show an entry's specification")
+    show.add_argument("key", help="Key or unique key prefix")
+    remove = subparsers.add_parser("remove", help="Remove an entry")
+    remove.add_argument("key", help="Key or unique key prefix")
+    prune = subparsers.add_parser("prune", help="Evict least recently used entries")
+    prune.add_argument(
+        "--max-mb",
+        type=float,
+        default=None,
+        help="Size to prune down to (default: DATASET_CACHE_MAX_MB)",
+    )
+    subparsers.add_parser("clear", help="Remove all entries")
+    args = parser.parse_args()
+
+    config = ConfigLoader(validate_transport=False).get_config()
+    root = args.cache_dir or config["dataset_cache_dir"]
+    if not root:
+        parser.error("No cache directory: set DATASET_CACHE_DIR or pass --cache-dir")
+    cache = DatasetCache(root, int(config["dataset_cache_max_mb"] * 1024 * 1024))
+
+    try:
+        if args.command == "list":
+            entries = cache.entries()
+            print(
+                f"{'Key':<14} {'MB':>9} {'Hits':>5} {'Created':<17} "
+                f"{'Last used':<17} Dataset"
+            )
+            for entry in entries:
+                params = entry["spec"]["params"]
+                print(
+                    f"{entry['key'][:12]:<14} {entry['bytes'] / 1024 / 1024:>9.1f} "
+                    f"{entry['hits']:>5} {_format_time(entry['created']):<17} "
+                    f"{_format_time(entry['lastUsed']):<17} "
+                    f"{params['num_devices']} devices, {params['days_back']} days, "
+                    f"{params['output_format']}, seed {params['seed']}"
+                )
+            print(
+                f"{len(entries)} entries, {cache.total_bytes() / 1024 / 1024:.1f} MB "
+                f"of {cache.max_bytes / 1024 / 1024:.0f} MB in {cache.root}"
+            )
+        elif args.command == "show":
+            manifest = cache.manifest(cache.resolve(args.key))
+            print(json.dumps(manifest, indent=2, default=str))
+        elif args.command == "remove":
+            key = cache.resolve(args.key)
+            cache.remove(key)
+            logger.info(f"Removed {key}")
+        elif args.command == "prune":
+            max_bytes = (
+                None if args.max_mb is None else int(args.max_mb * 1024 * 1024)
+            )
+            evicted = cache.evict(max_bytes)
+            logger.info(f"Evicted {len(evicted)} entries")
+        elif args.command == "clear":
+            logger.info(f"Removed {cache.clear()} entries")
+    except KeyError as e:
+        parser.error(str(e.args[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Closed-form component degradation model for screw robot devices.
+Evaluates component health, operation counts and bit rotations for any number
+of operational hours in O(1), with noise matching per-event simulation.
+"""
+
+import math
+import random
+from typing import Dict, Optional, Tuple
+
+# Degradation rates per 1000 hours of operation
+# Motor degrades fastest, sensors slowest
+DEGRADATION_RATES: Tuple[Tuple[str, float], ...] = (
+    ("motor", 0.15),  # 15% degradation per 1000 hours
+    ("bearing", 0.12),  # 12% degradation per 1000 hours
+    ("sensor", 0.05),  # 5% degradation per 1000 hours
+)
+
+# Per-event degradation noise is uniform(0.8, 1.2): mean 1, variance 0.4^2 / 12
+DEGRADATION_NOISE_LOW = 0.8
+DEGRADATION_NOISE_HIGH = 1.2
+_NOISE_VARIANCE = (DEGRADATION_NOISE_HIGH - DEGRADATION_NOISE_LOW) ** 2 / 12.0
+
+# Operation duration moments (seconds) matching TelemetryGenerator._generate_duration
+# Normal: uniform(1.0, 3.0); anomaly: 50% uniform(0.3, 0.9), 50% uniform(3.5, 5.0)
+_NORMAL_MEAN = 2.0
+_NORMAL_SQUARE_MEAN = (1.0 + 3.0 + 9.0) / 3.0
+_ANOMALY_MEAN = 0.5 * 0.6 + 0.5 * 4.25
+_ANOMALY_SQUARE_MEAN = 0.5 * (0.09 + 0.27 + 0.81) / 3.0 + 0.5 * (
+    12.25 + 17.5 + 25.0
+) / 3.0
+
+
+def operation_seconds_moments(anomaly_rate: float) -> Tuple[float, float]:
+    """
+    Get the mean and mean square of a single operation's duration.
+
+    Args:
+        anomaly_rate: Probability of an anomalous operation
+
+    Returns:
+        Tuple of (mean seconds, mean squared seconds)
+    """
+    mean = (1.0 - anomaly_rate) * _NORMAL_MEAN + anomaly_rate * _ANOMALY_MEAN
+    square_mean = (
+        1.0 - anomaly_rate
+    ) * _NORMAL_SQUARE_MEAN + anomaly_rate * _ANOMALY_SQUARE_MEAN
+    return mean, square_mean
+
+
+def operations_for_hours(
+    hours: float, anomaly_rate: float, rng: Optional[random.Random] = None
+) -> int:
+    """
+    Sample the number of operations needed to accumulate operational hours.
+    Uses the renewal-process approximation N(t) ~ Normal(t / mu, t * sigma^2 / mu^3).
+
+    Args:
+        hours: Operational hours
+        anomaly_rate: Probability of an anomalous operation
+        rng: Random source (default: module-level random)
+
+    Returns:
+        Operation count (non-negative)
+    """
+    if hours <= 0:
+        return 0
+    rng = rng or random
+
+    seconds = hours * 3600.0
+    mean, square_mean = operation_seconds_moments(anomaly_rate)
+    variance = square_mean - mean**2
+    count = rng.gauss(seconds / mean, math.sqrt(seconds * variance / mean**3))
+    return max(0, int(round(count)))
+
+
+def rotations_for_hours(
+    hours: float,
+    operations: int,
+    speed_rpm: float,
+    anomaly_rate: float,
+    speed_variance_percent: float,
+    rng: Optional[random.Random] = None,
+) -> int:
+    """
+    Sample the total bit rotations accumulated over operational hours.
+    Rotations per operation are int(speed * duration / 60), so given the total
+    duration the sum depends only on speed noise and integer truncation.
+
+    Args:
+        hours: Operational hours
+        operations: Number of operations spread over those hours
+        speed_rpm: Nominal screwing speed in RPM
+        anomaly_rate: Probability of an anomalous operation
+        speed_variance_percent: Maximum speed drop during speed anomalies (%)
+        rng: Random source (default: module-level random)
+
+    Returns:
+        Total rotations (non-negative)
+    """
+    if operations <= 0:
+        return 0
+    rng = rng or random
+
+    # Normal speed varies uniformly by +-2%; 30% of anomalies drop speed by
+    # uniform(0, variance) percent
+    drop = speed_variance_percent / 100.0
+    speed_anomaly_share = anomaly_rate * 0.3
+    speed_factor = 1.0 - speed_anomaly_share * drop / 2.0
+    speed_factor_variance = (1.0 - speed_anomaly_share) * 0.04**2 / 12.0 + (
+        speed_anomaly_share * (drop**2 / 3.0) - (speed_anomaly_share * drop / 2.0) ** 2
+    )
+
+    _, square_mean = operation_seconds_moments(anomaly_rate)
+    rotations_per_second = speed_rpm / 60.0
+
+    # int() truncation loses half a rotation per operation on average
+    mean = rotations_per_second * speed_factor * hours * 3600.0 - 0.5 * operations
+    variance = operations * (
+        rotations_per_second**2 * square_mean * speed_factor_variance + 1.0 / 12.0
+    )
+
+    total = rng.gauss(mean, math.sqrt(max(variance, 0.0)))
+    return max(0, int(round(total)))
+
+
+def bit_replacements_for_rotations(
+    rotations: int,
+    lifetime: float,
+    lifetime_sd: float,
+    rng: Optional[random.Random] = None,
+) -> int:
+    """
+    Sample how many bits wear out over a number of rotations.
+    Uses the renewal-process approximation N(r) ~ Normal(r / L, r * sigma^2 / L^3).
+
+    Args:
+        rotations: Rotations accumulated on fresh bits
+        lifetime: Mean bit lifetime in rotations (L)
+        lifetime_sd: Standard deviation of the bit lifetime (sigma)
+        rng: Random source (default: module-level random)
+
+    Returns:
+        Number of worn-out bits (non-negative)
+    """
+    if rotations <= 0 or lifetime <= 0:
+        return 0
+    rng = rng or random
+
+    count = rng.gauss(
+        rotations / lifetime, math.sqrt(rotations * lifetime_sd**2 / lifetime**3)
+    )
+    return max(0, int(count))
+
+
+def component_health_after(
+    hours: float,
+    operations: int,
+    anomaly_rate: float,
+    start_health: Optional[Dict[str, float]] = None,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, float]:
+    """
+    Sample component health after additional operational hours.
+
+    Per event, health drops by rate * (duration / 3.6e6) * uniform(0.8, 1.2).
+    Summed over many events this is rate * hours / 1000 times a duration-weighted
+    mean of the noise factors, which is approximately normal with mean 1 and
+    variance Var(U) * E[d^2] / (n * E[d]^2).
+
+    Args:
+        hours: Additional operational hours
+        operations: Number of operations spread over those hours
+        anomaly_rate: Probability of an anomalous operation
+        start_health: Health before the interval (default: all 1.0)
+        rng: Random source (default: module-level random)
+
+    Returns:
+        Dictionary of component name to health (0.0 to 1.0)
+    """
+    rng = rng or random
+    start_health = start_health or {}
+
+    if operations > 0:
+        mean_seconds, square_mean = operation_seconds_moments(anomaly_rate)
+        noise_sd = math.sqrt(
+            _NOISE_VARIANCE * square_mean / (operations * mean_seconds**2)
+        )
+    else:
+        noise_sd = 0.0
+
+    health = {}
+    for component, rate in DEGRADATION_RATES:
+        factor = rng.gauss(1.0, noise_sd) if noise_sd else 1.0
+        factor = min(DEGRADATION_NOISE_HIGH, max(DEGRADATION_NOISE_LOW, factor))
+        degradation = rate * (hours / 1000.0) * factor
+        health[component] = max(0.0, start_health.get(component, 1.0) - degradation)
+    return health
+
@@ -7,20 +7,26 @@ import asyncio
 import json
 import random
 import logging
-from typing import Optional
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from datetime import datetime, timezone
 
-from azure.iot.device.aio import IoTHubDeviceClient
-from azure.iot.device import Message
-from azure.iot.device.exceptions import (
-    ConnectionFailedError,
-    ConnectionDroppedError,
-    CredentialError,
-    OperationTimeout,
-)
-
 from config_loader import ConfigLoader
 from telemetry_generator import TelemetryGenerator
+from profiler import NULL_PROFILER
+from reconnect import ReconnectCoordinator
+from log_aggregator import TelemetryLogAggregator
+from machine_snapshot import MachineSnapshotAggregator
+from telemetry_buffer import TelemetryBuffer
+from reporting_policy import ReportingPolicy, create_reporting_policy
+from spool import TelemetrySpool
+from network_impairment import NetworkImpairment
+from rollups import RollupAggregator
+
+# The Azure IoT device SDK takes ~100 ms to import; it is imported on first
+# connect so tools that never talk to IoT Hub start fast
+if TYPE_CHECKING:
+    from azure.iot.device.aio import IoTHubDeviceClient
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +43,14 @@ class DeviceSimulator:
         connection_string: str,
         config_loader: ConfigLoader,
         telemetry_generator: TelemetryGenerator,
+        profiler=NULL_PROFILER,
+        reconnect_coordinator: Optional[ReconnectCoordinator] = None,
+        log_aggregator: Optional[TelemetryLogAggregator] = None,
+        snapshot_aggregator: Optional[MachineSnapshotAggregator] = None,
+        telemetry_buffer: Optional[TelemetryBuffer] = None,
+        spool: Optional[TelemetrySpool] = None,
+        impairment: Optional[NetworkImpairment] = None,
+        rollup_aggregator: Optional[RollupAggregator] = None,
     ):
         """
         Initialize the device simulator.
@@ -46,26 +60,85 @@ class DeviceSimulator:
             connection_string: Azure IoT Hub device connection string
             config_loader: Shared configuration loader instance
             telemetry_generator: Telemetry generator for this device
+            profiler: Stage profiler (no-op unless profiling is enabled)
+            reconnect_coordinator: Fleet-wide reconnect coordinator (optional)
+            log_aggregator: Summary logger replacing per-message INFO lines
+                (optional, used when LOG_MODE=fast)
+            snapshot_aggregator: Per-machine snapshot aggregator (optional,
+                used when SNAPSHOT_FILE is set)
+            telemetry_buffer: Recent-telemetry buffer behind the local query
+                API (optional, used when QUERY_API_PORT is set)
+            spool: Store-and-forward spool for events that cannot be sent
+                (optional, used when SPOOL_DIR is set)
+            impairment: Scripted network impairment in front of the client
+                (optional, used when IMPAIRMENT_FILE is set)
+            rollup_aggregator: Per-machine minute/hour/day rollups (optional,
+                used when ROLLUP_DIR is set)
         """
         self.device_id = device_id
         self.connection_string = connection_string
         self.config_loader = config_loader
         self.telemetry_generator = telemetry_generator
-        self.client: Optional[IoTHubDeviceClient] = None
+        self.profiler = profiler
+        self.reconnect_coordinator = reconnect_coordinator or ReconnectCoordinator()
+        self.log_aggregator = log_aggregator
+        self.snapshot_aggregator = snapshot_aggregator
+        self.telemetry_buffer = telemetry_buffer
+        self.spool = spool
+        self.impairment = impairment
+        self.rollup_aggregator = rollup_aggregator
+        self.hostname = dict(
+            part.split("=", 1) for part in connection_string.split(";") if "=" in part
+        ).get("HostName", "")
+        self.client: Optional["IoTHubDeviceClient"] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.running = False
+        self.stop_requested = False
         self.messages_sent = 0
+        self.reporting_policy: ReportingPolicy = create_reporting_policy(
+            device_id, config_loader.get_config()
+        )
+
+        # Runtime control (control_plane.py): per-device config overrides and
+        # pause, applied without touching other devices
+        self.overrides: Dict[str, Any] = {}
+        self.paused = False
+        self._config_base: Optional[Dict[str, Any]] = None
+        self._config_effective: Optional[Dict[str, Any]] = None
+        self._wake_future: Optional[asyncio.Future] = None
+        self._wake_handle: Optional[asyncio.TimerHandle] = None
+        self._sleep_started = 0.0
 
     async def connect(self) -> None:
         """
         Establish connection to Azure IoT Hub.
         """
+        from azure.iot.device.aio import IoTHubDeviceClient
+        from azure.iot.device.exceptions import ConnectionFailedError, CredentialError
+
         try:
+            self._loop = asyncio.get_running_loop()
+
+            # Trust a custom CA if configured (e.g. the local ingest stand-in)
+            options = {}
+            ca_cert = self.config_loader.get_config()["iothub_ca_cert"]
+            if ca_cert:
+                with open(ca_cert, "r", encoding="utf-8") as f:
+                    options["server_verification_cert"] = f.read()
+
+            # Reconnects are driven by the fleet-wide coordinator instead of the
+            # SDK's fixed retry interval, so they are jittered and rate-capped
             self.client = IoTHubDeviceClient.create_from_connection_string(
                 self.connection_string,
                 keep_alive=60,
-                connection_retry=True,
-                connection_retry_interval=10,
+                connection_retry=False,
+                auto_connect=False,
+                **options,
             )
+            self.client.on_connection_state_change = self._on_connection_state_change
+            if self.impairment is not None:
+                self.client = self.impairment.wrap(self.client)
 
             await self.client.connect()
             self.running = True
@@ -81,11 +154,48 @@ class DeviceSimulator:
             logger.error(f"{self.device_id}: Unexpected error during connection: {e}")
             raise
 
+    def _on_connection_state_change(self) -> None:
+        """
+        Handle connection state changes reported by the SDK.
+        Called on an SDK handler thread, so the check is handed to our loop.
+        """
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._check_connection)
+            except RuntimeError:
+                # Event loop already closed during shutdown
+                pass
+
+    def _check_connection(self) -> None:
+        """
+        Schedule a coordinated reconnect if the connection has dropped.
+        """
+        if self.client and not self.client.connected and self.running:
+            logger.warning(f"{self.device_id}: Connection to IoT Hub lost")
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self) -> None:
+        """
+        Start a background reconnect unless one is already in progress.
+        """
+        if self._reconnect_task and not self._reconnect_task.done():
+            return
+        self._reconnect_task = asyncio.create_task(
+            self.reconnect_coordinator.reconnect(
+                self.hostname,
+                self.device_id,
+                self.client.connect,
+                lambda: self.running and not self.stop_requested,
+            )
+        )
+
     async def disconnect(self) -> None:
         """
         Disconnect from Azure IoT Hub.
         """
         self.running = False
+        if self._reconnect_task and not self._reconnect_task.done():
+            self._reconnect_task.cancel()
         if self.client:
             try:
                 await self.client.disconnect()
@@ -96,10 +206,58 @@ class DeviceSimulator:
             except Exception as e:
                 logger.error(f"{self.device_id}: Error during disconnect: {e}")
 
+    def is_connected(self) -> bool:
+        """
+        Check whether the device can send right now.
+
+        Returns:
+            True if running with a connected client
+        """
+        return self.running and self.client is not None and self.client.connected
+
+    async def deliver(self, message: dict) -> None:
+        """
+        Send a message, or spool it when it cannot be sent now.
+
+        With a spool, messages of a disconnected device go straight to disk
+        instead of being retried in memory, and while the device has spooled
+        messages new ones are queued behind them to keep the device's order.
+
+        Args:
+            message: Telemetry message dictionary
+        """
+        if self.spool is None:
+            await self.send_telemetry(message)
+        elif self.spool.has_pending(self.device_id) or not self.is_connected():
+            self.spool.append(self.device_id, message)
+        elif not await self.send_telemetry(message):
+            self.spool.append(self.device_id, message)
+
     async def send_telemetry(self, telemetry_data: dict) -> bool:
         """
         Send telemetry message to Azure IoT Hub with retry logic.
 
+        Args:
+            telemetry_data: Dictionary containing telemetry data
+
+        Returns:
+            True if message was sent successfully, False otherwise
+        """
+        if self.impairment is None:
+            return await self._send_telemetry(telemetry_data)
+
+        # Benchmark the whole send, retries and backoff included, in the phase
+        # it started in (a slow send may finish in the next one)
+        stats = self.impairment.current()
+        started = time.monotonic()
+        sent = await self._send_telemetry(telemetry_data)
+        self.impairment.record_message(stats, sent, time.monotonic() - started)
+        return sent
+
+    async def _send_telemetry(self, telemetry_data: dict) -> bool:
+        """
+        Send a telemetry message, retrying transient failures with backoff.
+
         Args:
             telemetry_data: Dictionary containing telemetry data
 
@@ -110,111 +268,256 @@ class DeviceSimulator:
             logger.error(f"{self.device_id}: Client not connected")
             return False
 
-        max_retries = 3
+        # Already loaded by connect(), so this is a cheap module lookup
+        from azure.iot.device import Message
+        from azure.iot.device.exceptions import (
+            ConnectionDroppedError,
+            NoConnectionError,
+            OperationTimeout,
+        )
+
+        max_retries = self.config_loader.get_config()["send_max_retries"]
+        wait_time = 0.0
         for attempt in range(max_retries):
             try:
-                # Create message with JSON payload
-                message_json = json.dumps(telemetry_data)
-                message = Message(message_json)
-
-                # Set message properties
-                message.content_type = "application/json"
-                message.content_encoding = "utf-8"
-
-                # Add custom properties for routing and filtering
-                message.custom_properties["iothub-creation-time-utc"] = datetime.now(
-                    timezone.utc
-                ).isoformat()
-                message.custom_properties["deviceType"] = "screw-robot"
-                
-                # Quality control routing
-                cycle_ok = telemetry_data.get("CycleOK", True)
-                error_code = telemetry_data.get("ErrorCode", 0)
-                
-                # Set alert level based on cycle status
-                if not cycle_ok:
-                    message.custom_properties["alertLevel"] = "warning"
-                    message.custom_properties["qualityStatus"] = "NOK"
-                else:
-                    message.custom_properties["alertLevel"] = "normal"
-                    message.custom_properties["qualityStatus"] = "OK"
-                
-                # Add error code for routing
-                message.custom_properties["errorCode"] = str(error_code)
+                with self.profiler.stage("encode"):
+                    # Create message with JSON payload
+                    message_json = json.dumps(telemetry_data)
+                    message = Message(message_json)
+
+                    # Set message properties
+                    message.content_type = "application/json"
+                    message.content_encoding = "utf-8"
+
+                    # Add custom properties for routing and filtering
+                    message.custom_properties["iothub-creation-time-utc"] = datetime.now(
+                        timezone.utc
+                    ).isoformat()
+                    message.custom_properties["deviceType"] = "screw-robot"
+                    message.custom_properties["messageType"] = telemetry_data.get(
+                        "MessageType", "telemetry"
+                    )
+
+                    # Quality control routing
+                    cycle_ok = telemetry_data.get("CycleOK", True)
+                    error_code = telemetry_data.get("ErrorCode", 0)
+
+                    # Set alert level based on cycle status
+                    if not cycle_ok:
+                        message.custom_properties["alertLevel"] = "warning"
+                        message.custom_properties["qualityStatus"] = "NOK"
+                    else:
+                        message.custom_properties["alertLevel"] = "normal"
+                        message.custom_properties["qualityStatus"] = "OK"
+
+                    # Add error code for routing
+                    message.custom_properties["errorCode"] = str(error_code)
 
                 # Send message to IoT Hub
-                await self.client.send_message(message)
+                with self.profiler.stage("send_message"):
+                    await self.client.send_message(message)
 
                 self.messages_sent += 1
-                logger.info(
-                    f"{self.device_id}: Sent message #{self.messages_sent} "
-                    f"(CycleOK: {cycle_ok}, Error: {error_code})"
-                )
+                if self.telemetry_buffer and "MessageType" not in telemetry_data:
+                    self.telemetry_buffer.record(telemetry_data)
+                if self.log_aggregator:
+                    self.log_aggregator.record_sent(
+                        self.device_id, self.messages_sent, cycle_ok, error_code
+                    )
+                else:
+                    logger.info(
+                        "%s: Sent message #%d (CycleOK: %s, Error: %s)",
+                        self.device_id,
+                        self.messages_sent,
+                        cycle_ok,
+                        error_code,
+                    )
 
                 return True
 
-            except (ConnectionDroppedError, OperationTimeout) as e:
+            except (ConnectionDroppedError, NoConnectionError, OperationTimeout) as e:
+                if not self.client.connected:
+                    self._schedule_reconnect()
                 if attempt < max_retries - 1:
-                    wait_time = 2**attempt  # Exponential backoff
+                    # Jittered backoff keeps the fleet from retrying in lockstep
+                    wait_time = self.reconnect_coordinator.next_delay(wait_time)
                     logger.warning(
                         f"{self.device_id}: Message send failed (attempt {attempt + 1}/{max_retries}), "
-                        f"retrying in {wait_time}s... Error: {e}"
+                        f"retrying in {wait_time:.1f}s... Error: {e}"
                     )
                     await asyncio.sleep(wait_time)
                 else:
                     logger.error(
                         f"{self.device_id}: Failed to send message after {max_retries} attempts: {e}"
                     )
+                    if self.log_aggregator:
+                        self.log_aggregator.record_failed(self.device_id)
                     return False
 
             except Exception as e:
                 logger.error(f"{self.device_id}: Unexpected error sending message: {e}")
+                if self.log_aggregator:
+                    self.log_aggregator.record_failed(self.device_id)
                 return False
 
         return False
 
+    def effective_config(self) -> Dict[str, Any]:
+        """
+        Get the configuration this device runs with.
+
+        Returns:
+            Shared configuration, or a cached copy with this device's
+            overrides applied (rebuilt only after a reload or override change)
+        """
+        base = self.config_loader.get_config()
+        if not self.overrides:
+            return base
+        if base is not self._config_base:
+            self._config_base = base
+            self._config_effective = {**base, **self.overrides}
+        return self._config_effective
+
+    def set_overrides(self, overrides: Dict[str, Any]) -> None:
+        """
+        Replace this device's configuration overrides.
+        A pending wait is rescheduled so a new interval applies immediately.
+
+        Args:
+            overrides: Configuration keys and values (already validated)
+        """
+        self.overrides = dict(overrides)
+        self._config_base = None
+        if self._wake_handle is not None:
+            self._wake_handle.cancel()
+            remaining = (
+                self._sleep_started + self._next_sleep_time() - self._loop.time()
+            )
+            self._wake_handle = self._loop.call_later(max(0.0, remaining), self.wake)
+
+    def pause(self) -> None:
+        """
+        Stop generating events while keeping the connection open.
+        """
+        self.paused = True
+
+    def resume(self) -> None:
+        """
+        Resume generating events after pause().
+        """
+        self.paused = False
+        self.wake()
+
+    def wake(self) -> None:
+        """
+        End the current wait between operations early.
+        """
+        if self._wake_future is not None and not self._wake_future.done():
+            self._wake_future.set_result(None)
+
+    async def _wait(self, seconds: Optional[float]) -> None:
+        """
+        Sleep until the timeout or until wake() is called.
+
+        Args:
+            seconds: Timeout in seconds, or None to wait for wake() only
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wake_future = self._loop.create_future()
+        self._sleep_started = self._loop.time()
+        if seconds is not None:
+            self._wake_handle = self._loop.call_later(seconds, self.wake)
+        try:
+            await self._wake_future
+        finally:
+            if self._wake_handle is not None:
+                self._wake_handle.cancel()
+                self._wake_handle = None
+            self._wake_future = None
+
+    def _next_sleep_time(self) -> float:
+        """
+        Draw the interval until the next operation.
+
+        Returns:
+            Seconds (interval with jitter, at least 1 second)
+        """
+        config = self.effective_config()
+        base_interval = config["screwing_interval_seconds"]
+        jitter = config["interval_jitter_seconds"]
+        sleep_time = base_interval + random.uniform(-jitter, jitter)
+        return max(1, sleep_time)  # Minimum 1 second
+
     async def run(self) -> None:
         """
         Main simulation loop. Connects to IoT Hub and sends telemetry events.
         Reloads configuration before each screwing operation.
         """
         try:
-            # Connect to IoT Hub
-            await self.connect()
+            # Connect to IoT Hub (unless the fleet startup already did)
+            if self.client is None:
+                await self.connect()
 
             logger.info(f"{self.device_id}: Starting simulation loop")
 
-            while self.running:
+            while self.running and not self.stop_requested:
                 try:
-                    # Reload configuration if it has changed
-                    config_changed = self.config_loader.reload_if_changed()
-                    if config_changed:
-                        logger.info(
-                            f"{self.device_id}: Configuration reloaded, "
-                            "applying new settings"
-                        )
-
-                    # Get current configuration
-                    config = self.config_loader.get_config()
-
-                    # Generate screwing event telemetry
-                    telemetry = self.telemetry_generator.generate_screwing_event(
-                        config
-                    )
-
-                    # Send telemetry to IoT Hub
-                    await self.send_telemetry(telemetry)
+                    # Paused by the control API: wait until resumed or stopped
+                    if self.paused:
+                        await self._wait(None)
+                        continue
+
+                    # Reload configuration if it has changed (unless changes
+                    # are pushed through the control API instead)
+                    if self.config_loader.get_config()["config_hot_reload"]:
+                        with self.profiler.stage("config_reload"):
+                            config_changed = self.config_loader.reload_if_changed()
+                        if config_changed:
+                            logger.info(
+                                f"{self.device_id}: Configuration reloaded, "
+                                "applying new settings"
+                            )
+
+                    # Get current configuration (with any per-device overrides)
+                    config = self.effective_config()
+                    if config["reporting_mode"] != self.reporting_policy.mode:
+                        await self._switch_reporting_policy(config)
+
+                    # Skip operations during scheduled scenario downtime
+                    event_time = datetime.now(timezone.utc)
+                    epoch = event_time.timestamp()
+                    if not self.telemetry_generator.is_down(event_time):
+                        # Generate screwing event telemetry
+                        with self.profiler.stage("generate"):
+                            telemetry = (
+                                self.telemetry_generator.generate_screwing_event(
+                                    config, event_time
+                                )
+                            )
+                        if self.snapshot_aggregator:
+                            self.snapshot_aggregator.record(telemetry, epoch)
+                        if self.rollup_aggregator:
+                            self.rollup_aggregator.record(telemetry, epoch)
+
+                        # Send whatever the reporting policy lets through
+                        for message in self.reporting_policy.on_event(
+                            telemetry, epoch, config
+                        ):
+                            await self.deliver(message)
+
+                    for message in self.reporting_policy.poll(epoch, config):
+                        await self.deliver(message)
 
                     # Calculate sleep interval with jitter
-                    base_interval = config["screwing_interval_seconds"]
-                    jitter = config["interval_jitter_seconds"]
-                    sleep_time = base_interval + random.uniform(-jitter, jitter)
-                    sleep_time = max(1, sleep_time)  # Minimum 1 second
+                    sleep_time = self._next_sleep_time()
 
                     logger.debug(
-                        f"{self.device_id}: Waiting {sleep_time:.1f}s until next operation"
+                        "%s: Waiting %.1fs until next operation",
+                        self.device_id,
+                        sleep_time,
                     )
-                    await asyncio.sleep(sleep_time)
+                    with self.profiler.stage("sleep"):
+                        await self._wait(sleep_time)
 
                 except asyncio.CancelledError:
                     logger.info(f"{self.device_id}: Simulation cancelled")
@@ -227,16 +530,46 @@ class DeviceSimulator:
                     await asyncio.sleep(5)
 
         finally:
+            # Flush pending reporting state while still connected
+            await self._flush_reporting_policy()
+
             # Ensure disconnect is called
             await self.disconnect()
 
             # Log final statistics
             stats = self.telemetry_generator.get_statistics()
+            stats["reporting"] = self.reporting_policy.get_statistics()
             logger.info(f"{self.device_id}: Final statistics: {stats}")
 
+    async def _flush_reporting_policy(self) -> None:
+        """
+        Send the messages the current reporting policy still holds.
+        """
+        messages = self.reporting_policy.close(datetime.now(timezone.utc).timestamp())
+        if self.spool is None and not (self.client and self.client.connected):
+            return
+        for message in messages:
+            await self.deliver(message)
+
+    async def _switch_reporting_policy(self, config: dict) -> None:
+        """
+        Replace the reporting policy after REPORTING_MODE changed.
+
+        Args:
+            config: Current runtime configuration
+        """
+        await self._flush_reporting_policy()
+        logger.info(
+            f"{self.device_id}: Reporting mode {self.reporting_policy.mode} -> "
+            f"{config['reporting_mode']}"
+        )
+        self.reporting_policy = create_reporting_policy(self.device_id, config)
+
     async def stop(self) -> None:
         """
         Stop the simulation gracefully.
         """
         logger.info(f"{self.device_id}: Stopping simulation...")
+        self.stop_requested = True
         self.running = False
+        self.wake()
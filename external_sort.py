@@ -0,0 +1,194 @@
+"""
+External merge sort for machine-major historical output.
+Events are buffered in fixed-size runs, sorted by (MachineID, Timestamp) and
+spilled to temporary files; close() k-way merges the runs into the wrapped
+writer, so memory stays bounded by the run size whatever the dataset size.
+"""
+
+import heapq
+import logging
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Output orders accepted by --order
+OUTPUT_ORDERS = ("time", "machine")
+
+# Events held in memory before a sorted run is spilled (~1.5 KB each)
+DEFAULT_RUN_ROWS = 200_000
+
+# Events pickled together in a run file (also the read-ahead per run)
+BATCH_ROWS = 1000
+
+# Runs merged at once; more runs are merged in passes to bound open files
+MAX_FAN_IN = 128
+
+
+def _sort_key(telemetry: Dict[str, Any]) -> Tuple[str, str]:
+    # ISO timestamps from one generator share a time zone and sort as strings
+    return telemetry["MachineID"], telemetry["Timestamp"]
+
+
+class MachineOrderWriter:
+    """
+    Wraps a telemetry writer and re-orders its events by machine, then time.
+    """
+
+    def __init__(
+        self,
+        writer,
+        run_rows: int = DEFAULT_RUN_ROWS,
+        temp_dir: Optional[str] = None,
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            writer: Writer with write(telemetry) and close() receiving the
+                sorted events
+            run_rows: Events per sorted run (bounds memory use)
+            temp_dir: Directory for run files (default: system temp directory)
+
+        Raises:
+            ValueError: If run_rows is not positive
+        """
+        if run_rows < 1:
+            raise ValueError("run_rows must be positive")
+        self.writer = writer
+        self.run_rows = run_rows
+        self.records_written = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._runs: List[Path] = []
+        self._runs_written = 0
+        self._temp_dir = Path(tempfile.mkdtemp(prefix="telemetry_sort_", dir=temp_dir))
+        self._closed = False
+
+    def __enter__(self) -> "MachineOrderWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, telemetry: Dict[str, Any]) -> None:
+        """
+        Buffer one telemetry event, spilling a sorted run when the buffer is full.
+
+        Args:
+            telemetry: Telemetry event dictionary
+        """
+        self._buffer.append(telemetry)
+        if len(self._buffer) >= self.run_rows:
+            self._spill()
+
+    def _spill(self) -> None:
+        """
+        Sort the buffer and write it as a new run file.
+        """
+        if not self._buffer:
+            return
+        self._buffer.sort(key=_sort_key)
+        self._runs.append(self._write_run(self._buffer))
+        self._buffer = []
+
+    def _write_run(self, events) -> Path:
+        """
+        Write sorted events to a run file in pickled batches.
+
+        Args:
+            events: Iterable of telemetry events in sort order
+
+        Returns:
+            Run file path
+        """
+        path = self._temp_dir / f"run_{self._runs_written:06d}.pkl"
+        self._runs_written += 1
+        with open(path, "wb") as f:
+            batch = []
+            for telemetry in events:
+                batch.append(telemetry)
+                if len(batch) == BATCH_ROWS:
+                    pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+                    batch = []
+            if batch:
+                pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+        return path
+
+    @staticmethod
+    def _read_run(path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the events of a run file.
+
+        Args:
+            path: Run file
+
+        Yields:
+            Telemetry events in sort order
+        """
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+
+    def _merge(self, runs: List[Path]) -> Iterator[Dict[str, Any]]:
+        """
+        K-way merge run files.
+
+        Args:
+            runs: Run files to merge
+
+        Returns:
+            Iterator over the events of all runs in sort order
+        """
+        return heapq.merge(*(self._read_run(path) for path in runs), key=_sort_key)
+
+    def close(self) -> None:
+        """
+        Merge all runs into the wrapped writer and close it.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if not self._runs:
+                # Everything fit in memory: no temporary files needed
+                self._buffer.sort(key=_sort_key)
+                events = iter(self._buffer)
+            else:
+                self._spill()
+                while len(self._runs) > MAX_FAN_IN:
+                    group = self._runs[:MAX_FAN_IN]
+                    merged = self._write_run(self._merge(group))
+                    for path in group:
+                        path.unlink()
+                    self._runs = self._runs[MAX_FAN_IN:] + [merged]
+                logger.info(f"Merging {len(self._runs)} sorted runs into machine order")
+                events = self._merge(self._runs)
+
+            for telemetry in events:
+                self.writer.write(telemetry)
+                self.records_written += 1
+            self._buffer = []
+        finally:
+            self.writer.close()
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+    def discard(self) -> None:
+        """
+        Drop buffered events and run files and close the wrapped writer.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._buffer = []
+        self.writer.close()
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
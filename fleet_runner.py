@@ -0,0 +1,612 @@
+"""
+Multi-process fleet runner for the live simulator.
+Splits the device list across worker processes, each with its own event loop
+and IoT Hub connections, and supervises them from a parent process.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from config_loader import ConfigLoader
+from profiler import create_profiler
+from log_aggregator import TelemetryLogAggregator
+from machine_snapshot import MachineSnapshotAggregator
+from telemetry_buffer import TelemetryBuffer
+from spool import TelemetrySpool
+from hub_ring import HubRing
+from network_impairment import NetworkImpairment
+from rollups import RollupAggregator
+
+logger = logging.getLogger(__name__)
+
+# Seconds between per-process statistics reports sent to the parent
+STATS_REPORT_INTERVAL = 10.0
+
+# Seconds between aggregated fleet statistics log lines in the parent
+FLEET_LOG_INTERVAL = 60.0
+
+# Set in a worker when it receives SIGTERM directly (not via the parent)
+_terminate_requested = False
+
+
+def split_devices(num_devices: int, num_processes: int) -> List[List[int]]:
+    """
+    Split device indices round-robin across worker processes.
+
+    Args:
+        num_devices: Total number of devices in the fleet
+        num_processes: Number of worker processes
+
+    Returns:
+        One list of zero-based device indices per worker (empty workers dropped)
+    """
+    shares = [
+        list(range(worker, num_devices, num_processes))
+        for worker in range(num_processes)
+    ]
+    return [share for share in shares if share]
+
+
+def _install_uvloop() -> bool:
+    """
+    Use uvloop as the event loop implementation if it is installed.
+
+    Returns:
+        True if uvloop was installed, False otherwise
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def _collect_stats(worker_index: int, simulators: list, final: bool) -> Dict[str, Any]:
+    """
+    Build a statistics report for the parent process.
+
+    Args:
+        worker_index: Index of the reporting worker
+        simulators: Simulators owned by the worker
+        final: Whether this is the worker's last report
+
+    Returns:
+        Picklable statistics dictionary
+    """
+    devices = {}
+    for simulator in simulators:
+        stats = simulator.telemetry_generator.get_statistics()
+        devices[simulator.device_id] = {
+            "messagesSent": simulator.messages_sent,
+            "hub": simulator.hostname,
+            "totalOperations": stats["totalOperations"],
+            "operationalHours": stats["operationalHours"],
+            "bitRotationCounter": stats["bitRotationCounter"],
+            "bitReplacements": stats["bitReplacements"],
+            "componentHealth": dict(stats["componentHealth"]),
+        }
+
+    return {
+        "worker": worker_index,
+        "pid": os.getpid(),
+        "final": final,
+        "time": time.time(),
+        "devices": devices,
+    }
+
+
+async def _worker_main(
+    worker_index: int,
+    num_workers: int,
+    device_indices: List[int],
+    stop_event,
+    stats_queue,
+    profile_output: Optional[str],
+    warm_states: Dict[str, Dict[str, Any]],
+    scenario_origin: datetime,
+) -> None:
+    """
+    Run one worker's share of the fleet on its own event loop.
+
+    Args:
+        worker_index: Index of this worker
+        num_workers: Total number of workers sharing the startup rate limit
+        device_indices: Zero-based indices of the devices to simulate
+        stop_event: Shared event set by the parent to request shutdown
+        stats_queue: Queue for statistics reports to the parent
+        profile_output: Profile report prefix, or None when profiling is off
+        warm_states: Last reported state per device, restored after a restart
+        scenario_origin: Fleet start that relative scenario window times count
+            from (unchanged across worker restarts)
+    """
+    # Imported lazily to avoid a circular import with main.py
+    from main import (
+        create_control_plane,
+        create_simulators,
+        setup_logging,
+        start_control_api,
+        start_query_api,
+        start_simulators,
+        stop_logging,
+    )
+
+    config_loader = ConfigLoader(".env")
+    config = config_loader.get_config()
+    setup_logging(config["log_level"], config["log_mode"])
+
+    profiler = create_profiler(
+        profile_output is not None, f"{profile_output}.worker{worker_index + 1}"
+    )
+    profiler.start()
+
+    log_aggregator = TelemetryLogAggregator.from_config(config)
+    summary_task = asyncio.create_task(log_aggregator.run()) if log_aggregator else None
+
+    snapshot_aggregator = MachineSnapshotAggregator.from_config(config, worker_index)
+    snapshot_task = (
+        asyncio.create_task(snapshot_aggregator.run()) if snapshot_aggregator else None
+    )
+
+    rollup_aggregator = RollupAggregator.from_config(config, worker_index)
+    rollup_task = (
+        asyncio.create_task(rollup_aggregator.run()) if rollup_aggregator else None
+    )
+
+    # Worker N serves its own devices on QUERY_API_PORT + N - 1
+    telemetry_buffer = TelemetryBuffer.from_config(config)
+    query_api = await start_query_api(config, telemetry_buffer, worker_index)
+
+    # Each worker spools to its own subdirectory of SPOOL_DIR
+    spool = TelemetrySpool.from_config(config, worker_index)
+    if spool and query_api:
+        spool.add_routes(query_api)
+
+    # Hub assignment is a pure function of the device ID, so workers agree on
+    # it; each worker enforces its share of the per-hub device limit
+    hub_ring = HubRing.from_config(config, num_workers)
+
+    # Each worker runs the impairment script and writes its own report
+    impairment = NetworkImpairment.from_config(config, worker_index)
+
+    simulators = create_simulators(
+        config_loader,
+        device_indices,
+        profiler,
+        log_aggregator,
+        snapshot_aggregator,
+        telemetry_buffer,
+        spool=spool,
+        hub_ring=hub_ring,
+        impairment=impairment,
+        rollup_aggregator=rollup_aggregator,
+        scenario_origin=scenario_origin,
+    )
+    if query_api:
+        hub_ring.add_routes(query_api, simulators)
+
+    # Continue where a crashed predecessor left off
+    for simulator in simulators:
+        state = warm_states.get(simulator.device_id)
+        if state:
+            simulator.telemetry_generator.warm_start(state)
+    stopping = False
+
+    # Worker N accepts control requests for its devices on CONTROL_API_PORT + N - 1
+    control_plane = create_control_plane(
+        config_loader,
+        simulators,
+        device_indices,
+        profiler,
+        log_aggregator,
+        snapshot_aggregator,
+        telemetry_buffer,
+        spool,
+        hub_ring,
+        impairment,
+        rollup_aggregator,
+        worker_index,
+        num_workers,
+        scenario_origin,
+    )
+    control_api = await start_control_api(config, control_plane, worker_index)
+    spool_task = (
+        asyncio.create_task(spool.run(control_plane.devices.get)) if spool else None
+    )
+
+    async def report_stats() -> None:
+        """Forward stats periodically and watch for the parent's stop request."""
+        nonlocal stopping
+        next_report = time.monotonic() + STATS_REPORT_INTERVAL
+        while not stopping:
+            await asyncio.sleep(0.5)
+            if stop_event.is_set() or _terminate_requested:
+                stopping = True
+                await asyncio.gather(
+                    *(simulator.stop() for simulator in simulators),
+                    return_exceptions=True,
+                )
+            elif time.monotonic() >= next_report:
+                stats_queue.put(_collect_stats(worker_index, simulators, final=False))
+                next_report += STATS_REPORT_INTERVAL
+
+    reporter = asyncio.create_task(report_stats())
+    try:
+        # Each worker gets an equal share of the fleet-wide startup limits
+        tasks = await start_simulators(
+            simulators,
+            connect_rate=config["startup_connect_rate"] / num_workers,
+            max_inflight=max(1, config["startup_max_inflight"] // num_workers),
+        )
+        control_plane.track(tasks)
+        await control_plane.join()
+    finally:
+        stopping = True
+        reporter.cancel()
+        for server in (query_api, control_api):
+            if server:
+                await server.stop()
+        for task in (summary_task, snapshot_task, rollup_task, spool_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if impairment:
+            impairment.close()
+        stats_queue.put(_collect_stats(worker_index, simulators, final=True))
+        profiler.stop()
+        profiler.log_summary()
+        stop_logging()
+
+
+def worker_entry(
+    worker_index: int,
+    num_workers: int,
+    device_indices: List[int],
+    stop_event,
+    stats_queue,
+    use_uvloop: bool,
+    profile_output: Optional[str],
+    warm_states: Dict[str, Dict[str, Any]],
+    scenario_origin: datetime,
+) -> None:
+    """
+    Process entry point for a fleet worker.
+
+    Args:
+        worker_index: Index of this worker
+        num_workers: Total number of workers
+        device_indices: Zero-based indices of the devices to simulate
+        stop_event: Shared event set by the parent to request shutdown
+        stats_queue: Queue for statistics reports to the parent
+        use_uvloop: Whether to run the event loop on uvloop
+        profile_output: Profile report prefix, or None when profiling is off
+        warm_states: Last reported state per device, restored after a restart
+        scenario_origin: Fleet start that relative scenario window times count from
+    """
+    # The parent owns Ctrl+C handling and fans shutdown out via stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def terminate_handler(signum, frame):
+        """Stop only this worker when it is terminated directly."""
+        global _terminate_requested
+        _terminate_requested = True
+
+    signal.signal(signal.SIGTERM, terminate_handler)
+
+    if use_uvloop and not _install_uvloop():
+        logging.getLogger(__name__).warning(
+            "uvloop requested but not installed, using the default event loop"
+        )
+
+    asyncio.run(
+        _worker_main(
+            worker_index,
+            num_workers,
+            device_indices,
+            stop_event,
+            stats_queue,
+            profile_output,
+            warm_states,
+            scenario_origin,
+        )
+    )
+
+
+class FleetSupervisor:
+    """
+    Starts, monitors and restarts simulator worker processes.
+    Aggregates per-process statistics and fans shutdown signals out.
+    """
+
+    def __init__(
+        self,
+        num_processes: int,
+        use_uvloop: bool = False,
+        max_restarts: int = 5,
+        restart_delay: float = 5.0,
+        profile_output: Optional[str] = None,
+    ):
+        """
+        Initialize the fleet supervisor.
+
+        Args:
+            num_processes: Number of worker processes to run
+            use_uvloop: Whether workers run their event loop on uvloop
+            max_restarts: Maximum restarts per worker after crashes
+            restart_delay: Seconds to wait before restarting a crashed worker
+            profile_output: Profile report prefix, or None when profiling is off
+        """
+        self.num_processes = num_processes
+        self.use_uvloop = use_uvloop
+        self.max_restarts = max_restarts
+        self.restart_delay = restart_delay
+        self.profile_output = profile_output
+
+        # Spawn keeps behaviour identical on Windows and Linux
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.stats_queue = self.context.Queue()
+
+        self.assignments: List[List[int]] = []
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.restarts: Dict[int, int] = {}
+        self.pending_restarts: Dict[int, float] = {}
+        # Latest report per worker incarnation, keyed by (worker, pid)
+        self.reports: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self.stopping = False
+        # Relative scenario window times count from the fleet start, also in
+        # restarted workers
+        self.scenario_origin = datetime.now(timezone.utc)
+
+    def _start_worker(self, worker_index: int) -> None:
+        """
+        Start (or restart) the process for one worker.
+
+        Args:
+            worker_index: Index of the worker to start
+        """
+        process = self.context.Process(
+            target=worker_entry,
+            name=f"fleet-worker-{worker_index + 1}",
+            args=(
+                worker_index,
+                len(self.assignments),
+                self.assignments[worker_index],
+                self.stop_event,
+                self.stats_queue,
+                self.use_uvloop,
+                self.profile_output,
+                self._warm_states(worker_index),
+                self.scenario_origin,
+            ),
+        )
+        process.start()
+        self.processes[worker_index] = process
+        logger.info(
+            f"Started worker {worker_index + 1} (pid {process.pid}) with "
+            f"{len(self.assignments[worker_index])} devices"
+        )
+
+    def _warm_states(self, worker_index: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the latest reported state of a worker's devices.
+
+        Args:
+            worker_index: Index of the worker being (re)started
+
+        Returns:
+            Dictionary of device_id to state (empty on first start)
+        """
+        latest: Dict[str, Dict[str, Any]] = {}
+        reports = sorted(
+            (r for (w, _pid), r in self.reports.items() if w == worker_index),
+            key=lambda r: r["time"],
+        )
+        for report in reports:
+            latest.update(report["devices"])
+        return latest
+
+    def request_stop(self, signal_name: Optional[str] = None) -> None:
+        """
+        Ask all workers to shut down gracefully.
+
+        Args:
+            signal_name: Name of the signal that triggered the stop (optional)
+        """
+        if self.stopping:
+            return
+        self.stopping = True
+        if signal_name:
+            logger.info(f"Received signal {signal_name}, stopping all workers...")
+        else:
+            logger.info("Stopping all workers...")
+        self.stop_event.set()
+
+    def _drain_stats(self, timeout: float) -> None:
+        """
+        Read pending statistics reports from the workers.
+
+        Args:
+            timeout: Seconds to wait for the first report
+        """
+        try:
+            report = self.stats_queue.get(timeout=timeout)
+            while True:
+                self.reports[(report["worker"], report["pid"])] = report
+                report = self.stats_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _check_workers(self) -> None:
+        """
+        Detect exited workers and schedule restarts for crashed ones.
+        """
+        now = time.monotonic()
+
+        for worker_index, process in list(self.processes.items()):
+            if process.is_alive() or worker_index in self.pending_restarts:
+                continue
+
+            if process.exitcode == 0 or self.stopping:
+                continue
+
+            restarts = self.restarts.get(worker_index, 0)
+            if restarts >= self.max_restarts:
+                logger.error(
+                    f"Worker {worker_index + 1} crashed (exit code {process.exitcode}), "
+                    f"restart limit of {self.max_restarts} reached"
+                )
+                self.processes.pop(worker_index)
+                continue
+
+            logger.warning(
+                f"Worker {worker_index + 1} crashed (exit code {process.exitcode}), "
+                f"restarting in {self.restart_delay:.0f}s "
+                f"({restarts + 1}/{self.max_restarts})"
+            )
+            self.restarts[worker_index] = restarts + 1
+            self.pending_restarts[worker_index] = now + self.restart_delay
+
+        for worker_index, due in list(self.pending_restarts.items()):
+            if self.stopping:
+                self.pending_restarts.pop(worker_index)
+            elif now >= due:
+                self.pending_restarts.pop(worker_index)
+                self._start_worker(worker_index)
+
+    def aggregate_statistics(self) -> Dict[str, Any]:
+        """
+        Aggregate the latest reports of all worker incarnations.
+
+        Returns:
+            Fleet-wide statistics dictionary
+        """
+        totals = {
+            "workers": len(self.assignments),
+            "devices": sum(len(share) for share in self.assignments),
+            "messagesSent": 0,
+            "totalOperations": 0,
+            "restarts": sum(self.restarts.values()),
+        }
+        per_worker: Dict[int, int] = {}
+        per_hub: Dict[str, int] = {}
+        # Operation counters carry over restarts (warm start), so only the
+        # newest report per device counts; message counters are per incarnation
+        latest_operations: Dict[str, int] = {}
+
+        for (worker_index, _pid), report in sorted(
+            self.reports.items(), key=lambda item: item[1]["time"]
+        ):
+            for device_id, device_stats in report["devices"].items():
+                totals["messagesSent"] += device_stats["messagesSent"]
+                latest_operations[device_id] = device_stats["totalOperations"]
+                per_worker[worker_index] = (
+                    per_worker.get(worker_index, 0) + device_stats["messagesSent"]
+                )
+                hub = device_stats.get("hub", "")
+                per_hub[hub] = per_hub.get(hub, 0) + device_stats["messagesSent"]
+
+        totals["totalOperations"] = sum(latest_operations.values())
+
+        totals["messagesPerWorker"] = {
+            f"worker-{index + 1}": count for index, count in sorted(per_worker.items())
+        }
+        totals["messagesPerHub"] = dict(sorted(per_hub.items()))
+        return totals
+
+    def run(self, num_devices: int) -> Dict[str, Any]:
+        """
+        Run the fleet until all workers exit or a shutdown is requested.
+
+        Args:
+            num_devices: Total number of devices in the fleet
+
+        Returns:
+            Final aggregated fleet statistics
+        """
+        self.assignments = split_devices(num_devices, self.num_processes)
+        logger.info(
+            f"Starting {len(self.assignments)} worker processes for {num_devices} devices"
+            f"{' (uvloop)' if self.use_uvloop else ''}"
+        )
+
+        def signal_handler(signum, frame):
+            """Handle shutdown signals in the parent."""
+            self.request_stop(signal.Signals(signum).name)
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+        for worker_index in range(len(self.assignments)):
+            self._start_worker(worker_index)
+
+        started = time.monotonic()
+        next_log = started + FLEET_LOG_INTERVAL
+
+        while any(p.is_alive() for p in self.processes.values()) or self.pending_restarts:
+            self._drain_stats(timeout=1.0)
+            self._check_workers()
+
+            if time.monotonic() >= next_log:
+                stats = self.aggregate_statistics()
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Fleet: {stats['messagesSent']:,} messages sent "
+                    f"({stats['messagesSent'] / elapsed:.1f} msg/s), "
+                    f"{stats['restarts']} worker restarts"
+                )
+                if len(stats["messagesPerHub"]) > 1:
+                    hub_rates = ", ".join(
+                        f"{hub} {count / elapsed:.1f} msg/s"
+                        for hub, count in stats["messagesPerHub"].items()
+                    )
+                    logger.info(f"Fleet per hub: {hub_rates}")
+                next_log += FLEET_LOG_INTERVAL
+
+        for process in self.processes.values():
+            process.join()
+
+        # Collect final reports flushed by exiting workers
+        self._drain_stats(timeout=0.5)
+
+        stats = self.aggregate_statistics()
+        logger.info(f"Fleet final statistics: {stats}")
+        return stats
+
+
+def run_fleet(
+    num_processes: int,
+    use_uvloop: bool = False,
+    profile_output: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run the configured fleet across multiple worker processes.
+
+    Args:
+        num_processes: Number of worker processes
+        use_uvloop: Whether workers run their event loop on uvloop
+        profile_output: Profile report prefix, or None when profiling is off
+
+    Returns:
+        Final aggregated fleet statistics
+    """
+    config = ConfigLoader(".env").get_config()
+
+    from main import print_banner, setup_logging
+
+    setup_logging(config["log_level"])
+    print_banner(config)
+
+    supervisor = FleetSupervisor(
+        num_processes=num_processes,
+        use_uvloop=use_uvloop,
+        profile_output=profile_output,
+    )
+    return supervisor.run(config["num_devices"])
@@ -4,15 +4,25 @@ Creates CSV file with 1-minute resolution data for all 10 devices.
 """
 
 import csv
+import json
+import math
 import random
 import uuid
 import logging
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 from config_loader import ConfigLoader
 from telemetry_generator import TelemetryGenerator
+from profiler import NULL_PROFILER, create_profiler
+from scenario import load_schedules
+from rollups import RollupAggregator, parse_resolutions
+from dataset_cache import DatasetCache, code_version, file_digest, fingerprint
+from external_sort import DEFAULT_RUN_ROWS, OUTPUT_ORDERS, MachineOrderWriter
+from timelines import (
+    TIMELINES, fixed_events, jittered_events, parse_shifts, shift_fraction
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,122 +30,455 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Output formats accepted by --format
+OUTPUT_FORMATS = ("csv", "binary")
+
+CSV_FIELDNAMES = [
+    "Timestamp",
+    "MachineID",
+    "ProductID",
+    "ScrewPosition",
+    "TargetTorque",
+    "ActualTorque",
+    "TargetAngle",
+    "ActualAngle",
+    "PulseCount",
+    "CycleOK",
+    "CycleTime_ms",
+    "SpindleRotationCounter",
+    "BitRotationCounter",
+    "ErrorCode"
+]
+
+# Settings that shape generated data (part of the dataset cache key)
+GENERATION_CONFIG_KEYS = (
+    "device_id_prefix",
+    "screwing_interval_seconds",
+    "interval_jitter_seconds",
+    "constant_speed_rpm",
+    "anomaly_rate",
+    "temp_anomaly_threshold",
+    "vibration_spike_threshold",
+    "speed_variance_percent",
+    "enable_degradation",
+    "bit_lifetime_rotations",
+    "bit_lifetime_noise_percent",
+)
+
+# Source files whose contents version the dataset cache
+GENERATION_SOURCES = (
+    "generate_historical_data.py",
+    "telemetry_generator.py",
+    "degradation_model.py",
+    "scenario.py",
+    "timelines.py",
+    "external_sort.py",
+    "binary_store.py",
+    "rollups.py",
+    "config_loader.py",
+)
+
+# Sidecar index of bit replacements, <output stem>.replacements.csv
+REPLACEMENT_INDEX_FIELDNAMES = [
+    "MachineID",
+    "Timestamp",
+    "RowOffset",
+    "RotationsAtReplacement",
+]
+
+
+class CsvTelemetryWriter:
+    """
+    Writes telemetry events as CSV rows (the default output format).
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize the writer.
+
+        Args:
+            path: Output CSV file
+        """
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(
+            self._file, fieldnames=CSV_FIELDNAMES, extrasaction='ignore'
+        )
+        self._writer.writeheader()
+
+    def __enter__(self) -> "CsvTelemetryWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, telemetry: Dict[str, Any]) -> None:
+        """
+        Append one telemetry event.
+
+        Args:
+            telemetry: Telemetry event dictionary
+        """
+        self._writer.writerow(telemetry)
+
+    def close(self) -> None:
+        """Close the output file."""
+        self._file.close()
+
+
+def create_writer(
+    output_format: str,
+    path: Path,
+    order: str = "time",
+    sort_run_rows: int = DEFAULT_RUN_ROWS
+):
+    """
+    Create a telemetry writer for an output format.
+
+    Args:
+        output_format: "csv" or "binary"
+        path: Output file
+        order: "time" (rows interleaved across machines as generated) or
+            "machine" (sorted by MachineID, then Timestamp); binary stores
+            are always machine-major
+        sort_run_rows: Events per sorted run for order="machine"
+
+    Returns:
+        Writer with write(telemetry) and close(), usable as a context manager
+    """
+    if output_format == "binary":
+        from binary_store import BinaryStoreWriter
+        return BinaryStoreWriter(path)
+    if order == "machine":
+        return MachineOrderWriter(CsvTelemetryWriter(path), sort_run_rows)
+    return CsvTelemetryWriter(path)
+
+
+def replacement_index_path(output_path: Path) -> Path:
+    """
+    Path of the bit replacement index written next to an output file.
+
+    Args:
+        output_path: Telemetry output file
+
+    Returns:
+        <output stem>.replacements.csv in the same directory
+    """
+    return output_path.with_name(f"{output_path.stem}.replacements.csv")
+
+
+def write_replacement_index(path: Path, events: List[Dict[str, Any]]) -> None:
+    """
+    Write the bit replacement index.
+
+    Args:
+        path: Index file
+        events: Rows with REPLACEMENT_INDEX_FIELDNAMES keys, in row order
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=REPLACEMENT_INDEX_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(events)
+
+
+def output_files(
+    output_path: Path,
+    output_format: str,
+    rollups: Optional[List[str]] = None
+) -> Dict[str, Path]:
+    """
+    List every file a run writes.
+
+    Args:
+        output_path: Main output file
+        output_format: "csv" or "binary"
+        rollups: Rollup resolutions (optional)
+
+    Returns:
+        Path per file suffix relative to the output stem ("" for the output)
+    """
+    files = {
+        "": output_path,
+        ".replacements.csv": replacement_index_path(output_path),
+    }
+    if output_format == "binary":
+        from binary_store import index_path
+        files[".index.json"] = index_path(output_path)
+    for resolution in rollups or []:
+        files[f"_{resolution}.csv"] = output_path.with_name(
+            f"{output_path.stem}_{resolution}.csv"
+        )
+    return files
+
+
+def estimate_records(
+    num_devices: int,
+    days_back: int,
+    interval_minutes: int,
+    config: Dict[str, Any],
+    timeline: str = "fixed",
+    shifts: Optional[List[Tuple[int, int]]] = None
+) -> int:
+    """
+    Estimate how many events a run produces (ignoring scenario downtime).
+
+    Args:
+        num_devices: Number of devices to simulate
+        days_back: Number of days to generate
+        interval_minutes: Tick of the fixed timeline
+        config: Configuration (SCREWING_INTERVAL_SECONDS for jittered timelines)
+        timeline: "fixed" or "jittered"
+        shifts: Shift windows from timelines.parse_shifts() (optional)
+
+    Returns:
+        Expected number of records
+    """
+    if timeline == "jittered":
+        per_day = 86400 / config["screwing_interval_seconds"]
+    else:
+        per_day = 24 * 60 / interval_minutes
+    fraction = shift_fraction(shifts)
+    if not fraction:
+        return 0
+    # Round up: short shifts must not estimate an empty run
+    return max(1, math.ceil(num_devices * days_back * per_day * fraction))
+
 
 def generate_historical_data(
     num_devices: int = 10,
     days_back: int = 30,
     interval_minutes: int = 1,
-    output_file: str = "historical_telemetry.csv"
+    output_file: str = "historical_telemetry.csv",
+    profiler=NULL_PROFILER,
+    start_hours: float = 0.0,
+    scenario_file: str = "",
+    output_format: str = "csv",
+    rollups: Optional[List[str]] = None,
+    order: str = "time",
+    sort_run_rows: int = DEFAULT_RUN_ROWS,
+    timeline: str = "fixed",
+    rate_spread_percent: float = 0.0,
+    shifts: Optional[List[Tuple[int, int]]] = None,
+    seed: Optional[int] = None,
+    end: Optional[datetime] = None,
+    use_cache: bool = True
 ) -> None:
     """
-    Generate historical telemetry data and save to CSV.
+    Generate historical telemetry data and save to CSV or a binary store.
     
     Args:
         num_devices: Number of devices to simulate
         days_back: Number of days in the past to generate data for
         interval_minutes: Interval between events in minutes
-        output_file: Output CSV filename
+        output_file: Output filename
+        profiler: Stage profiler (no-op unless --profile was given)
+        start_hours: Operational hours each device has before the first event
+        scenario_file: Optional scenario file; relative window times count
+            from the start of the generated period
+        output_format: "csv" or "binary" (see binary_store.py)
+        rollups: Rollup resolutions ("minute", "hour", "day") written in the
+            same pass to <output stem>_<resolution>.csv (optional)
+        order: "time" or "machine" (CSV sorted by MachineID, then Timestamp,
+            via an external merge sort)
+        sort_run_rows: Events held in memory per sorted run for order="machine"
+        timeline: "fixed" (every device on the same interval_minutes tick) or
+            "jittered" (independent per-device clocks firing every
+            SCREWING_INTERVAL_SECONDS ± INTERVAL_JITTER_SECONDS, as live)
+        rate_spread_percent: Per-device interval spread for jittered timelines
+        shifts: Shift windows from timelines.parse_shifts(); no events
+            outside them (default: around the clock)
+        seed: Seed for the random number generator (reproducible output)
+        end: End of the generated period (default: now)
+        use_cache: Look up and store the dataset in DATASET_CACHE_DIR; only
+            runs with both a seed and an end are cached
+
+    Bit replacements are indexed in <output stem>.replacements.csv: one row per
+    replacement with the machine, the timestamp and 0-based data row (record
+    index in binary stores) of the first event on the new bit, and the
+    rotations of the replaced bit.
     """
     logger.info(f"Starting historical data generation:")
     logger.info(f"  - Devices: {num_devices}")
     logger.info(f"  - Period: {days_back} days")
-    logger.info(f"  - Resolution: {interval_minutes} minute(s)")
+    
+    # Load simulation settings only; generation needs no IoT Hub secrets
+    config_loader = ConfigLoader(validate_transport=False)
+    config = config_loader.get_config()
+    
+    if timeline == "jittered":
+        logger.info(
+            f"  - Timeline: per-device, {config['screwing_interval_seconds']}s "
+            f"± {config['interval_jitter_seconds']}s, "
+            f"rate spread ±{rate_spread_percent:g}%"
+        )
+    else:
+        logger.info(f"  - Resolution: {interval_minutes} minute(s)")
     
     # Calculate time range
-    end_time = datetime.now(timezone.utc)
+    end_time = end or datetime.now(timezone.utc)
     start_time = end_time - timedelta(days=days_back)
-    total_records = num_devices * days_back * 24 * (60 // interval_minutes)
+    total_records = estimate_records(
+        num_devices, days_back, interval_minutes, config, timeline, shifts
+    )
     
     logger.info(f"  - Start: {start_time.isoformat()}")
     logger.info(f"  - End: {end_time.isoformat()}")
     logger.info(f"  - Expected records: {total_records:,}")
     
-    # Load configuration
-    config_loader = ConfigLoader()
-    config = config_loader.get_config()
+    output_path = Path(output_file)
+    files = output_files(output_path, output_format, rollups)
+    
+    # Identical parameters, settings, seed and code give an identical dataset
+    cache = DatasetCache.from_config(config) if use_cache else None
+    cache_key = None
+    if cache is not None and (seed is None or end is None):
+        logger.info("Dataset cache skipped: pass --seed and --end to cache this run")
+    elif cache is not None:
+        spec = {
+            "params": {
+                "num_devices": num_devices,
+                "days_back": days_back,
+                "interval_minutes": interval_minutes,
+                "start_hours": start_hours,
+                "scenario": file_digest(scenario_file) if scenario_file else "",
+                "output_format": output_format,
+                "rollups": rollups or [],
+                "order": order,
+                "timeline": timeline,
+                "rate_spread_percent": rate_spread_percent,
+                "shifts": shifts or [],
+                "seed": seed,
+                "end": end_time.isoformat(),
+            },
+            "config": {key: config[key] for key in GENERATION_CONFIG_KEYS},
+            "code": code_version(
+                Path(__file__).with_name(name) for name in GENERATION_SOURCES
+            ),
+        }
+        cache_key = fingerprint(spec)
+        manifest = cache.restore(cache_key, files)
+        if manifest is not None:
+            logger.info(
+                f"✓ Dataset cache hit {cache_key[:12]}: linked {len(files)} "
+                f"file(s) ({manifest['bytes'] / 1024 / 1024:.2f} MB) from {cache.root}"
+            )
+            logger.info(f"  - Output: {output_path.absolute()}")
+            return
+        logger.info(f"Dataset cache miss {cache_key[:12]}: generating")
+    
+    if seed is not None:
+        random.seed(seed)
+    
+    # Replace outputs instead of truncating them: they may be hard links into
+    # the dataset cache
+    for path in files.values():
+        path.unlink(missing_ok=True)
     
     # Create telemetry generators for each device
     device_id_prefix = config["device_id_prefix"]
+    device_ids = [f"{device_id_prefix}-{i:03d}" for i in range(1, num_devices + 1)]
+    schedules = load_schedules(scenario_file, device_ids, start_time)
     generators = {}
-    for i in range(1, num_devices + 1):
-        device_id = f"{device_id_prefix}-{i:03d}"
-        generators[device_id] = TelemetryGenerator(device_id)
+    for device_id in device_ids:
+        generators[device_id] = TelemetryGenerator(device_id, schedules.get(device_id))
+        generators[device_id].fast_forward(start_hours, config)
     
     logger.info(f"Initialized {len(generators)} telemetry generators")
     
-    # Prepare CSV file
-    output_path = Path(output_file)
-    fieldnames = [
-        "Timestamp",
-        "MachineID",
-        "ProductID",
-        "ScrewPosition",
-        "TargetTorque",
-        "ActualTorque",
-        "TargetAngle",
-        "ActualAngle",
-        "PulseCount",
-        "CycleOK",
-        "CycleTime_ms",
-        "SpindleRotationCounter",
-        "BitRotationCounter",
-        "ErrorCode"
-    ]
-    
     records_written = 0
-    progress_interval = total_records // 20  # Report progress every 5%
+    device_rows = dict.fromkeys(device_ids, 0)
+    # Binary stores are always rewritten machine-major
+    machine_major = order == "machine" or output_format == "binary"
+    replacements: List[Dict[str, Any]] = []
+    progress_interval = max(1, total_records // 20)  # Report progress every 5%
     
     logger.info(f"Writing data to: {output_path.absolute()}")
     
-    with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        # Generate data for each timestamp
-        current_time = start_time
-        
-        while current_time <= end_time:
-            # Generate event for each device at this timestamp
-            for device_id, generator in generators.items():
-                # Generate telemetry event
-                telemetry = generator.generate_screwing_event(config)
-                
-                # Override timestamp with historical time
-                telemetry["Timestamp"] = current_time.isoformat()
-                
-                # CSV row with new schema (no flattening needed)
-                row = {
+    rollup_aggregator = (
+        RollupAggregator.for_output(output_path, rollups) if rollups else None
+    )
+    
+    # Lazily produced (event time, device ID) stream in time order
+    if timeline == "jittered":
+        events = jittered_events(
+            device_ids,
+            start_time,
+            end_time,
+            config["screwing_interval_seconds"],
+            config["interval_jitter_seconds"],
+            rate_spread_percent,
+            shifts or (),
+        )
+    else:
+        events = fixed_events(
+            device_ids, start_time, end_time, interval_minutes, shifts or ()
+        )
+    
+    with create_writer(output_format, output_path, order, sort_run_rows) as writer:
+        for current_time, device_id in events:
+            generator = generators[device_id]
+            
+            # No events during scheduled scenario downtime
+            if generator.is_down(current_time):
+                continue
+
+            # Generate telemetry event at the historical time
+            with profiler.stage("generate"):
+                telemetry = generator.generate_screwing_event(config, current_time)
+            
+            with profiler.stage("encode"):
+                writer.write(telemetry)
+            if rollup_aggregator:
+                with profiler.stage("rollup"):
+                    rollup_aggregator.record(telemetry, current_time.timestamp())
+            if generator.replaced_bit_rotations is not None:
+                replacements.append({
+                    "MachineID": device_id,
                     "Timestamp": telemetry["Timestamp"],
-                    "MachineID": telemetry["MachineID"],
-                    "ProductID": telemetry["ProductID"],
-                    "ScrewPosition": telemetry["ScrewPosition"],
-                    "TargetTorque": telemetry["TargetTorque"],
-                    "ActualTorque": telemetry["ActualTorque"],
-                    "TargetAngle": telemetry["TargetAngle"],
-                    "ActualAngle": telemetry["ActualAngle"],
-                    "PulseCount": telemetry["PulseCount"],
-                    "CycleOK": telemetry["CycleOK"],
-                    "CycleTime_ms": telemetry["CycleTime_ms"],
-                    "SpindleRotationCounter": telemetry["SpindleRotationCounter"],
-                    "BitRotationCounter": telemetry["BitRotationCounter"],
-                    "ErrorCode": telemetry["ErrorCode"]
-                }
-                
-                writer.writerow(row)
-                records_written += 1
-                
-                # Progress reporting
-                if records_written % progress_interval == 0:
-                    progress = (records_written / total_records) * 100
-                    logger.info(f"Progress: {progress:.1f}% ({records_written:,} / {total_records:,} records)")
+                    "RowOffset": (
+                        device_rows[device_id] if machine_major else records_written
+                    ),
+                    "RotationsAtReplacement": generator.replaced_bit_rotations,
+                })
+            device_rows[device_id] += 1
+            records_written += 1
             
-            # Move to next timestamp
-            current_time += timedelta(minutes=interval_minutes)
+            # Progress reporting
+            if records_written % progress_interval == 0:
+                progress = (records_written / max(1, total_records)) * 100
+                logger.info(f"Progress: {progress:.1f}% ({records_written:,} / {total_records:,} records)")
     
     logger.info(f"✓ Data generation complete!")
     logger.info(f"  - Total records: {records_written:,}")
     logger.info(f"  - File size: {output_path.stat().st_size / 1024 / 1024:.2f} MB")
     logger.info(f"  - Output: {output_path.absolute()}")
+    if machine_major:
+        # Offsets were counted per machine; shift them past earlier machines
+        if output_format == "binary":
+            # The store orders machines by code, not by ID: use its index
+            with open(files[".index.json"], encoding="utf-8") as f:
+                store_index = json.load(f)
+            machine_start = {
+                machine_id: info["offset"]
+                for machine_id, info in store_index["machines"].items()
+            }
+        else:
+            machine_start = {}
+            start = 0
+            for device_id in sorted(device_rows):
+                machine_start[device_id] = start
+                start += device_rows[device_id]
+        for event in replacements:
+            event["RowOffset"] += machine_start[event["MachineID"]]
+        replacements.sort(key=lambda event: event["RowOffset"])
+    index_path = replacement_index_path(output_path)
+    write_replacement_index(index_path, replacements)
+    logger.info(f"  - Bit replacements: {len(replacements):,} (index: {index_path})")
+    if rollup_aggregator:
+        rollup_aggregator.close()
+        rollup_aggregator.log_summary()
+    if cache_key:
+        cache.store(cache_key, files, spec)
+        logger.info(f"  - Cached as {cache_key[:12]} in {cache.root}")
     
     # Print summary statistics
     print_summary_statistics(generators)
@@ -158,6 +501,7 @@ def print_summary_statistics(generators: Dict[str, TelemetryGenerator]) -> None:
         logger.info(f"  - Total operations: {stats['totalOperations']:,}")
         logger.info(f"  - Operational hours: {stats['operationalHours']:.2f} hrs")
         logger.info(f"  - Bit rotation counter: {stats['bitRotationCounter']:,}")
+        logger.info(f"  - Bit replacements: {stats['bitReplacements']:,}")
         logger.info(f"  - Component health:")
         logger.info(f"      Motor: {stats['componentHealth']['motor']:.3f}")
         logger.info(f"      Bearing: {stats['componentHealth']['bearing']:.3f}")
@@ -193,7 +537,103 @@ def main():
         "--output",
         type=str,
         default="historical_telemetry.csv",
-        help="Output CSV filename (default: historical_telemetry.csv)"
+        help="Output filename (default: historical_telemetry.csv)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="csv",
+        help="Output format: csv, or binary fixed-width records with a "
+             "(machine, time) index for memory-mapped reads (default: csv)"
+    )
+    parser.add_argument(
+        "--timeline",
+        choices=TIMELINES,
+        default="fixed",
+        help="Event timing: fixed (all devices on the same --interval tick) or "
+             "jittered (independent per-device clocks firing every "
+             "SCREWING_INTERVAL_SECONDS ± INTERVAL_JITTER_SECONDS from .env, "
+             "like the live simulator) (default: fixed)"
+    )
+    parser.add_argument(
+        "--rate-spread",
+        type=float,
+        default=0.0,
+        help="Per-device spread of the jittered interval in percent: each "
+             "device runs at a fixed rate drawn from 1 ± spread (default: 0)"
+    )
+    parser.add_argument(
+        "--shifts",
+        type=str,
+        default="",
+        help="Comma-separated UTC shift windows, e.g. 06:00-14:00,14:00-22:00; "
+             "no events outside them (default: around the clock)"
+    )
+    parser.add_argument(
+        "--order",
+        choices=OUTPUT_ORDERS,
+        default="time",
+        help="Row order: time (interleaved across machines as generated), or "
+             "machine (sorted by MachineID, then Timestamp, via an external "
+             "merge sort; binary stores are always machine-major) (default: time)"
+    )
+    parser.add_argument(
+        "--sort-run-rows",
+        type=int,
+        default=DEFAULT_RUN_ROWS,
+        help="Events held in memory per sorted run with --order machine "
+             f"(default: {DEFAULT_RUN_ROWS:,})"
+    )
+    parser.add_argument(
+        "--rollups",
+        type=str,
+        nargs="?",
+        const="minute,hour,day",
+        default="",
+        help="Also write per-machine rollup tables in the same pass, "
+             "<output stem>_<resolution>.csv, for a comma-separated subset "
+             "of minute,hour,day (default when given without a value: all)"
+    )
+    parser.add_argument(
+        "--start-hours",
+        type=float,
+        default=0.0,
+        help="Operational hours each device already has at the start (default: 0)"
+    )
+    parser.add_argument(
+        "--scenario",
+        type=str,
+        default="",
+        help="JSON scenario file with anomaly bursts, drift, product mix and downtime"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for reproducible output (default: unseeded)"
+    )
+    parser.add_argument(
+        "--end",
+        type=str,
+        default="",
+        help="End of the generated period as an ISO 8601 time, UTC unless an "
+             "offset is given (default: now)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither reuse nor store the dataset in DATASET_CACHE_DIR"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Enable sampling profiler, tracemalloc and per-stage timers"
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=str,
+        default="historical_profile",
+        help="Path prefix for profile reports (default: historical_profile)"
     )
     
     args = parser.parse_args()
@@ -211,9 +651,53 @@ def main():
         logger.error("Interval must be between 1 and 1440 minutes")
         return
     
+    if args.start_hours < 0:
+        logger.error("Start hours must be non-negative")
+        return
+    
+    if not 0 <= args.rate_spread < 100:
+        logger.error("Rate spread must be between 0 and 100 percent")
+        return
+    
+    try:
+        shifts = parse_shifts(args.shifts)
+    except ValueError as e:
+        logger.error(str(e))
+        return
+    
+    end = None
+    if args.end:
+        try:
+            end = datetime.fromisoformat(args.end)
+        except ValueError:
+            logger.error(f"Invalid --end time: {args.end}")
+            return
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+    
+    if args.sort_run_rows < 1:
+        logger.error("Sort run rows must be positive")
+        return
+    
+    rollups = None
+    if args.rollups:
+        try:
+            rollups = parse_resolutions(args.rollups)
+        except ValueError as e:
+            logger.error(str(e))
+            return
+    
     # Estimate output size
-    estimated_records = args.devices * args.days * 24 * (60 // args.interval)
-    estimated_size_mb = (estimated_records * 200) / 1024 / 1024  # ~200 bytes per row
+    try:
+        config = ConfigLoader(validate_transport=False).get_config()
+    except ValueError as e:
+        logger.error(f"❌ Configuration error: {e}")
+        return
+    estimated_records = estimate_records(
+        args.devices, args.days, args.interval, config, args.timeline, shifts
+    )
+    bytes_per_record = 51 if args.format == "binary" else 200  # ~200 bytes per CSV row
+    estimated_size_mb = (estimated_records * bytes_per_record) / 1024 / 1024
     
     logger.info(f"\nEstimated output size: ~{estimated_size_mb:.1f} MB")
     
@@ -225,17 +709,36 @@ def main():
             logger.info("Cancelled by user")
             return
     
+    profiler = create_profiler(args.profile, args.profile_output)
+    profiler.start()
+    
     try:
         generate_historical_data(
             num_devices=args.devices,
             days_back=args.days,
             interval_minutes=args.interval,
-            output_file=args.output
+            output_file=args.output,
+            profiler=profiler,
+            start_hours=args.start_hours,
+            scenario_file=args.scenario,
+            output_format=args.format,
+            rollups=rollups,
+            order=args.order,
+            sort_run_rows=args.sort_run_rows,
+            timeline=args.timeline,
+            rate_spread_percent=args.rate_spread,
+            shifts=shifts,
+            seed=args.seed,
+            end=end,
+            use_cache=not args.no_cache
         )
     except KeyboardInterrupt:
         logger.info("\n⚠️  Generation interrupted by user")
     except Exception as e:
         logger.error(f"❌ Error during generation: {e}", exc_info=True)
+    finally:
+        profiler.stop()
+        profiler.log_summary()
 
 
 if __name__ == "__main__":
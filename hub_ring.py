@@ -0,0 +1,185 @@
+"""
+Consistent-hash sharding of the device fleet across several IoT Hubs.
+Devices keep their hub when hubs are added (only about 1/N of them move to a
+new hub), and an optional per-hub device limit spills devices over to the
+next hub on the ring.
+"""
+
+import bisect
+import hashlib
+import logging
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Points per hub on the ring; more points spread devices more evenly
+VIRTUAL_NODES = 160
+
+
+def _hash(key: str) -> int:
+    """
+    Map a key to a position on the ring (stable across processes and runs).
+    """
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HubRing:
+    """
+    Consistent-hash ring of IoT Hub hostnames.
+
+    Each hub is placed at VIRTUAL_NODES points on a 64-bit ring and a device
+    belongs to the first hub clockwise from the hash of its device ID. With
+    a per-hub device limit, a full hub is skipped and the device goes to the
+    next hub clockwise (bounded-load consistent hashing).
+    """
+
+    def __init__(self, hostnames: List[str], max_devices_per_hub: int = 0):
+        """
+        Initialize the ring.
+
+        Args:
+            hostnames: IoT Hub hostnames (at least one)
+            max_devices_per_hub: Devices assigned to one hub at most (0: no limit)
+        """
+        if not hostnames:
+            raise ValueError("At least one IoT Hub hostname is required")
+        self.hostnames = list(hostnames)
+        self.max_devices_per_hub = max_devices_per_hub
+
+        points: List[Tuple[int, str]] = sorted(
+            (_hash(f"{hostname}#{i}"), hostname)
+            for hostname in self.hostnames
+            for i in range(VIRTUAL_NODES)
+        )
+        self._positions = [position for position, _ in points]
+        self._owners = [hostname for _, hostname in points]
+
+        self.assignments: Dict[str, str] = {}
+        self.device_counts: Dict[str, int] = {hostname: 0 for hostname in hostnames}
+        self._started = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], num_workers: int = 1) -> "HubRing":
+        """
+        Create the ring from the configuration.
+
+        Args:
+            config: Configuration dictionary from ConfigLoader
+            num_workers: Fleet workers sharing the per-hub device limit
+
+        Returns:
+            HubRing for this process
+        """
+        limit = config["iothub_max_devices_per_hub"]
+        if limit:
+            # Each worker assigns its own devices, so it gets a share of the limit
+            limit = math.ceil(limit / num_workers)
+        return cls(config["iothub_hostnames"], limit)
+
+    def preferred(self, device_id: str) -> Iterable[str]:
+        """
+        Iterate the hubs clockwise from a device's position, each hub once.
+
+        Args:
+            device_id: Device identifier
+
+        Returns:
+            Hostnames in ring order, the device's home hub first
+        """
+        start = bisect.bisect(self._positions, _hash(device_id))
+        seen = set()
+        for i in range(len(self._owners)):
+            hostname = self._owners[(start + i) % len(self._owners)]
+            if hostname not in seen:
+                seen.add(hostname)
+                yield hostname
+                if len(seen) == len(self.hostnames):
+                    return
+
+    def assign(self, device_id: str) -> str:
+        """
+        Assign a device to a hub (idempotent).
+
+        Args:
+            device_id: Device identifier
+
+        Returns:
+            Hostname of the device's hub
+
+        Raises:
+            ValueError: If every hub has reached the device limit
+        """
+        hostname = self.assignments.get(device_id)
+        if hostname is not None:
+            return hostname
+
+        for hostname in self.preferred(device_id):
+            if (
+                not self.max_devices_per_hub
+                or self.device_counts[hostname] < self.max_devices_per_hub
+            ):
+                self.assignments[device_id] = hostname
+                self.device_counts[hostname] += 1
+                return hostname
+
+        raise ValueError(
+            f"All {len(self.hostnames)} IoT Hubs reached the limit of "
+            f"{self.max_devices_per_hub} devices (IOTHUB_MAX_DEVICES_PER_HUB)"
+        )
+
+    def release(self, device_id: str) -> None:
+        """
+        Free a removed device's slot on its hub.
+
+        Args:
+            device_id: Device identifier
+        """
+        hostname = self.assignments.pop(device_id, None)
+        if hostname is not None:
+            self.device_counts[hostname] -= 1
+
+    def get_statistics(self, simulators: Optional[Iterable[Any]] = None) -> Dict[str, Any]:
+        """
+        Get per-hub statistics.
+
+        Args:
+            simulators: Running DeviceSimulators, for connection and message
+                counts (optional)
+
+        Returns:
+            Dictionary of hostname to devices, connected devices, messages sent
+            and average messages per second
+        """
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        hubs = {
+            hostname: {
+                "devices": self.device_counts[hostname],
+                "connected": 0,
+                "messagesSent": 0,
+            }
+            for hostname in self.hostnames
+        }
+        for simulator in simulators or ():
+            stats = hubs.get(simulator.hostname)
+            if stats is None:
+                continue
+            stats["connected"] += simulator.is_connected()
+            stats["messagesSent"] += simulator.messages_sent
+
+        for stats in hubs.values():
+            stats["messagesPerSecond"] = round(stats["messagesSent"] / elapsed, 1)
+        return hubs
+
+    def add_routes(self, server, simulators: List[Any]) -> None:
+        """
+        Register GET /hubs (per-hub statistics) on a local HTTP server.
+
+        Args:
+            server: LocalHttpServer to register the route on
+            simulators: Running simulators (may change while serving)
+        """
+        server.route(
+            "GET", r"/hubs", lambda params, body: self.get_statistics(simulators)
+        )
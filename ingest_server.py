@@ -0,0 +1,464 @@
+"""
+Local stand-in for IoT Hub ingestion, for offline end-to-end throughput tests.
+Speaks the subset of MQTT 3.1.1 the device SDK uses for telemetry, counts and
+optionally persists messages, and reports ingest rate and end-to-end latency.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import signal
+import ssl
+import time
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Set, TextIO, Tuple
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+# MQTT control packet types
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+# Telemetry topic prefix used by the device SDK: devices/{id}/messages/events/
+TELEMETRY_SEGMENT = "/messages/events/"
+
+# Latency samples kept for percentiles (reservoir sampling beyond this)
+LATENCY_RESERVOIR_SIZE = 100_000
+
+
+class IngestStats:
+    """
+    Message counters, ingest rate and end-to-end latency percentiles.
+    """
+
+    def __init__(self, reservoir_size: int = LATENCY_RESERVOIR_SIZE):
+        """
+        Initialize the statistics.
+
+        Args:
+            reservoir_size: Latency samples kept for percentile estimates
+        """
+        self.reservoir_size = reservoir_size
+        self.latencies_ms = array("d")
+        self.latency_count = 0
+        self.messages = 0
+        self.bytes = 0
+        self.devices: Dict[str, int] = {}
+        self.connections = 0
+        self.first_message = 0.0
+        self.last_message = 0.0
+        self.interval_messages = 0
+        self.interval_started = time.monotonic()
+
+    def record(self, device_id: str, size: int, latency_ms: Optional[float]) -> None:
+        """
+        Record one received telemetry message.
+
+        Args:
+            device_id: Sending device
+            size: Payload size in bytes
+            latency_ms: End-to-end latency, if the message carried a creation time
+        """
+        now = time.monotonic()
+        if not self.messages:
+            self.first_message = now
+        self.last_message = now
+        self.messages += 1
+        self.interval_messages += 1
+        self.bytes += size
+        self.devices[device_id] = self.devices.get(device_id, 0) + 1
+
+        if latency_ms is not None:
+            self.latency_count += 1
+            if len(self.latencies_ms) < self.reservoir_size:
+                self.latencies_ms.append(latency_ms)
+            else:
+                slot = random.randrange(self.latency_count)
+                if slot < self.reservoir_size:
+                    self.latencies_ms[slot] = latency_ms
+
+    def percentiles(self) -> Dict[str, float]:
+        """
+        Get latency percentiles.
+
+        Returns:
+            Dictionary of p50/p95/p99/max in milliseconds (empty without samples)
+        """
+        if not self.latencies_ms:
+            return {}
+        ordered = sorted(self.latencies_ms)
+        last = len(ordered) - 1
+        return {
+            "p50": ordered[int(last * 0.50)],
+            "p95": ordered[int(last * 0.95)],
+            "p99": ordered[int(last * 0.99)],
+            "max": ordered[last],
+        }
+
+    def log_interval(self) -> None:
+        """
+        Log the ingest rate over the current interval and reset it.
+        """
+        now = time.monotonic()
+        elapsed = max(now - self.interval_started, 1e-9)
+        latency = self.percentiles()
+        logger.info(
+            f"Ingest: {self.interval_messages / elapsed:,.1f} msg/s "
+            f"({self.messages:,} total from {len(self.devices)} devices, "
+            f"{self.connections} connected)"
+            + (
+                f", latency p50 {latency['p50']:.1f}ms p99 {latency['p99']:.1f}ms"
+                if latency
+                else ""
+            )
+        )
+        self.interval_messages = 0
+        self.interval_started = now
+
+    def summary(self) -> Dict:
+        """
+        Get the overall benchmark summary.
+
+        Returns:
+            Dictionary with totals, sustained rate and latency percentiles
+        """
+        duration = self.last_message - self.first_message
+        return {
+            "messages": self.messages,
+            "bytes": self.bytes,
+            "devices": len(self.devices),
+            "durationSeconds": round(duration, 3),
+            "sustainedRate": round(self.messages / duration, 1) if duration else 0.0,
+            "latencyMs": {k: round(v, 2) for k, v in self.percentiles().items()},
+        }
+
+
+class MqttIngestServer:
+    """
+    Minimal MQTT 3.1.1 broker accepting device telemetry.
+    Any credentials are accepted; subscriptions are acknowledged but nothing
+    is ever published back to devices.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8883,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        output_path: Optional[str] = None,
+        report_interval: float = 10.0,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to bind
+            port: TCP port (the device SDK always connects to 8883)
+            ssl_context: TLS context (the device SDK requires TLS)
+            output_path: JSON Lines file to persist messages to (optional)
+            report_interval: Seconds between ingest rate log lines
+        """
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.output_path = output_path
+        self.report_interval = report_interval
+        self.stats = IngestStats()
+        self._output: Optional[TextIO] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        """
+        Start accepting connections.
+        """
+        if self.output_path:
+            self._output = open(self.output_path, "a", encoding="utf-8")
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, ssl=self.ssl_context
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(
+            f"Ingest server listening on {self.host}:{self.port} "
+            f"({'TLS' if self.ssl_context else 'plain TCP'})"
+        )
+
+    async def stop(self) -> None:
+        """
+        Stop the server and close the output file.
+        """
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+
+    async def run(self, duration: Optional[float] = None) -> Dict:
+        """
+        Serve and report periodically until cancelled or the duration elapses.
+
+        Args:
+            duration: Seconds to run (None runs until cancelled)
+
+        Returns:
+            Benchmark summary from IngestStats.summary()
+        """
+        await self.start()
+        deadline = time.monotonic() + duration if duration else None
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                wait = self.report_interval
+                if deadline is not None:
+                    wait = min(wait, max(0.0, deadline - time.monotonic()))
+                await asyncio.sleep(wait)
+                self.stats.log_interval()
+                if self._output is not None:
+                    self._output.flush()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.stop()
+        return self.stats.summary()
+
+    async def _read_packet(self, reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+        """
+        Read one MQTT control packet.
+
+        Returns:
+            Tuple of (packet type, header flags, variable header and payload)
+        """
+        first = (await reader.readexactly(1))[0]
+        length = 0
+        multiplier = 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+            if multiplier > 128**3:
+                raise ValueError("Malformed remaining length")
+        body = await reader.readexactly(length) if length else b""
+        return first >> 4, first & 0x0F, body
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        client_id = "?"
+        connected = False
+        self._clients.add(writer)
+        try:
+            packet_type, _, body = await self._read_packet(reader)
+            if packet_type != CONNECT:
+                return
+            client_id = self._parse_connect(body)
+            writer.write(bytes((CONNACK << 4, 2, 0, 0)))
+            connected = True
+            self.stats.connections += 1
+            logger.debug("%s: Connected", client_id)
+
+            while True:
+                packet_type, flags, body = await self._read_packet(reader)
+                if packet_type == PUBLISH:
+                    packet_id = self._handle_publish(flags, body)
+                    if packet_id is not None:
+                        writer.write(bytes((PUBACK << 4, 2)) + packet_id)
+                elif packet_type == SUBSCRIBE:
+                    writer.write(self._suback(body))
+                elif packet_type == UNSUBSCRIBE:
+                    writer.write(bytes((UNSUBACK << 4, 2)) + body[:2])
+                elif packet_type == PINGREQ:
+                    writer.write(bytes((PINGRESP << 4, 0)))
+                elif packet_type == DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        except ValueError as e:
+            logger.warning(f"{client_id}: Protocol error, closing connection: {e}")
+        finally:
+            if connected:
+                self.stats.connections -= 1
+            self._clients.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def _parse_connect(body: bytes) -> str:
+        """
+        Parse a CONNECT packet.
+
+        Returns:
+            Client identifier (the device ID for IoT Hub devices)
+        """
+        name_length = int.from_bytes(body[0:2], "big")
+        position = 2 + name_length
+        level = body[position]
+        if level != 4:
+            raise ValueError(f"Unsupported MQTT protocol level {level}")
+        # Skip level, connect flags and keep-alive
+        position += 4
+        id_length = int.from_bytes(body[position : position + 2], "big")
+        return body[position + 2 : position + 2 + id_length].decode("utf-8")
+
+    @staticmethod
+    def _suback(body: bytes) -> bytes:
+        """
+        Build a SUBACK granting each requested topic at QoS 0 or 1.
+        """
+        packet_id = body[:2]
+        codes = bytearray()
+        position = 2
+        while position < len(body):
+            length = int.from_bytes(body[position : position + 2], "big")
+            position += 2 + length
+            codes.append(min(body[position], 1))
+            position += 1
+        payload = packet_id + bytes(codes)
+        return bytes((SUBACK << 4, len(payload))) + payload
+
+    def _handle_publish(self, flags: int, body: bytes) -> Optional[bytes]:
+        """
+        Count (and persist) a PUBLISH packet.
+
+        Returns:
+            Packet identifier to acknowledge (None for QoS 0)
+        """
+        topic_length = int.from_bytes(body[0:2], "big")
+        topic = body[2 : 2 + topic_length].decode("utf-8")
+        position = 2 + topic_length
+
+        packet_id = None
+        if (flags >> 1) & 0x03:
+            packet_id = body[position : position + 2]
+            position += 2
+        payload = body[position:]
+
+        device_id, separator, property_bag = topic.partition(TELEMETRY_SEGMENT)
+        if not separator or not device_id.startswith("devices/"):
+            return packet_id
+        device_id = device_id[len("devices/") :]
+
+        properties = dict(parse_qsl(property_bag))
+        latency_ms = None
+        created = properties.get("iothub-creation-time-utc")
+        if created:
+            try:
+                sent = datetime.fromisoformat(created).timestamp()
+                latency_ms = (time.time() - sent) * 1000.0
+            except ValueError:
+                pass
+
+        self.stats.record(device_id, len(payload), latency_ms)
+
+        if self._output is not None:
+            self._output.write(
+                json.dumps(
+                    {
+                        "deviceId": device_id,
+                        "receivedAt": datetime.now(timezone.utc).isoformat(),
+                        "properties": properties,
+                        "body": payload.decode("utf-8", "replace"),
+                    }
+                )
+                + "\n"
+            )
+        return packet_id
+
+
+def create_ssl_context(certfile: str, keyfile: Optional[str] = None) -> ssl.SSLContext:
+    """
+    Create a server TLS context.
+
+    Args:
+        certfile: PEM certificate (chain) for the server
+        keyfile: PEM private key (default: contained in certfile)
+
+    Returns:
+        Server SSLContext
+    """
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def main():
+    """Command-line entry point."""
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Local MQTT ingestion stand-in for end-to-end throughput tests"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8883, help="TCP port (default: 8883)")
+    parser.add_argument("--certfile", help="Server certificate (PEM)")
+    parser.add_argument("--keyfile", help="Server private key (PEM)")
+    parser.add_argument(
+        "--output", help="Append received messages to this JSON Lines file"
+    )
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between ingest rate reports (default: 10)",
+    )
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    args = parser.parse_args()
+
+    if not args.certfile:
+        logger.warning(
+            "No --certfile given: serving plain TCP, which the device SDK "
+            "will not connect to"
+        )
+    ssl_context = None
+    if args.certfile:
+        ssl_context = create_ssl_context(args.certfile, args.keyfile)
+
+    server = MqttIngestServer(
+        host=args.host,
+        port=args.port,
+        ssl_context=ssl_context,
+        output_path=args.output,
+        report_interval=args.report_interval,
+    )
+
+    async def run() -> Dict:
+        task = asyncio.ensure_future(server.run(args.duration))
+        loop = asyncio.get_running_loop()
+
+        # Use signal.signal for Windows compatibility (no add_signal_handler)
+        def signal_handler(signum, frame):
+            loop.call_soon_threadsafe(task.cancel)
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+        return await task
+
+    summary = asyncio.run(run())
+    logger.info(f"Ingest summary: {json.dumps(summary)}")
+    if args.output:
+        logger.info(f"Messages written to {Path(args.output).absolute()}")
+
+
+if __name__ == "__main__":
+    main()
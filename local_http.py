@@ -0,0 +1,188 @@
+"""
+Minimal asyncio HTTP/1.1 JSON server for local simulator endpoints.
+Runs on the simulator's event loop without extra dependencies; intended for
+localhost dashboards, scripts and test assertions, not public exposure.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Largest request body accepted (bytes)
+MAX_BODY_BYTES = 1024 * 1024
+
+# Handler: (path and query parameters, decoded JSON body or None) -> JSON payload
+Handler = Callable[[Dict[str, str], Any], Any]
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class LocalHttpServer:
+    """
+    Tiny JSON-over-HTTP router on asyncio streams.
+
+    Handlers raise KeyError for 404 and ValueError for 400; any other
+    exception becomes a 500. Connections are kept alive between requests.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to bind (default: loopback only)
+            port: TCP port (0 picks a free port)
+        """
+        self.host = host
+        self.port = port
+        self.routes: List[Tuple[str, Pattern, Handler]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def route(self, method: str, pattern: str, handler: Handler) -> None:
+        """
+        Register a handler.
+
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE)
+            pattern: Regular expression matched against the full path; named
+                groups are passed to the handler as parameters
+            handler: Function returning a JSON-serializable payload
+        """
+        self.routes.append((method.upper(), re.compile(pattern + r"/?"), handler))
+
+    async def start(self) -> None:
+        """
+        Start listening.
+        """
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Local HTTP API listening on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """
+        Stop listening and close the server.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def dispatch(self, method: str, target: str, body: bytes = b"") -> Tuple[int, Any]:
+        """
+        Route a request to its handler.
+
+        Args:
+            method: HTTP method
+            target: Request target (path and query string)
+            body: Raw request body
+
+        Returns:
+            Tuple of (status code, JSON-serializable payload)
+        """
+        url = urlsplit(target)
+        path = unquote(url.path)
+        allowed = False
+
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+
+            params = dict(parse_qsl(url.query))
+            params.update(match.groupdict())
+            try:
+                payload = json.loads(body) if body else None
+                return 200, handler(params, payload)
+            except KeyError as e:
+                return 404, {"error": str(e).strip("'\"")}
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            except Exception as e:
+                logger.error(
+                    f"Local HTTP API error on {method} {path}: {e}", exc_info=True
+                )
+                return 500, {"error": str(e)}
+
+        if allowed:
+            return 405, {"error": f"{method} not allowed on {path}"}
+        return 404, {"error": f"No route for {path}"}
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request"})
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self._respond(
+                        writer, 400, {"error": "Invalid Content-Length"}
+                    )
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "Body too large"})
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = self.dispatch(method.upper(), target, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Any,
+        keep_alive: bool = False,
+    ) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
@@ -0,0 +1,188 @@
+"""
+Low-overhead logging for high event rates.
+Moves handler I/O off the event loop and replaces per-message log lines with
+periodic per-device and fleet summaries plus sampled event lines.
+"""
+
+import asyncio
+import logging
+import logging.handlers
+import queue
+import random
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def install_queue_logging() -> logging.handlers.QueueListener:
+    """
+    Route all root handlers through a queue serviced by a background thread.
+    Log calls on the event loop then only enqueue the record.
+
+    Returns:
+        Started QueueListener (stop it at shutdown to flush pending records)
+    """
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    return listener
+
+
+class _DeviceCounters:
+    """
+    Message counters for one device within a summary interval.
+    """
+
+    __slots__ = ("sent", "nok", "failed", "last_error")
+
+    def __init__(self):
+        self.sent = 0
+        self.nok = 0
+        self.failed = 0
+        self.last_error = 0
+
+
+class TelemetryLogAggregator:
+    """
+    Aggregates per-message send results into periodic summary log lines.
+    Shared by every DeviceSimulator in a process when LOG_MODE=fast.
+    """
+
+    def __init__(self, interval_seconds: float = 60.0, sample_rate: float = 0.0):
+        """
+        Initialize the log aggregator.
+
+        Args:
+            interval_seconds: Seconds between summary log lines
+            sample_rate: Fraction of individual events still logged (0.0 to 1.0)
+        """
+        self.interval_seconds = interval_seconds
+        self.sample_rate = sample_rate
+        self.devices: Dict[str, _DeviceCounters] = {}
+        self.total_sent = 0
+        self.total_failed = 0
+        self.interval_started = time.monotonic()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["TelemetryLogAggregator"]:
+        """
+        Create an aggregator if the configuration selects fast logging.
+
+        Args:
+            config: Configuration dictionary from ConfigLoader
+
+        Returns:
+            TelemetryLogAggregator, or None in standard logging mode
+        """
+        if config["log_mode"] != "fast":
+            return None
+        return cls(
+            interval_seconds=config["log_summary_interval_seconds"],
+            sample_rate=config["log_event_sample_rate"],
+        )
+
+    def _counters(self, device_id: str) -> _DeviceCounters:
+        counters = self.devices.get(device_id)
+        if counters is None:
+            counters = self.devices[device_id] = _DeviceCounters()
+        return counters
+
+    def record_sent(
+        self, device_id: str, message_number: int, cycle_ok: bool, error_code: int
+    ) -> None:
+        """
+        Record a successfully sent message.
+
+        Args:
+            device_id: Device that sent the message
+            message_number: Device's running message count
+            cycle_ok: CycleOK flag of the event
+            error_code: ErrorCode of the event
+        """
+        counters = self._counters(device_id)
+        counters.sent += 1
+        if not cycle_ok:
+            counters.nok += 1
+            counters.last_error = error_code
+
+        if self.sample_rate and random.random() < self.sample_rate:
+            logger.info(
+                "%s: Sent message #%d (CycleOK: %s, Error: %s) [sampled]",
+                device_id,
+                message_number,
+                cycle_ok,
+                error_code,
+            )
+
+    def record_failed(self, device_id: str) -> None:
+        """
+        Record a message that could not be sent.
+
+        Args:
+            device_id: Device that failed to send
+        """
+        self._counters(device_id).failed += 1
+
+    def log_summary(self) -> None:
+        """
+        Log per-device and fleet summaries for the current interval and reset it.
+        """
+        now = time.monotonic()
+        elapsed = max(now - self.interval_started, 1e-9)
+        sent = nok = failed = 0
+
+        for device_id, counters in self.devices.items():
+            if not (counters.sent or counters.failed):
+                continue
+            logger.info(
+                "%s: %d sent, %d NOK (last error %d), %d failed in %.0fs",
+                device_id,
+                counters.sent,
+                counters.nok,
+                counters.last_error,
+                counters.failed,
+                elapsed,
+            )
+            sent += counters.sent
+            nok += counters.nok
+            failed += counters.failed
+            counters.sent = counters.nok = counters.failed = 0
+
+        self.total_sent += sent
+        self.total_failed += failed
+        self.interval_started = now
+
+        logger.info(
+            "Fleet: %d sent (%.1f msg/s), %d NOK, %d failed in %.0fs "
+            "(%d sent, %d failed since start)",
+            sent,
+            sent / elapsed,
+            nok,
+            failed,
+            elapsed,
+            self.total_sent,
+            self.total_failed,
+        )
+
+    async def run(self) -> None:
+        """
+        Log summaries every interval until cancelled.
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.interval_seconds)
+                self.log_summary()
+        except asyncio.CancelledError:
+            # Flush the partial interval on shutdown
+            self.log_summary()
+            raise
@@ -0,0 +1,342 @@
+"""
+Streaming per-machine snapshot aggregator.
+Maintains the figures in sample_screw_machine_data.csv incrementally, either
+from the live simulator or in a single pass over a historical telemetry CSV.
+"""
+
+import asyncio
+import csv
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Columns of sample_screw_machine_data.csv
+SNAPSHOT_FIELDS = [
+    "MachineID",
+    "CumulativeBitRotation",
+    "AvgTorque",
+    "NG_Rate_Last100",
+    "Rotations_LastHour",
+    "CycleTime_Avg_ms",
+]
+
+# Number of most recent cycles behind the rolling averages and NG rate
+CYCLE_WINDOW = 100
+
+# Seconds of event time covered by Rotations_LastHour
+ROTATION_WINDOW_SECONDS = 3600.0
+
+
+class MachineAggregate:
+    """
+    Incremental aggregates for one machine.
+    Ring buffers with running sums give O(1) updates per cycle; the rotation
+    window is a deque of (event time, rotations) evicted from the left.
+    """
+
+    __slots__ = (
+        "machine_id",
+        "cumulative_rotation",
+        "torque",
+        "cycle_time",
+        "ng",
+        "position",
+        "count",
+        "torque_sum",
+        "cycle_time_sum",
+        "ng_sum",
+        "rotations",
+        "rotations_sum",
+    )
+
+    def __init__(self, machine_id: str, window: int = CYCLE_WINDOW):
+        """
+        Initialize the aggregate.
+
+        Args:
+            machine_id: Machine identifier
+            window: Number of recent cycles in the rolling figures
+        """
+        self.machine_id = machine_id
+        self.cumulative_rotation = 0
+        self.torque = [0.0] * window
+        self.cycle_time = [0] * window
+        self.ng = [0] * window
+        self.position = 0
+        self.count = 0
+        self.torque_sum = 0.0
+        self.cycle_time_sum = 0
+        self.ng_sum = 0
+        self.rotations: deque = deque()
+        self.rotations_sum = 0
+
+    def update(
+        self,
+        epoch_seconds: float,
+        torque: float,
+        cycle_time_ms: int,
+        cycle_ok: bool,
+        rotations: int,
+        bit_rotation_counter: int,
+    ) -> None:
+        """
+        Add one screwing cycle.
+
+        Args:
+            epoch_seconds: Event time as Unix epoch seconds
+            torque: Actual torque (Nm)
+            cycle_time_ms: Cycle time in milliseconds
+            cycle_ok: Whether the cycle passed
+            rotations: Spindle rotations in this cycle
+            bit_rotation_counter: Cumulative bit rotations after this cycle
+        """
+        i = self.position
+        ng = 0 if cycle_ok else 1
+
+        # Replace the oldest cycle in the ring (zeros until the ring is full)
+        self.torque_sum += torque - self.torque[i]
+        self.cycle_time_sum += cycle_time_ms - self.cycle_time[i]
+        self.ng_sum += ng - self.ng[i]
+        self.torque[i] = torque
+        self.cycle_time[i] = cycle_time_ms
+        self.ng[i] = ng
+
+        window = len(self.torque)
+        self.position = (i + 1) % window
+        if self.count < window:
+            self.count += 1
+
+        # Slide the event-time rotation window
+        self.rotations.append((epoch_seconds, rotations))
+        self.rotations_sum += rotations
+        cutoff = epoch_seconds - ROTATION_WINDOW_SECONDS
+        while self.rotations[0][0] <= cutoff:
+            self.rotations_sum -= self.rotations.popleft()[1]
+
+        self.cumulative_rotation = bit_rotation_counter
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the current figures as a snapshot row.
+
+        Returns:
+            Dictionary keyed by SNAPSHOT_FIELDS
+        """
+        count = self.count or 1
+        return {
+            "MachineID": self.machine_id,
+            "CumulativeBitRotation": self.cumulative_rotation,
+            "AvgTorque": round(self.torque_sum / count, 2),
+            "NG_Rate_Last100": round(self.ng_sum / count, 3),
+            "Rotations_LastHour": self.rotations_sum,
+            "CycleTime_Avg_ms": round(self.cycle_time_sum / count),
+        }
+
+
+class MachineSnapshotAggregator:
+    """
+    Aggregates telemetry events into per-machine snapshot rows.
+    Shared by every DeviceSimulator in a process when SNAPSHOT_FILE is set.
+    """
+
+    def __init__(
+        self,
+        output_path: Optional[Union[str, Path]] = None,
+        interval_seconds: float = 60.0,
+    ):
+        """
+        Initialize the snapshot aggregator.
+
+        Args:
+            output_path: Snapshot CSV written by run() (optional)
+            interval_seconds: Seconds between snapshot writes in run()
+        """
+        self.output_path = Path(output_path) if output_path else None
+        self.interval_seconds = interval_seconds
+        self.machines: Dict[str, MachineAggregate] = {}
+
+    @classmethod
+    def from_config(
+        cls, config: Dict, worker_index: Optional[int] = None
+    ) -> Optional["MachineSnapshotAggregator"]:
+        """
+        Create an aggregator if the configuration enables snapshots.
+
+        Args:
+            config: Configuration dictionary from ConfigLoader
+            worker_index: Fleet worker index; each worker writes its own file
+
+        Returns:
+            MachineSnapshotAggregator, or None when SNAPSHOT_FILE is not set
+        """
+        if not config["snapshot_file"]:
+            return None
+        path = Path(config["snapshot_file"])
+        if worker_index is not None:
+            path = path.with_name(f"{path.stem}.worker{worker_index + 1}{path.suffix}")
+        return cls(path, config["snapshot_interval_seconds"])
+
+    def _machine(self, machine_id: str) -> MachineAggregate:
+        machine = self.machines.get(machine_id)
+        if machine is None:
+            machine = self.machines[machine_id] = MachineAggregate(machine_id)
+        return machine
+
+    def record(
+        self, telemetry: Dict[str, Any], epoch_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Add a telemetry event as produced by TelemetryGenerator.
+
+        Args:
+            telemetry: Telemetry event dictionary
+            epoch_seconds: Event time (default: parsed from Timestamp)
+        """
+        if epoch_seconds is None:
+            epoch_seconds = datetime.fromisoformat(telemetry["Timestamp"]).timestamp()
+        self._machine(telemetry["MachineID"]).update(
+            epoch_seconds,
+            telemetry["ActualTorque"],
+            telemetry["CycleTime_ms"],
+            telemetry["CycleOK"],
+            telemetry["SpindleRotationCounter"],
+            telemetry["BitRotationCounter"],
+        )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get snapshot rows for all machines, ordered by machine ID.
+
+        Returns:
+            List of dictionaries keyed by SNAPSHOT_FIELDS
+        """
+        return [self.machines[m].snapshot() for m in sorted(self.machines)]
+
+    def write(self, output_path: Optional[Union[str, Path]] = None) -> Path:
+        """
+        Write the snapshot CSV atomically (readers never see a partial file).
+
+        Args:
+            output_path: Destination (default: the configured output path)
+
+        Returns:
+            Path that was written
+        """
+        path = Path(output_path) if output_path else self.output_path
+        if path is None:
+            raise ValueError("No snapshot output path configured")
+
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=SNAPSHOT_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.snapshot())
+        os.replace(tmp_path, path)
+        return path
+
+    async def run(self) -> None:
+        """
+        Write snapshots every interval until cancelled.
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.interval_seconds)
+                self.write()
+        except asyncio.CancelledError:
+            # Final snapshot on shutdown
+            if self.machines:
+                self.write()
+            raise
+
+
+def aggregate_csv(
+    input_file: Union[str, Path], output_file: Union[str, Path]
+) -> MachineSnapshotAggregator:
+    """
+    Build snapshots in one pass over a historical telemetry CSV.
+    Rows must be in time order per machine (as generate_historical_data.py writes).
+
+    Args:
+        input_file: Telemetry CSV from generate_historical_data.py
+        output_file: Snapshot CSV to write
+
+    Returns:
+        Aggregator holding the final state
+    """
+    aggregator = MachineSnapshotAggregator()
+    machine_for = aggregator._machine
+    timestamps: Dict[str, float] = {}
+    rows = 0
+
+    with open(input_file, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        col = {name: header.index(name) for name in header}
+        ts, machine_id = col["Timestamp"], col["MachineID"]
+        torque, cycle_time = col["ActualTorque"], col["CycleTime_ms"]
+        cycle_ok, spindle = col["CycleOK"], col["SpindleRotationCounter"]
+        bit_counter = col["BitRotationCounter"]
+
+        for row in reader:
+            # All machines share each timestamp in historical files
+            timestamp = row[ts]
+            epoch = timestamps.get(timestamp)
+            if epoch is None:
+                timestamps.clear()
+                epoch = timestamps[timestamp] = datetime.fromisoformat(
+                    timestamp
+                ).timestamp()
+
+            machine_for(row[machine_id]).update(
+                epoch,
+                float(row[torque]),
+                int(row[cycle_time]),
+                row[cycle_ok] == "True",
+                int(row[spindle]),
+                int(row[bit_counter]),
+            )
+            rows += 1
+
+    aggregator.write(output_file)
+    logger.info(
+        f"Aggregated {rows:,} events from {len(aggregator.machines)} machines "
+        f"into {output_file}"
+    )
+    return aggregator
+
+
+def main():
+    """Command-line entry point."""
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Build per-machine snapshots from historical telemetry"
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="historical_telemetry.csv",
+        help="Telemetry CSV (default: historical_telemetry.csv)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="sample_screw_machine_data.csv",
+        help="Snapshot CSV (default: sample_screw_machine_data.csv)",
+    )
+    args = parser.parse_args()
+
+    aggregate_csv(args.input, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,28 +3,56 @@ Main entry point for IoT screw robot simulator.
 Orchestrates multiple device simulators running concurrently.
 """
 
+import argparse
 import asyncio
 import logging
 import signal
 import sys
-from typing import List
+import time
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
 
 from config_loader import ConfigLoader
 from telemetry_generator import TelemetryGenerator
 from device_simulator import DeviceSimulator
-
+from profiler import NULL_PROFILER, create_profiler
+from rate_limiter import TokenBucket
+from reconnect import ReconnectCoordinator
+from log_aggregator import TelemetryLogAggregator, install_queue_logging
+from scenario import load_schedules
+from machine_snapshot import MachineSnapshotAggregator
+from telemetry_buffer import TelemetryBuffer
+from local_http import LocalHttpServer
+from control_plane import ControlPlane, start_control_api
+from spool import TelemetrySpool
+from hub_ring import HubRing
+from network_impairment import NetworkImpairment
+from rollups import RollupAggregator
+
+logger = logging.getLogger(__name__)
+
+# Seconds between startup progress log lines
+STARTUP_PROGRESS_INTERVAL = 5.0
 
 # Global list to track running simulators for graceful shutdown
 simulators: List[DeviceSimulator] = []
 
+# Background log writer (LOG_MODE=fast only)
+log_listener: Optional[logging.handlers.QueueListener] = None
+
 
-def setup_logging(log_level: str) -> None:
+def setup_logging(log_level: str, log_mode: str = "standard") -> None:
     """
     Configure logging for the application.
 
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
+        log_mode: "standard", or "fast" to write log records from a
+            background thread instead of the event loop
     """
+    global log_listener
+
     # Convert string to logging level
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
 
@@ -39,6 +67,19 @@ def setup_logging(log_level: str) -> None:
     logging.getLogger("azure.iot.device").setLevel(logging.WARNING)
     logging.getLogger("azure.core").setLevel(logging.WARNING)
 
+    if log_mode == "fast" and log_listener is None:
+        log_listener = install_queue_logging()
+
+
+def stop_logging() -> None:
+    """
+    Flush and stop the background log writer, if one is running.
+    """
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
 
 def print_banner(config: dict) -> None:
     """
@@ -97,6 +138,10 @@ async def shutdown(signal_type=None) -> None:
         stop_tasks = [simulator.stop() for simulator in simulators]
         await asyncio.gather(*stop_tasks, return_exceptions=True)
 
+        # All simulators share one coordinator per process
+        reconnect_stats = simulators[0].reconnect_coordinator.get_statistics()
+        logging.info(f"Reconnect statistics: {reconnect_stats}")
+
     logging.info("Shutdown complete")
 
 
@@ -117,73 +162,400 @@ def setup_signal_handlers(loop: asyncio.AbstractEventLoop) -> None:
     signal.signal(signal.SIGTERM, signal_handler)
 
 
-async def main() -> None:
+def create_simulators(
+    config_loader: ConfigLoader,
+    device_indices: Iterable[int],
+    profiler=NULL_PROFILER,
+    log_aggregator: Optional[TelemetryLogAggregator] = None,
+    snapshot_aggregator: Optional[MachineSnapshotAggregator] = None,
+    telemetry_buffer: Optional[TelemetryBuffer] = None,
+    reconnect_coordinator: Optional[ReconnectCoordinator] = None,
+    spool: Optional[TelemetrySpool] = None,
+    hub_ring: Optional[HubRing] = None,
+    impairment: Optional[NetworkImpairment] = None,
+    rollup_aggregator: Optional[RollupAggregator] = None,
+    scenario_origin: Optional[datetime] = None,
+) -> List[DeviceSimulator]:
+    """
+    Create device simulators for a subset of the configured fleet.
+
+    Args:
+        config_loader: Shared configuration loader instance
+        device_indices: Zero-based indices of the devices to create
+        profiler: Stage profiler shared by the simulators
+        log_aggregator: Shared summary logger (LOG_MODE=fast only)
+        snapshot_aggregator: Shared machine snapshot aggregator (optional)
+        telemetry_buffer: Shared recent-telemetry buffer (optional)
+        reconnect_coordinator: Coordinator to share with already running
+            simulators (default: a new one from the configuration)
+        spool: Shared store-and-forward spool (optional)
+        hub_ring: Assigns devices to IoT Hubs, shared with already running
+            simulators (default: a new one from the configuration)
+        impairment: Shared network impairment script (optional)
+        rollup_aggregator: Shared rollup table sink (optional)
+        scenario_origin: Simulator start that relative scenario window times
+            count from (default: now)
+
+    Returns:
+        List of device simulators (not yet started)
+    """
+    config = config_loader.get_config()
+    if reconnect_coordinator is None:
+        reconnect_coordinator = ReconnectCoordinator.from_config(config)
+    if hub_ring is None:
+        hub_ring = HubRing.from_config(config)
+    device_id_prefix = config["device_id_prefix"]
+
+    device_indices = list(device_indices)
+    logger.info(f"Initializing {len(device_indices)} device simulators...")
+
+    # Compile the scenario (if any) into per-device schedules
+    schedules = load_schedules(
+        config["scenario_file"],
+        [f"{device_id_prefix}-{i+1:03d}" for i in device_indices],
+        scenario_origin or datetime.now(timezone.utc),
+    )
+
+    created = []
+    for i in device_indices:
+        device_id = f"{device_id_prefix}-{i+1:03d}"
+        device_key = config_loader.device_key(i)
+
+        # Build connection string dynamically for this device, on its hub
+        connection_string = (
+            f"HostName={hub_ring.assign(device_id)};"
+            f"DeviceId={device_id};"
+            f"SharedAccessKey={device_key}"
+        )
+
+        # Create telemetry generator for this device, starting at the
+        # configured wear level
+        telemetry_gen = TelemetryGenerator(device_id, schedules.get(device_id))
+        telemetry_gen.fast_forward(config["initial_operational_hours"], config)
+
+        # Create device simulator
+        simulator = DeviceSimulator(
+            device_id=device_id,
+            connection_string=connection_string,
+            config_loader=config_loader,  # Shared config loader
+            telemetry_generator=telemetry_gen,
+            profiler=profiler,
+            reconnect_coordinator=reconnect_coordinator,
+            log_aggregator=log_aggregator,
+            snapshot_aggregator=snapshot_aggregator,
+            telemetry_buffer=telemetry_buffer,
+            spool=spool,
+            impairment=impairment,
+            rollup_aggregator=rollup_aggregator,
+        )
+
+        created.append(simulator)
+
+    return created
+
+
+async def start_simulators(
+    to_start: List[DeviceSimulator],
+    connect_rate: float,
+    max_inflight: int,
+) -> List["asyncio.Task"]:
+    """
+    Connect device simulators concurrently and start their main loops.
+
+    Connection setup is limited by a token bucket (connects per second) and a
+    semaphore (handshakes in flight) to stay within IoT Hub throttling limits.
+    Each device starts sending as soon as its own connection is established.
+
+    Args:
+        to_start: Simulators to start
+        connect_rate: Maximum new connections per second
+        max_inflight: Maximum connection handshakes in progress at once
+
+    Returns:
+        Tasks running each connected simulator's main loop
+    """
+    logger.info(
+        f"Connecting {len(to_start)} devices "
+        f"(max {connect_rate:g} connects/s, {max_inflight} in flight)..."
+    )
+    bucket = TokenBucket(connect_rate)
+    inflight = asyncio.Semaphore(max_inflight)
+    progress = {"connected": 0, "failed": 0, "skipped": 0}
+    all_attempted = asyncio.Event()
+    started = time.monotonic()
+
+    def record(outcome: str) -> None:
+        """Count a startup outcome and flag when every device is done."""
+        progress[outcome] += 1
+        if sum(progress.values()) == len(to_start):
+            all_attempted.set()
+
+    async def connect_and_run(simulator: DeviceSimulator) -> None:
+        """Connect one simulator under the startup limits, then run it."""
+        async with inflight:
+            if simulator.stop_requested:
+                record("skipped")
+                return
+            await bucket.acquire()
+            try:
+                await simulator.connect()
+            except Exception:
+                # connect() already logged the reason
+                record("failed")
+                await simulator.disconnect()
+                return
+        record("connected")
+        await simulator.run()
+
+    if not to_start:
+        all_attempted.set()
+    tasks = [asyncio.create_task(connect_and_run(sim)) for sim in to_start]
+
+    # Report progress until every device has attempted its connection
+    while not all_attempted.is_set():
+        try:
+            await asyncio.wait_for(
+                all_attempted.wait(), timeout=STARTUP_PROGRESS_INTERVAL
+            )
+        except asyncio.TimeoutError:
+            pass
+        else:
+            break
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Startup progress: {progress['connected']}/{len(to_start)} connected, "
+            f"{progress['failed']} failed ({progress['connected'] / elapsed:.1f} connects/s)"
+        )
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Startup complete in {elapsed:.1f}s: {progress['connected']} connected, "
+        f"{progress['failed']} failed"
+    )
+    return tasks
+
+
+async def start_query_api(
+    config: dict, telemetry_buffer: Optional[TelemetryBuffer], port_offset: int = 0
+) -> Optional[LocalHttpServer]:
+    """
+    Start the local query API over the recent-telemetry buffer.
+
+    Args:
+        config: Configuration dictionary
+        telemetry_buffer: Shared buffer (None when the API is disabled)
+        port_offset: Added to QUERY_API_PORT (one port per fleet worker)
+
+    Returns:
+        Running server, or None when the API is disabled or failed to start
+    """
+    if telemetry_buffer is None:
+        return None
+
+    server = LocalHttpServer(
+        config["query_api_host"], config["query_api_port"] + port_offset
+    )
+    telemetry_buffer.add_routes(server)
+    try:
+        await server.start()
+    except OSError as e:
+        logger.error(f"Could not start local query API: {e}")
+        return None
+    return server
+
+
+def create_control_plane(
+    config_loader: ConfigLoader,
+    fleet: List[DeviceSimulator],
+    device_indices: Iterable[int],
+    profiler=NULL_PROFILER,
+    log_aggregator: Optional[TelemetryLogAggregator] = None,
+    snapshot_aggregator: Optional[MachineSnapshotAggregator] = None,
+    telemetry_buffer: Optional[TelemetryBuffer] = None,
+    spool: Optional[TelemetrySpool] = None,
+    hub_ring: Optional[HubRing] = None,
+    impairment: Optional[NetworkImpairment] = None,
+    rollup_aggregator: Optional[RollupAggregator] = None,
+    worker_index: int = 0,
+    num_workers: int = 1,
+    scenario_origin: Optional[datetime] = None,
+) -> ControlPlane:
+    """
+    Create the control plane for the simulators of this process.
+    Devices added at runtime share the process-wide aggregators, buffer, spool,
+    hub ring and reconnect coordinator, and connect under this process's
+    startup limits.
+
+    Args:
+        config_loader: Shared configuration loader instance
+        fleet: Simulators of this process (updated in place)
+        device_indices: Zero-based indices of the initial devices
+        profiler: Stage profiler shared by the simulators
+        log_aggregator: Shared summary logger (LOG_MODE=fast only)
+        snapshot_aggregator: Shared machine snapshot aggregator (optional)
+        telemetry_buffer: Shared recent-telemetry buffer (optional)
+        spool: Shared store-and-forward spool (optional)
+        hub_ring: Shared hub assignment of this process
+        impairment: Shared network impairment script (optional)
+        rollup_aggregator: Shared rollup table sink (optional)
+        worker_index: Index of this fleet worker
+        num_workers: Number of fleet workers sharing the startup limits
+        scenario_origin: Simulator start that relative scenario window times
+            count from, so devices added later share the fleet's timeline
+
+    Returns:
+        ControlPlane instance
+    """
+    config = config_loader.get_config()
+    reconnect_coordinator = fleet[0].reconnect_coordinator if fleet else None
+
+    def create_devices(indices: List[int]) -> List[DeviceSimulator]:
+        return create_simulators(
+            config_loader,
+            indices,
+            profiler,
+            log_aggregator,
+            snapshot_aggregator,
+            telemetry_buffer,
+            reconnect_coordinator,
+            spool,
+            hub_ring,
+            impairment,
+            rollup_aggregator,
+            scenario_origin,
+        )
+
+    def start_devices(to_start: List[DeviceSimulator]):
+        return start_simulators(
+            to_start,
+            connect_rate=config["startup_connect_rate"] / num_workers,
+            max_inflight=max(1, config["startup_max_inflight"] // num_workers),
+        )
+
+    return ControlPlane(
+        config_loader,
+        fleet,
+        device_indices,
+        create_devices,
+        start_devices,
+        worker_index,
+        num_workers,
+        hub_ring,
+    )
+
+
+async def main(profiler=NULL_PROFILER) -> None:
     """
     Main async function to run the simulator.
+
+    Args:
+        profiler: Stage profiler (no-op unless --profile was given)
     """
+    summary_task = None
+    snapshot_task = None
+    query_api = None
+    control_api = None
+    spool_task = None
+    rollup_task = None
+    hub_ring = None
+    impairment = None
     try:
         # Load initial configuration
         config_loader = ConfigLoader(".env")
         config = config_loader.get_config()
 
+        # Relative scenario window times count from this simulator start
+        scenario_origin = datetime.now(timezone.utc)
+
         # Setup logging based on configuration
-        setup_logging(config["log_level"])
-        logger = logging.getLogger(__name__)
+        setup_logging(config["log_level"], config["log_mode"])
 
         # Print startup banner
         print_banner(config)
 
-        # Get configuration values
-        num_devices = config["num_devices"]
-        iothub_hostname = config["iothub_hostname"]
-        device_keys = config["device_keys"]
-        device_id_prefix = config["device_id_prefix"]
+        # Start profiling once logging is configured
+        profiler.start()
 
-        # Create device simulators
-        logger.info(f"Initializing {num_devices} device simulators...")
-
-        for i in range(num_devices):
-            device_id = f"{device_id_prefix}-{i+1:03d}"
-            device_key = device_keys[i]
-            
-            # Build connection string dynamically for this device
-            connection_string = (
-                f"HostName={iothub_hostname};"
-                f"DeviceId={device_id};"
-                f"SharedAccessKey={device_key}"
-            )
+        # Replace per-message log lines with periodic summaries in fast mode
+        log_aggregator = TelemetryLogAggregator.from_config(config)
+        if log_aggregator:
+            summary_task = asyncio.create_task(log_aggregator.run())
 
-            # Create telemetry generator for this device
-            telemetry_gen = TelemetryGenerator(device_id)
+        # Periodically write per-machine snapshots if configured
+        snapshot_aggregator = MachineSnapshotAggregator.from_config(config)
+        if snapshot_aggregator:
+            snapshot_task = asyncio.create_task(snapshot_aggregator.run())
 
-            # Create device simulator
-            simulator = DeviceSimulator(
-                device_id=device_id,
-                connection_string=connection_string,
-                config_loader=config_loader,  # Shared config loader
-                telemetry_generator=telemetry_gen,
-            )
+        # Write per-machine minute/hour/day rollups if configured
+        rollup_aggregator = RollupAggregator.from_config(config)
+        if rollup_aggregator:
+            rollup_task = asyncio.create_task(rollup_aggregator.run())
 
-            simulators.append(simulator)
+        # Serve recently sent telemetry locally if configured
+        telemetry_buffer = TelemetryBuffer.from_config(config)
+        query_api = await start_query_api(config, telemetry_buffer)
 
-        # Start all simulators with staggered startup
-        logger.info("Starting device simulators with staggered startup...")
-        tasks = []
+        # Keep events that cannot be sent on disk if configured
+        spool = TelemetrySpool.from_config(config)
+        if spool and query_api:
+            spool.add_routes(query_api)
 
-        for i, simulator in enumerate(simulators):
-            # Stagger startup by 1.5 seconds per device
-            if i > 0:
-                await asyncio.sleep(1.5)
+        # Shard the fleet across the configured IoT Hubs
+        hub_ring = HubRing.from_config(config)
+        if query_api:
+            hub_ring.add_routes(query_api, simulators)
 
-            # Create task for this simulator
-            task = asyncio.create_task(simulator.run())
-            tasks.append(task)
+        # Put scripted network impairment in front of the clients if configured
+        impairment = NetworkImpairment.from_config(config)
+
+        # Create device simulators
+        simulators.extend(
+            create_simulators(
+                config_loader,
+                range(config["num_devices"]),
+                profiler,
+                log_aggregator,
+                snapshot_aggregator,
+                telemetry_buffer,
+                spool=spool,
+                hub_ring=hub_ring,
+                impairment=impairment,
+                rollup_aggregator=rollup_aggregator,
+                scenario_origin=scenario_origin,
+            )
+        )
+
+        # Accept runtime control requests if configured
+        control_plane = create_control_plane(
+            config_loader,
+            simulators,
+            range(config["num_devices"]),
+            profiler,
+            log_aggregator,
+            snapshot_aggregator,
+            telemetry_buffer,
+            spool,
+            hub_ring,
+            impairment,
+            rollup_aggregator,
+            scenario_origin=scenario_origin,
+        )
+        control_api = await start_control_api(config, control_plane)
+        if spool:
+            spool_task = asyncio.create_task(spool.run(control_plane.devices.get))
+
+        # Connect all simulators concurrently under the startup rate limits
+        tasks = await start_simulators(
+            simulators,
+            connect_rate=config["startup_connect_rate"],
+            max_inflight=config["startup_max_inflight"],
+        )
+        control_plane.track(tasks)
 
-        logger.info(f"All {num_devices} devices started successfully")
         logger.info("Simulation running... (Press Ctrl+C to stop)")
 
-        # Wait for all simulators to complete (or be cancelled)
-        await asyncio.gather(*tasks, return_exceptions=True)
+        # Wait for all simulators (including ones added at runtime) to complete
+        await control_plane.join()
 
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received")
@@ -193,8 +565,65 @@ async def main() -> None:
     finally:
         await shutdown()
 
+        if hub_ring and len(hub_ring.hostnames) > 1:
+            logger.info(f"Hub statistics: {hub_ring.get_statistics(simulators)}")
+
+        if impairment:
+            impairment.close()
+
+        for server in (query_api, control_api):
+            if server:
+                await server.stop()
+
+        for task in (summary_task, snapshot_task, rollup_task, spool_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        # Write profile reports and print the stage summary
+        profiler.stop()
+        profiler.log_summary()
+        stop_logging()
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parse command-line arguments.
+
+    Returns:
+        Parsed arguments namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="IoT screw robot simulator for Azure IoT Hub"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Enable sampling profiler, tracemalloc and per-stage timers",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=str,
+        default="simulator_profile",
+        help="Path prefix for profile reports (default: simulator_profile)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Split the fleet across N worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--uvloop",
+        action="store_true",
+        help="Run worker event loops on uvloop if installed (with --processes)",
+    )
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
+    args = parse_args()
+
     # Check if .env file exists
     import os
     from pathlib import Path
@@ -210,6 +639,21 @@ if __name__ == "__main__":
         print("See README.md for detailed setup instructions")
         sys.exit(1)
 
+    if args.processes < 1:
+        print("ERROR: --processes must be at least 1")
+        sys.exit(1)
+
+    if args.processes > 1:
+        # Multi-process mode: the parent only supervises worker processes
+        from fleet_runner import run_fleet
+
+        run_fleet(
+            args.processes,
+            use_uvloop=args.uvloop,
+            profile_output=args.profile_output if args.profile else None,
+        )
+        sys.exit(0)
+
     # Run the main async function
     try:
         # Create event loop
@@ -220,7 +664,9 @@ if __name__ == "__main__":
         setup_signal_handlers(loop)
 
         # Run the main coroutine
-        loop.run_until_complete(main())
+        loop.run_until_complete(
+            main(create_profiler(args.profile, args.profile_output))
+        )
     except KeyboardInterrupt:
         print("\nSimulation stopped by user")
     finally:
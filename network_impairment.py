@@ -0,0 +1,481 @@
+"""
+Scripted network impairment between the simulated devices and their transport.
+Adds latency distributions and spikes, packet loss (as retransmission delay),
+OperationTimeout and ConnectionDroppedError injection and a shared bandwidth
+cap in front of each device client, and reports throughput and latency per
+scripted phase so send retry and backoff policies can be tuned against numbers.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Phase fields with their defaults (all impairments off)
+PHASE_DEFAULTS: Dict[str, Any] = {
+    "name": None,  # Default: "phase-<n>"
+    "seconds": 60.0,  # Phase length
+    "latency_ms": 0.0,  # Number (constant) or distribution object
+    "spike_rate": 0.0,  # Probability of an extra latency spike per attempt
+    "spike_ms": 1000.0,  # Length of a latency spike
+    "loss_rate": 0.0,  # Probability each transmission of an attempt is lost
+    "retransmit_ms": 200.0,  # First retransmission timeout, doubling per loss
+    "timeout_rate": 0.0,  # Probability an attempt raises OperationTimeout
+    "timeout_seconds": 5.0,  # Wait before an attempt times out
+    "drop_rate": 0.0,  # Probability an attempt drops the connection
+    "bandwidth_kbps": 0.0,  # Uplink shared by all devices (0: unlimited)
+}
+
+# Latency distributions and their parameters (milliseconds)
+LATENCY_DISTRIBUTIONS = {
+    "constant": ("value",),
+    "uniform": ("min", "max"),
+    "normal": ("mean", "std"),
+    "lognormal": ("median", "sigma"),
+    "pareto": ("scale", "alpha"),
+}
+
+# Latency samples kept per phase for percentiles (reservoir sampling beyond)
+LATENCY_RESERVOIR_SIZE = 50_000
+
+
+class ImpairmentPhase:
+    """
+    Impairment settings for one scripted phase.
+    """
+
+    def __init__(self, params: Dict[str, Any], index: int):
+        """
+        Initialize and validate the phase.
+
+        Args:
+            params: Phase fields (see PHASE_DEFAULTS)
+            index: Position in the script, for the default name
+
+        Raises:
+            ValueError: If a field is unknown or out of range
+        """
+        unknown = set(params) - set(PHASE_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown impairment phase fields: {sorted(unknown)}")
+        values = {**PHASE_DEFAULTS, **params}
+
+        self.name = values["name"] or f"phase-{index + 1}"
+        self.seconds = float(values["seconds"])
+        self.spike_rate = float(values["spike_rate"])
+        self.spike_ms = float(values["spike_ms"])
+        self.loss_rate = float(values["loss_rate"])
+        self.retransmit_ms = float(values["retransmit_ms"])
+        self.timeout_rate = float(values["timeout_rate"])
+        self.timeout_seconds = float(values["timeout_seconds"])
+        self.drop_rate = float(values["drop_rate"])
+        self.bandwidth_kbps = float(values["bandwidth_kbps"])
+
+        if self.seconds <= 0:
+            raise ValueError(f"{self.name}: seconds must be positive")
+        for key in ("spike_rate", "timeout_rate", "drop_rate"):
+            if not 0.0 <= getattr(self, key) <= 1.0:
+                raise ValueError(f"{self.name}: {key} must be between 0.0 and 1.0")
+        if not 0.0 <= self.loss_rate < 1.0:
+            raise ValueError(f"{self.name}: loss_rate must be between 0.0 and 1.0")
+        if self.timeout_seconds <= 0 or self.retransmit_ms <= 0:
+            raise ValueError(
+                f"{self.name}: timeout_seconds and retransmit_ms must be positive"
+            )
+        if self.bandwidth_kbps < 0:
+            raise ValueError(f"{self.name}: bandwidth_kbps must be non-negative")
+
+        latency = values["latency_ms"]
+        if isinstance(latency, (int, float)):
+            latency = {"distribution": "constant", "value": latency}
+        distribution = latency.get("distribution", "constant")
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"{self.name}: latency distribution must be one of "
+                f"{list(LATENCY_DISTRIBUTIONS)}, got {distribution!r}"
+            )
+        try:
+            self.latency_params = tuple(
+                float(latency[key]) for key in LATENCY_DISTRIBUTIONS[distribution]
+            )
+        except KeyError as e:
+            raise ValueError(f"{self.name}: {distribution} latency needs {e}") from None
+        self.latency_distribution = distribution
+
+        # Bytes per second; one bucket per phase models the shared uplink
+        self.link = (
+            TokenBucket(self.bandwidth_kbps * 125.0, capacity=1.0)
+            if self.bandwidth_kbps
+            else None
+        )
+
+    def sample_latency_ms(self) -> float:
+        """
+        Draw the added one-way latency for an attempt.
+
+        Returns:
+            Latency in milliseconds (never negative)
+        """
+        a, *rest = self.latency_params
+        distribution = self.latency_distribution
+        if distribution == "constant":
+            latency = a
+        elif distribution == "uniform":
+            latency = random.uniform(a, rest[0])
+        elif distribution == "normal":
+            latency = random.gauss(a, rest[0])
+        elif distribution == "lognormal":
+            latency = a * math.exp(random.gauss(0.0, rest[0]))
+        else:
+            latency = a * random.paretovariate(rest[0])
+
+        if self.spike_rate and random.random() < self.spike_rate:
+            latency += self.spike_ms
+        return max(0.0, latency)
+
+
+class LatencySamples:
+    """
+    Reservoir of latency samples with percentiles.
+    """
+
+    def __init__(self, size: int = LATENCY_RESERVOIR_SIZE):
+        self.size = size
+        self.samples = array("d")
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.size:
+                self.samples[slot] = value
+
+    def percentiles(self) -> Dict[str, float]:
+        """
+        Get p50/p95/p99/max (empty without samples).
+        """
+        if not self.samples:
+            return {}
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {
+            "p50": round(ordered[int(last * 0.50)], 2),
+            "p95": round(ordered[int(last * 0.95)], 2),
+            "p99": round(ordered[int(last * 0.99)], 2),
+            "max": round(ordered[last], 2),
+        }
+
+
+class PhaseStats:
+    """
+    Counters and latencies of one phase run.
+    """
+
+    def __init__(self, phase: ImpairmentPhase, started: float):
+        self.phase = phase
+        self.started = started
+        self.ended: Optional[float] = None
+        self.attempts = 0
+        self.delivered = 0
+        self.lost_packets = 0
+        self.timeouts = 0
+        self.drops = 0
+        self.errors = 0
+        self.attempt_latency = LatencySamples()
+        self.messages_sent = 0
+        self.messages_failed = 0
+        self.message_latency = LatencySamples()
+
+    def summary(self, now: float) -> Dict[str, Any]:
+        """
+        Get the phase report.
+
+        Args:
+            now: Current monotonic time (used while the phase is running)
+
+        Returns:
+            Dictionary with attempt outcomes, throughput and latencies
+        """
+        duration = max((self.ended or now) - self.started, 1e-9)
+        return {
+            "phase": self.phase.name,
+            "seconds": round(duration, 1),
+            "attempts": self.attempts,
+            "delivered": self.delivered,
+            "deliveredPerSecond": round(self.delivered / duration, 1),
+            "injected": {
+                "lostPackets": self.lost_packets,
+                "timeouts": self.timeouts,
+                "drops": self.drops,
+            },
+            "otherErrors": self.errors,
+            "attemptLatencyMs": self.attempt_latency.percentiles(),
+            "messages": {
+                "sent": self.messages_sent,
+                "failed": self.messages_failed,
+                "latencyMs": self.message_latency.percentiles(),
+            },
+        }
+
+
+class NetworkImpairment:
+    """
+    Phase script shared by all device clients of one process.
+
+    Phases run back to back from the first send; the last phase stays in
+    effect unless the script repeats. Attempts and messages are counted in
+    the phase that was active when they started.
+    """
+
+    def __init__(
+        self,
+        phases: List[ImpairmentPhase],
+        repeat: bool = False,
+        report_path: Optional[Path] = None,
+    ):
+        """
+        Initialize the impairment script.
+
+        Args:
+            phases: Phases in order (at least one)
+            repeat: Start over after the last phase
+            report_path: JSON file the report is written to at shutdown
+        """
+        if not phases:
+            raise ValueError("Impairment script needs at least one phase")
+        self.phases = phases
+        self.repeat = repeat
+        self.report_path = report_path
+        self.cycle_seconds = sum(phase.seconds for phase in phases)
+        self.runs: List[PhaseStats] = []
+        self._started: Optional[float] = None
+        self._run_index = -1
+
+    @classmethod
+    def load(
+        cls, path: Path, report_path: Optional[Path] = None
+    ) -> "NetworkImpairment":
+        """
+        Load an impairment script file.
+
+        Args:
+            path: JSON file {"repeat": false, "phases": [{...}, ...]}
+            report_path: JSON file the report is written to at shutdown
+
+        Returns:
+            NetworkImpairment instance
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            script = json.load(f)
+        phases = [
+            ImpairmentPhase(params, index)
+            for index, params in enumerate(script.get("phases", []))
+        ]
+        return cls(phases, bool(script.get("repeat", False)), report_path)
+
+    @classmethod
+    def from_config(
+        cls, config: Dict, worker_index: Optional[int] = None
+    ) -> Optional["NetworkImpairment"]:
+        """
+        Create the impairment layer if the configuration enables it.
+
+        Args:
+            config: Configuration dictionary from ConfigLoader
+            worker_index: Fleet worker index; each worker writes its own report
+
+        Returns:
+            NetworkImpairment, or None when IMPAIRMENT_FILE is not set
+        """
+        if not config["impairment_file"]:
+            return None
+        report_path = None
+        if config["impairment_report_file"]:
+            report_path = Path(config["impairment_report_file"])
+            if worker_index is not None:
+                report_path = report_path.with_name(
+                    f"{report_path.stem}.worker{worker_index + 1}{report_path.suffix}"
+                )
+        return cls.load(Path(config["impairment_file"]), report_path)
+
+    def current(self) -> PhaseStats:
+        """
+        Get the stats of the active phase, starting the next phase when due.
+
+        Returns:
+            PhaseStats of the running phase
+        """
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+
+        elapsed = now - self._started
+        cycle, offset = divmod(elapsed, self.cycle_seconds)
+        if cycle and not self.repeat:
+            index = len(self.phases) - 1
+            run_index = index
+        else:
+            index = 0
+            while offset >= self.phases[index].seconds:
+                offset -= self.phases[index].seconds
+                index += 1
+            run_index = int(cycle) * len(self.phases) + index
+
+        if run_index != self._run_index:
+            if self.runs:
+                previous = self.runs[-1]
+                previous.ended = now
+                summary = json.dumps(previous.summary(now))
+                logger.info(f"Impairment phase done: {summary}")
+            phase = self.phases[index]
+            logger.info(f"Impairment phase '{phase.name}' started")
+            self.runs.append(PhaseStats(phase, now))
+            self._run_index = run_index
+        return self.runs[-1]
+
+    def wrap(self, client: Any) -> "ImpairedClient":
+        """
+        Put the impairment layer in front of a device client.
+
+        Args:
+            client: IoTHubDeviceClient (or compatible)
+
+        Returns:
+            Client whose send_message() goes through the impairment layer
+        """
+        return ImpairedClient(client, self)
+
+    def record_message(self, stats: PhaseStats, sent: bool, seconds: float) -> None:
+        """
+        Record the outcome of a whole send (all retries included).
+
+        Args:
+            stats: Phase that was active when the send started (from current())
+            sent: Whether the message was delivered
+            seconds: Time from the first attempt to the outcome
+        """
+        if sent:
+            stats.messages_sent += 1
+            stats.message_latency.add(seconds * 1000.0)
+        else:
+            stats.messages_failed += 1
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the report of all phase runs so far.
+
+        Returns:
+            Dictionary with one summary per phase run
+        """
+        now = time.monotonic()
+        return {
+            "repeat": self.repeat,
+            "phases": [stats.summary(now) for stats in self.runs],
+        }
+
+    def close(self) -> None:
+        """
+        Log the final report and write it to the report file, if configured.
+        """
+        report = self.report()
+        logger.info(f"Impairment report: {json.dumps(report)}")
+        if self.report_path is not None:
+            with open(self.report_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            logger.info(f"Impairment report written to {self.report_path}")
+
+
+class ImpairedClient:
+    """
+    Device client wrapper applying the active impairment phase to each send.
+    Connection handling is passed through to the wrapped client.
+    """
+
+    def __init__(self, client: Any, impairment: NetworkImpairment):
+        """
+        Initialize the wrapper.
+
+        Args:
+            client: Wrapped device client
+            impairment: Shared impairment script
+        """
+        self._client = client
+        self._impairment = impairment
+
+    @property
+    def connected(self) -> bool:
+        return self._client.connected
+
+    async def connect(self) -> None:
+        await self._client.connect()
+
+    async def disconnect(self) -> None:
+        await self._client.disconnect()
+
+    async def send_message(self, message: Any) -> None:
+        """
+        Send a message through the active impairment phase.
+
+        Args:
+            message: azure.iot.device.Message
+
+        Raises:
+            OperationTimeout: Injected timeout, or too many lost transmissions
+            ConnectionDroppedError: Injected connection drop
+        """
+        # Loaded by the device client already
+        from azure.iot.device.exceptions import ConnectionDroppedError, OperationTimeout
+
+        stats = self._impairment.current()
+        phase = stats.phase
+        stats.attempts += 1
+        started = time.monotonic()
+
+        if phase.drop_rate and random.random() < phase.drop_rate:
+            stats.drops += 1
+            await self._client.disconnect()
+            raise ConnectionDroppedError("Injected connection drop")
+
+        if phase.timeout_rate and random.random() < phase.timeout_rate:
+            stats.timeouts += 1
+            await asyncio.sleep(phase.timeout_seconds)
+            raise OperationTimeout("Injected operation timeout")
+
+        delay = phase.sample_latency_ms() / 1000.0
+
+        # Each lost transmission costs a retransmission timeout (doubling)
+        retransmit = phase.retransmit_ms / 1000.0
+        while phase.loss_rate and random.random() < phase.loss_rate:
+            stats.lost_packets += 1
+            delay += retransmit
+            retransmit *= 2
+            if delay >= phase.timeout_seconds:
+                stats.timeouts += 1
+                await asyncio.sleep(phase.timeout_seconds)
+                raise OperationTimeout("Message lost (retransmissions timed out)")
+
+        if phase.link is not None:
+            # Serialize on the shared uplink
+            await phase.link.acquire(len(message.data))
+        if delay:
+            await asyncio.sleep(delay)
+
+        try:
+            await self._client.send_message(message)
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.delivered += 1
+        stats.attempt_latency.add((time.monotonic() - started) * 1000.0)
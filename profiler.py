@@ -0,0 +1,314 @@
+"""
+Built-in profiling and hot-path instrumentation for the simulators.
+Provides a sampling profiler, tracemalloc snapshots and per-stage wall-clock
+timers that can be switched on for production-sized runs.
+"""
+
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock timings for a single instrumented stage.
+    """
+
+    __slots__ = ("name", "calls", "total", "min", "max")
+
+    def __init__(self, name: str):
+        """
+        Initialize the stage timer.
+
+        Args:
+            name: Stage name shown in the summary table
+        """
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, elapsed: float) -> None:
+        """
+        Record one measured duration.
+
+        Args:
+            elapsed: Duration in seconds
+        """
+        self.calls += 1
+        self.total += elapsed
+        if elapsed < self.min:
+            self.min = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+class _StageSpan:
+    """
+    Context manager timing one pass through a stage.
+    A fresh span per use keeps concurrent coroutines from sharing start times.
+    """
+
+    __slots__ = ("timer", "started")
+
+    def __init__(self, timer: StageTimer):
+        self.timer = timer
+        self.started = 0.0
+
+    def __enter__(self) -> "_StageSpan":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.timer.record(time.perf_counter() - self.started)
+
+
+class _NullProfiler:
+    """
+    Profiler stand-in used when profiling is disabled.
+    Every hook is a no-op returning a shared context manager.
+    """
+
+    enabled = False
+    _null_stage = nullcontext()
+
+    def stage(self, name: str):
+        return self._null_stage
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def snapshot_memory(self, label: str) -> None:
+        pass
+
+    def log_summary(self) -> None:
+        pass
+
+
+# Shared disabled profiler; cheap enough to leave wired into hot paths
+NULL_PROFILER = _NullProfiler()
+
+
+class Profiler:
+    """
+    Collects sampled stacks, memory snapshots and stage timings.
+
+    Stacks are sampled from a background thread and written in collapsed
+    ("folded") format, which flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    enabled = True
+
+    def __init__(
+        self,
+        output_prefix: str = "profile",
+        sample_interval: float = 0.005,
+        tracemalloc_frames: int = 10,
+    ):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_prefix: Path prefix for the generated report files
+            sample_interval: Seconds between stack samples
+            tracemalloc_frames: Number of frames stored per allocation
+        """
+        self.output_prefix = Path(output_prefix)
+        self.sample_interval = sample_interval
+        self.tracemalloc_frames = tracemalloc_frames
+        self.stages: Dict[str, StageTimer] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._snapshots: List[tuple] = []
+        self._stop_event = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._target_thread_id: Optional[int] = None
+
+    def stage(self, name: str) -> _StageSpan:
+        """
+        Get a context manager timing the wrapped block as a named stage.
+
+        Args:
+            name: Stage name (e.g. "generate", "send_message")
+
+        Returns:
+            Context manager measuring the wrapped block
+        """
+        timer = self.stages.get(name)
+        if timer is None:
+            timer = self.stages[name] = StageTimer(name)
+        return _StageSpan(timer)
+
+    def start(self) -> None:
+        """
+        Start stack sampling and memory tracing for the calling thread.
+        """
+        self.started_at = time.perf_counter()
+        self._target_thread_id = threading.get_ident()
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        self.snapshot_memory("start")
+
+        self._stop_event.clear()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name="profiler-sampler", daemon=True
+        )
+        self._sampler.start()
+        logger.info(
+            f"Profiling enabled (sampling every {self.sample_interval * 1000:.1f}ms, "
+            f"output prefix: {self.output_prefix})"
+        )
+
+    def stop(self) -> None:
+        """
+        Stop sampling, take a final memory snapshot and write report files.
+        """
+        if self.started_at is None or self.stopped_at is not None:
+            return
+
+        self._stop_event.set()
+        if self._sampler:
+            self._sampler.join(timeout=1.0)
+
+        self.snapshot_memory("shutdown")
+        tracemalloc.stop()
+        self.stopped_at = time.perf_counter()
+        self._write_reports()
+
+    def snapshot_memory(self, label: str) -> None:
+        """
+        Record a tracemalloc snapshot.
+
+        Args:
+            label: Name of the snapshot shown in the summary
+        """
+        if tracemalloc.is_tracing():
+            self._snapshots.append((label, tracemalloc.take_snapshot()))
+
+    def _sample_loop(self) -> None:
+        """
+        Background loop sampling the profiled thread's Python stack.
+        """
+        own_file = __file__
+        labels: Dict[object, str] = {}  # Code object -> "file.py:function"
+
+        while not self._stop_event.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = (
+                        ""
+                        if code.co_filename == own_file
+                        else f"{Path(code.co_filename).name}:{code.co_name}"
+                    )
+                if label:
+                    stack.append(label)
+                frame = frame.f_back
+
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def _write_reports(self) -> None:
+        """
+        Write the collapsed-stack file and the memory report.
+        """
+        self.output_prefix.parent.mkdir(parents=True, exist_ok=True)
+
+        folded_path = Path(f"{self.output_prefix}.folded")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        memory_path = Path(f"{self.output_prefix}.memory.txt")
+        with open(memory_path, "w", encoding="utf-8") as f:
+            for line in self._memory_report(limit=25):
+                f.write(line + "\n")
+
+        logger.info(f"Flamegraph stacks written to: {folded_path.absolute()}")
+        logger.info(f"Memory report written to: {memory_path.absolute()}")
+
+    def _memory_report(self, limit: int = 10) -> List[str]:
+        """
+        Compare the first and last memory snapshots.
+
+        Args:
+            limit: Maximum number of allocation sites to include
+
+        Returns:
+            Report lines, largest growth first
+        """
+        if len(self._snapshots) < 2:
+            return []
+
+        first_label, first = self._snapshots[0]
+        last_label, last = self._snapshots[-1]
+        lines = [f"Memory growth {first_label} -> {last_label}:"]
+        for stat in last.compare_to(first, "lineno")[:limit]:
+            lines.append(f"  {stat}")
+        return lines
+
+    def log_summary(self) -> None:
+        """
+        Log the per-stage timing table and top memory growth sites.
+        """
+        if self.started_at is None:
+            return
+
+        elapsed = (self.stopped_at or time.perf_counter()) - self.started_at
+        logger.info("=" * 72)
+        logger.info(f"PROFILE SUMMARY ({elapsed:.1f}s wall clock, {self.samples:,} samples)")
+        logger.info("=" * 72)
+        logger.info(
+            f"{'Stage':<16}{'Calls':>10}{'Total s':>11}{'Mean ms':>11}"
+            f"{'Min ms':>11}{'Max ms':>11}"
+        )
+
+        for timer in sorted(self.stages.values(), key=lambda t: -t.total):
+            if not timer.calls:
+                continue
+            logger.info(
+                f"{timer.name:<16}{timer.calls:>10,}{timer.total:>11.3f}"
+                f"{timer.total / timer.calls * 1000:>11.3f}"
+                f"{timer.min * 1000:>11.3f}{timer.max * 1000:>11.3f}"
+            )
+
+        for line in self._memory_report(limit=5):
+            logger.info(line)
+
+
+def create_profiler(enabled: bool, output_prefix: str = "profile"):
+    """
+    Create a profiler, or the shared no-op profiler when disabled.
+
+    Args:
+        enabled: Whether profiling was requested
+        output_prefix: Path prefix for the generated report files
+
+    Returns:
+        Profiler instance or NULL_PROFILER
+    """
+    if not enabled:
+        return NULL_PROFILER
+    return Profiler(output_prefix=output_prefix)
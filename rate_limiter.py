@@ -0,0 +1,54 @@
+"""
+Asyncio rate limiting primitives.
+Used to pace connection setup and other fleet-wide operations.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter for asyncio tasks.
+    Callers that find the bucket empty reserve their token and sleep until it
+    refills, so waiters are released in arrival order at the configured rate.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate: Tokens added per second (<= 0 disables limiting)
+            capacity: Maximum burst size (default: one second worth of tokens)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        """
+        Add the tokens accumulated since the last refill.
+        """
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_refill) * self.rate
+        )
+        self.last_refill = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Take tokens, sleeping until they are available.
+
+        Args:
+            tokens: Number of tokens to take
+        """
+        if self.rate <= 0:
+            return
+        self._refill()
+        # Going negative reserves the tokens for this caller
+        self.tokens -= tokens
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
@@ -0,0 +1,292 @@
+"""
+Fleet-wide reconnect coordination for device simulators.
+Provides decorrelated-jitter backoff, a circuit breaker per IoT Hub hostname
+and a cap on concurrent reconnect attempts to avoid reconnect storms.
+"""
+
+import asyncio
+import random
+import time
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def decorrelated_jitter(previous: float, base: float, cap: float) -> float:
+    """
+    Compute the next backoff delay using decorrelated jitter.
+    Delays grow roughly exponentially but are spread randomly, so clients that
+    failed at the same moment do not retry in lockstep.
+
+    Args:
+        previous: Previous delay in seconds (0 for the first retry)
+        base: Minimum delay in seconds
+        cap: Maximum delay in seconds
+
+    Returns:
+        Next delay in seconds
+    """
+    return min(cap, random.uniform(base, max(base, previous) * 3))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker guarding connection attempts to a single host.
+
+    closed: attempts allowed, consecutive failures are counted
+    open: attempts rejected until the reset timeout elapses
+    half-open: a single probe attempt is allowed to test recovery
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, hostname: str, failure_threshold: int, reset_timeout: float):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            hostname: Host guarded by this breaker (used in log messages)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+        """
+        self.hostname = hostname
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def retry_at(self) -> float:
+        """
+        Get the monotonic time at which an open circuit allows a probe.
+
+        Returns:
+            Monotonic timestamp (0 when the circuit is not open)
+        """
+        if self.state != self.OPEN:
+            return 0.0
+        return self.opened_at + self.reset_timeout
+
+    def allow(self) -> bool:
+        """
+        Check whether a connection attempt may proceed now.
+
+        Returns:
+            True if the attempt is allowed, False if it should wait
+        """
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and time.monotonic() >= self.retry_at():
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit for {self.hostname} half-open, probing connection")
+
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        """
+        Record a successful attempt, closing the circuit.
+        """
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.hostname} closed, connection recovered")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self, probe: bool = False) -> None:
+        """
+        Record a failed attempt, opening the circuit when the threshold is hit.
+
+        Args:
+            probe: Whether the attempt was the half-open probe granted by allow()
+                (only the probe's failure re-opens a half-open circuit)
+        """
+        self.consecutive_failures += 1
+        if probe:
+            self.probe_in_flight = False
+
+        if (probe and self.state == self.HALF_OPEN) or (
+            self.state == self.CLOSED
+            and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(
+                f"Circuit for {self.hostname} opened after "
+                f"{self.consecutive_failures} consecutive failures, "
+                f"pausing reconnects for {self.reset_timeout:.0f}s"
+            )
+
+
+class ReconnectCoordinator:
+    """
+    Coordinates reconnects and send retries across all simulated devices.
+    Shared by every DeviceSimulator in a process.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        max_concurrent: int = 20,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        """
+        Initialize the reconnect coordinator.
+
+        Args:
+            base_delay: Minimum backoff delay in seconds
+            max_delay: Maximum backoff delay in seconds
+            max_concurrent: Maximum reconnect attempts in progress at once
+            failure_threshold: Consecutive failures that open a host's circuit
+            reset_timeout: Seconds an open circuit waits before probing
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_concurrent = max_concurrent
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.reconnects = 0
+        self.reconnect_failures = 0
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ReconnectCoordinator":
+        """
+        Create a coordinator from the loaded configuration.
+
+        Args:
+            config: Configuration dictionary from ConfigLoader
+
+        Returns:
+            Configured ReconnectCoordinator
+        """
+        return cls(
+            base_delay=config["reconnect_base_seconds"],
+            max_delay=config["reconnect_max_seconds"],
+            max_concurrent=config["reconnect_max_concurrent"],
+            failure_threshold=config["circuit_breaker_failure_threshold"],
+            reset_timeout=config["circuit_breaker_reset_seconds"],
+        )
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Semaphore capping concurrent reconnects (created on first use)."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    def breaker(self, hostname: str) -> CircuitBreaker:
+        """
+        Get the circuit breaker for a hostname.
+
+        Args:
+            hostname: IoT Hub hostname
+
+        Returns:
+            CircuitBreaker for the host
+        """
+        breaker = self.breakers.get(hostname)
+        if breaker is None:
+            breaker = self.breakers[hostname] = CircuitBreaker(
+                hostname, self.failure_threshold, self.reset_timeout
+            )
+        return breaker
+
+    def next_delay(self, previous: float) -> float:
+        """
+        Get the next jittered backoff delay.
+
+        Args:
+            previous: Previous delay in seconds (0 for the first retry)
+
+        Returns:
+            Next delay in seconds
+        """
+        return decorrelated_jitter(previous, self.base_delay, self.max_delay)
+
+    async def reconnect(
+        self,
+        hostname: str,
+        device_id: str,
+        connect: Callable[[], Awaitable[None]],
+        should_continue: Callable[[], bool],
+    ) -> bool:
+        """
+        Reconnect a device, retrying with jittered backoff until it succeeds.
+
+        Args:
+            hostname: IoT Hub hostname the device connects to
+            device_id: Device identifier (used in log messages)
+            connect: Coroutine function performing one connection attempt
+            should_continue: Returns False when the device is shutting down
+
+        Returns:
+            True if the device reconnected, False if it stopped first
+        """
+        breaker = self.breaker(hostname)
+        delay = 0.0
+
+        while should_continue():
+            if not breaker.allow():
+                # Wait for the circuit to allow a probe, spread out by jitter
+                wait = max(0.0, breaker.retry_at() - time.monotonic())
+                await asyncio.sleep(wait + random.uniform(0, self.base_delay))
+                continue
+            # allow() only succeeds while half-open by granting this caller the probe
+            probe = breaker.state == breaker.HALF_OPEN
+
+            async with self.semaphore:
+                try:
+                    await connect()
+                except asyncio.CancelledError:
+                    if probe:
+                        breaker.probe_in_flight = False
+                    raise
+                except Exception as e:
+                    breaker.record_failure(probe)
+                    self.reconnect_failures += 1
+                    delay = self.next_delay(delay)
+                    logger.warning(
+                        f"{device_id}: Reconnect failed, retrying in {delay:.1f}s: {e}"
+                    )
+                else:
+                    breaker.record_success()
+                    self.reconnects += 1
+                    logger.info(f"{device_id}: Reconnected to IoT Hub")
+                    return True
+
+            await asyncio.sleep(delay)
+
+        return False
+
+    def get_statistics(self) -> Dict:
+        """
+        Get reconnect statistics.
+
+        Returns:
+            Dictionary containing reconnect counters and circuit states
+        """
+        return {
+            "reconnects": self.reconnects,
+            "reconnectFailures": self.reconnect_failures,
+            "circuits": {
+                hostname: {
+                    "state": breaker.state,
+                    "timesOpened": breaker.times_opened,
+                }
+                for hostname, breaker in self.breakers.items()
+            },
+        }
@@ -0,0 +1,348 @@
+"""
+Device-side reporting policies deciding which messages reach IoT Hub.
+REPORTING_MODE=all sends every screwing event; deadband sends only events that
+matter (report-by-exception) plus periodic heartbeats with counters; window
+sends one summary per device per tumbling window instead of raw cycles.
+"""
+
+import logging
+import math
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReportingPolicy:
+    """
+    Sends every event as-is (REPORTING_MODE=all).
+
+    Policies are fed each generated event and polled once per loop iteration;
+    both return the messages to send now. Parameters are read from the current
+    configuration on every call, so they follow hot reloads.
+    """
+
+    mode = "all"
+
+    def __init__(self, device_id: str):
+        """
+        Initialize the policy.
+
+        Args:
+            device_id: Device identifier
+        """
+        self.device_id = device_id
+        self.events = 0
+        self.messages = 0
+
+    def on_event(
+        self, telemetry: Dict[str, Any], epoch: float, config: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Handle a generated screwing event.
+
+        Args:
+            telemetry: Telemetry event dictionary
+            epoch: Event time as Unix epoch seconds
+            config: Current runtime configuration
+
+        Returns:
+            Messages to send now
+        """
+        self.events += 1
+        self.messages += 1
+        return [telemetry]
+
+    def poll(self, epoch: float, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Emit time-driven messages (heartbeats, window summaries).
+
+        Args:
+            epoch: Current time as Unix epoch seconds
+            config: Current runtime configuration
+
+        Returns:
+            Messages to send now
+        """
+        return []
+
+    def close(self, epoch: float) -> List[Dict[str, Any]]:
+        """
+        Flush pending state when the device stops or the mode changes.
+
+        Args:
+            epoch: Current time as Unix epoch seconds
+
+        Returns:
+            Messages to send before stopping
+        """
+        return []
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get policy counters.
+
+        Returns:
+            Dictionary with mode, events seen and messages produced
+        """
+        return {"mode": self.mode, "events": self.events, "messages": self.messages}
+
+
+class DeadbandPolicy(ReportingPolicy):
+    """
+    Report-by-exception (REPORTING_MODE=deadband).
+
+    NOK cycles, non-zero error codes, BitRotationCounter threshold crossings
+    and the first cycle on a replaced bit are always sent. OK cycles whose
+    torque, angle deviation and cycle time stay within the deadbands of the
+    last reported event are suppressed. Every REPORT_HEARTBEAT_SECONDS the
+    latest event is sent as a heartbeat carrying the cycle and suppression
+    counts for the interval.
+    """
+
+    mode = "deadband"
+
+    def __init__(self, device_id: str):
+        """
+        Initialize the policy.
+
+        Args:
+            device_id: Device identifier
+        """
+        super().__init__(device_id)
+        self.suppressed = 0
+        self.heartbeats = 0
+        self._reported: Optional[Dict[str, Any]] = None
+        self._latest: Optional[Dict[str, Any]] = None
+        self._heartbeat_started: Optional[float] = None
+        self._interval_cycles = 0
+        self._interval_suppressed = 0
+
+    def _must_report(self, telemetry: Dict[str, Any], config: Dict[str, Any]) -> bool:
+        if not telemetry["CycleOK"] or telemetry["ErrorCode"]:
+            return True
+
+        reported = self._reported
+        if reported is None:
+            return True
+
+        # Counter crossed a maintenance threshold since the last event
+        previous = self._latest["BitRotationCounter"]
+        current = telemetry["BitRotationCounter"]
+        for threshold in config["report_bit_rotation_thresholds"]:
+            if previous < threshold <= current:
+                return True
+
+        # Counter reset: the bit was replaced
+        if current < previous:
+            return True
+
+        angle_deviation = telemetry["ActualAngle"] - telemetry["TargetAngle"]
+        reported_deviation = reported["ActualAngle"] - reported["TargetAngle"]
+        return (
+            abs(telemetry["ActualTorque"] - reported["ActualTorque"])
+            > config["report_deadband_torque"]
+            or abs(angle_deviation - reported_deviation)
+            > config["report_deadband_angle"]
+            or abs(telemetry["CycleTime_ms"] - reported["CycleTime_ms"])
+            > config["report_deadband_cycle_time_ms"]
+        )
+
+    def on_event(
+        self, telemetry: Dict[str, Any], epoch: float, config: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        self.events += 1
+        self._interval_cycles += 1
+        if self._heartbeat_started is None:
+            self._heartbeat_started = epoch
+
+        report = self._latest is None or self._must_report(telemetry, config)
+        self._latest = telemetry
+        if not report:
+            self.suppressed += 1
+            self._interval_suppressed += 1
+            return []
+
+        self._reported = telemetry
+        self.messages += 1
+        return [telemetry]
+
+    def poll(self, epoch: float, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if (
+            self._latest is None
+            or epoch - self._heartbeat_started < config["report_heartbeat_seconds"]
+        ):
+            return []
+        return [self._heartbeat(epoch)]
+
+    def close(self, epoch: float) -> List[Dict[str, Any]]:
+        # Final heartbeat so the suppressed tail is accounted for downstream
+        if self._interval_suppressed:
+            return [self._heartbeat(epoch)]
+        return []
+
+    def _heartbeat(self, epoch: float) -> Dict[str, Any]:
+        heartbeat = dict(self._latest)
+        heartbeat["MessageType"] = "heartbeat"
+        heartbeat["CyclesSinceHeartbeat"] = self._interval_cycles
+        heartbeat["SuppressedSinceHeartbeat"] = self._interval_suppressed
+
+        self._heartbeat_started = epoch
+        self._interval_cycles = 0
+        self._interval_suppressed = 0
+        self.heartbeats += 1
+        self.messages += 1
+        logger.debug(
+            "%s: Heartbeat (%d cycles, %d suppressed)",
+            self.device_id,
+            heartbeat["CyclesSinceHeartbeat"],
+            heartbeat["SuppressedSinceHeartbeat"],
+        )
+        return heartbeat
+
+    def get_statistics(self) -> Dict[str, Any]:
+        stats = super().get_statistics()
+        stats["suppressed"] = self.suppressed
+        stats["heartbeats"] = self.heartbeats
+        return stats
+
+
+class WindowSummaryPolicy(ReportingPolicy):
+    """
+    Edge aggregation (REPORTING_MODE=window).
+
+    Cycles are aggregated over tumbling windows of REPORT_WINDOW_SECONDS
+    aligned to the epoch. Each window with cycles produces one summary: count,
+    NOK count, error-code histogram, torque mean/std/min/max, cycle-time
+    percentiles and the last BitRotationCounter.
+    """
+
+    mode = "window"
+
+    def __init__(self, device_id: str):
+        """
+        Initialize the policy.
+
+        Args:
+            device_id: Device identifier
+        """
+        super().__init__(device_id)
+        self.summaries = 0
+        self._window_start: Optional[float] = None
+        self._window_seconds = 0.0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._count = 0
+        self._nok = 0
+        self._error_codes: Dict[int, int] = {}
+        self._torque_sum = 0.0
+        self._torque_sum_squares = 0.0
+        self._torque_min = math.inf
+        self._torque_max = -math.inf
+        self._cycle_times = array("l")
+        self._rotations = 0
+        self._last: Optional[Dict[str, Any]] = None
+
+    def on_event(
+        self, telemetry: Dict[str, Any], epoch: float, config: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        self.events += 1
+        messages = self.poll(epoch, config)
+        if self._window_start is None:
+            self._window_seconds = config["report_window_seconds"]
+            self._window_start = epoch - epoch % self._window_seconds
+
+        torque = telemetry["ActualTorque"]
+        self._count += 1
+        self._nok += not telemetry["CycleOK"]
+        error_code = telemetry["ErrorCode"]
+        self._error_codes[error_code] = self._error_codes.get(error_code, 0) + 1
+        self._torque_sum += torque
+        self._torque_sum_squares += torque * torque
+        self._torque_min = min(self._torque_min, torque)
+        self._torque_max = max(self._torque_max, torque)
+        self._cycle_times.append(telemetry["CycleTime_ms"])
+        self._rotations += telemetry["SpindleRotationCounter"]
+        self._last = telemetry
+        return messages
+
+    def poll(self, epoch: float, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if (
+            self._window_start is None
+            or epoch < self._window_start + self._window_seconds
+        ):
+            return []
+        return [self._summary(self._window_start + self._window_seconds)]
+
+    def close(self, epoch: float) -> List[Dict[str, Any]]:
+        # Partial last window
+        if self._window_start is None:
+            return []
+        return [self._summary(epoch)]
+
+    def _summary(self, window_end: float) -> Dict[str, Any]:
+        """
+        Build the summary of the current window and start the next one.
+        """
+        count = self._count
+        cycle_times = sorted(self._cycle_times)
+
+        def percentile(q: float) -> int:
+            return cycle_times[min(count - 1, int(q * count))]
+
+        mean = self._torque_sum / count
+        variance = max(0.0, self._torque_sum_squares / count - mean * mean)
+        summary = {
+            "MessageType": "summary",
+            "Timestamp": datetime.fromtimestamp(window_end, timezone.utc).isoformat(),
+            "WindowStart": datetime.fromtimestamp(
+                self._window_start, timezone.utc
+            ).isoformat(),
+            "WindowSeconds": round(window_end - self._window_start, 3),
+            "MachineID": self.device_id,
+            "Count": count,
+            "NOKCount": self._nok,
+            "ErrorCodeCounts": {
+                str(code): n for code, n in sorted(self._error_codes.items())
+            },
+            "ActualTorqueMean": round(mean, 3),
+            "ActualTorqueStd": round(math.sqrt(variance), 3),
+            "ActualTorqueMin": self._torque_min,
+            "ActualTorqueMax": self._torque_max,
+            "CycleTime_ms_p50": percentile(0.50),
+            "CycleTime_ms_p95": percentile(0.95),
+            "CycleTime_ms_p99": percentile(0.99),
+            "SpindleRotations": self._rotations,
+            "BitRotationCounter": self._last["BitRotationCounter"],
+        }
+
+        self._window_start = None
+        self._reset()
+        self.summaries += 1
+        self.messages += 1
+        return summary
+
+    def get_statistics(self) -> Dict[str, Any]:
+        stats = super().get_statistics()
+        stats["summaries"] = self.summaries
+        return stats
+
+
+def create_reporting_policy(device_id: str, config: Dict[str, Any]) -> ReportingPolicy:
+    """
+    Create the reporting policy selected by REPORTING_MODE.
+
+    Args:
+        device_id: Device identifier
+        config: Configuration dictionary from ConfigLoader
+
+    Returns:
+        ReportingPolicy instance
+    """
+    if config["reporting_mode"] == "deadband":
+        return DeadbandPolicy(device_id)
+    if config["reporting_mode"] == "window":
+        return WindowSummaryPolicy(device_id)
+    return ReportingPolicy(device_id)
@@ -0,0 +1,637 @@
+"""
+Multi-resolution rollup tables of screwing telemetry.
+Aggregates events per machine per minute, hour and day in the same pass that
+produces them, either from the live simulator or while generating (or
+re-reading) a historical dataset, so reports query small pre-aggregated tables
+instead of raw cycles.
+"""
+
+import csv
+import json
+import logging
+import math
+import os
+import time
+from functools import lru_cache
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Rollup resolutions and their period length in seconds (each divides the next)
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+
+# ErrorCode values of the schema: 0=OK, 1=Torque, 2=Angle, 3=Timeout, 4=Multiple
+ERROR_CODES = range(5)
+
+# Columns of every rollup table
+ROLLUP_FIELDS = (
+    ["PeriodStart", "MachineID", "Count", "NOKCount"]
+    + [f"ErrorCode_{code}" for code in ERROR_CODES]
+    + [
+        "ActualTorqueMean",
+        "ActualTorqueStd",
+        "ActualTorqueMin",
+        "ActualTorqueMax",
+        "CycleTime_ms_Mean",
+        "CycleTime_ms_Std",
+        "CycleTime_ms_Min",
+        "CycleTime_ms_Max",
+        "SpindleRotations",
+        "BitRotationCounter",
+    ]
+)
+
+# Seconds after a period boundary before the live sink closes the period
+FLUSH_GRACE_SECONDS = 1.0
+
+
+def parse_resolutions(value: str) -> List[str]:
+    """
+    Parse a comma-separated list of rollup resolutions.
+
+    Args:
+        value: e.g. "minute,hour,day"
+
+    Returns:
+        Resolutions from finest to coarsest
+
+    Raises:
+        ValueError: If the list is empty or names an unknown resolution
+    """
+    resolutions = {part.strip().lower() for part in value.split(",") if part.strip()}
+    unknown = resolutions - set(RESOLUTIONS)
+    if unknown or not resolutions:
+        raise ValueError(
+            f"Rollup resolutions must be a comma-separated subset of "
+            f"{list(RESOLUTIONS)}, got {value!r}"
+        )
+    return sorted(resolutions, key=RESOLUTIONS.get)
+
+
+@lru_cache(maxsize=1024)
+def period_label(start: float) -> str:
+    """
+    Format a period start as an ISO 8601 UTC timestamp (machines share periods).
+    """
+    return datetime.fromtimestamp(start, timezone.utc).isoformat()
+
+
+class PeriodAggregate:
+    """
+    Aggregates of one machine over one period.
+    Sums and sums of squares make finished periods mergeable into the next
+    coarser period, so events are only added at the finest resolution.
+    """
+
+    __slots__ = (
+        "start",
+        "count",
+        "nok",
+        "errors",
+        "torque_sum",
+        "torque_sum_squares",
+        "torque_min",
+        "torque_max",
+        "cycle_time_sum",
+        "cycle_time_sum_squares",
+        "cycle_time_min",
+        "cycle_time_max",
+        "rotations",
+        "bit_rotation_counter",
+    )
+
+    def __init__(self, start: float):
+        """
+        Initialize an empty period.
+
+        Args:
+            start: Period start as Unix epoch seconds
+        """
+        self.start = start
+        self.count = 0
+        self.nok = 0
+        self.errors = [0] * len(ERROR_CODES)
+        self.torque_sum = 0.0
+        self.torque_sum_squares = 0.0
+        self.torque_min = math.inf
+        self.torque_max = -math.inf
+        self.cycle_time_sum = 0
+        self.cycle_time_sum_squares = 0
+        self.cycle_time_min = math.inf
+        self.cycle_time_max = -math.inf
+        self.rotations = 0
+        self.bit_rotation_counter = 0
+
+    def add(
+        self,
+        torque: float,
+        cycle_time_ms: int,
+        cycle_ok: bool,
+        error_code: int,
+        rotations: int,
+        bit_rotation_counter: int,
+    ) -> None:
+        """
+        Add one screwing cycle.
+
+        Args:
+            torque: Actual torque (Nm)
+            cycle_time_ms: Cycle time in milliseconds
+            cycle_ok: Whether the cycle passed
+            error_code: ErrorCode of the cycle
+            rotations: Spindle rotations in this cycle
+            bit_rotation_counter: Cumulative bit rotations after this cycle
+        """
+        self.count += 1
+        if not cycle_ok:
+            self.nok += 1
+        self.errors[error_code] += 1
+        self.torque_sum += torque
+        self.torque_sum_squares += torque * torque
+        if torque < self.torque_min:
+            self.torque_min = torque
+        if torque > self.torque_max:
+            self.torque_max = torque
+        self.cycle_time_sum += cycle_time_ms
+        self.cycle_time_sum_squares += cycle_time_ms * cycle_time_ms
+        if cycle_time_ms < self.cycle_time_min:
+            self.cycle_time_min = cycle_time_ms
+        if cycle_time_ms > self.cycle_time_max:
+            self.cycle_time_max = cycle_time_ms
+        self.rotations += rotations
+        self.bit_rotation_counter = bit_rotation_counter
+
+    def merge(self, other: "PeriodAggregate") -> None:
+        """
+        Add a finished, later sub-period of this period.
+
+        Args:
+            other: Aggregate of the sub-period
+        """
+        self.count += other.count
+        self.nok += other.nok
+        for code, n in enumerate(other.errors):
+            self.errors[code] += n
+        self.torque_sum += other.torque_sum
+        self.torque_sum_squares += other.torque_sum_squares
+        self.torque_min = min(self.torque_min, other.torque_min)
+        self.torque_max = max(self.torque_max, other.torque_max)
+        self.cycle_time_sum += other.cycle_time_sum
+        self.cycle_time_sum_squares += other.cycle_time_sum_squares
+        self.cycle_time_min = min(self.cycle_time_min, other.cycle_time_min)
+        self.cycle_time_max = max(self.cycle_time_max, other.cycle_time_max)
+        self.rotations += other.rotations
+        self.bit_rotation_counter = other.bit_rotation_counter
+
+    def state(self) -> List[Any]:
+        """
+        Get the aggregate's exact state (for carrying it across restarts).
+
+        Returns:
+            Slot values in __slots__ order
+        """
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_state(cls, state: List[Any]) -> "PeriodAggregate":
+        """
+        Restore an aggregate saved by state().
+
+        Args:
+            state: Slot values in __slots__ order
+
+        Returns:
+            PeriodAggregate
+        """
+        period = cls.__new__(cls)
+        for name, value in zip(cls.__slots__, state):
+            setattr(period, name, value)
+        return period
+
+    def row(self, machine_id: str) -> List[Any]:
+        """
+        Get the period as a rollup row.
+
+        Args:
+            machine_id: Machine identifier
+
+        Returns:
+            Values in ROLLUP_FIELDS order
+        """
+        count = self.count
+        torque_mean = self.torque_sum / count
+        torque_variance = self.torque_sum_squares / count - torque_mean * torque_mean
+        cycle_time_mean = self.cycle_time_sum / count
+        cycle_time_variance = (
+            self.cycle_time_sum_squares / count - cycle_time_mean * cycle_time_mean
+        )
+        return [
+            period_label(self.start),
+            machine_id,
+            count,
+            self.nok,
+            *self.errors,
+            round(torque_mean, 3),
+            round(math.sqrt(max(0.0, torque_variance)), 3),
+            self.torque_min,
+            self.torque_max,
+            round(cycle_time_mean, 1),
+            round(math.sqrt(max(0.0, cycle_time_variance)), 1),
+            self.cycle_time_min,
+            self.cycle_time_max,
+            self.rotations,
+            self.bit_rotation_counter,
+        ]
+
+
+class RollupAggregator:
+    """
+    Writes per-machine rollup tables for several resolutions in one pass.
+
+    Events only update the open period of the finest resolution. When a
+    period ends, its row is written and it is merged into the open period of
+    the next coarser resolution, so hours and days cost one merge per minute
+    instead of one update per event. Events must arrive in time order per
+    machine (as the simulator and generate_historical_data.py produce them).
+    """
+
+    def __init__(
+        self,
+        paths: Dict[str, Union[str, Path]],
+        append: bool = False,
+        state_file: Optional[Union[str, Path]] = None,
+    ):
+        """
+        Initialize the aggregator and open the output tables.
+
+        Args:
+            paths: Rollup CSV per resolution (keys from RESOLUTIONS)
+            append: Append to existing tables instead of replacing them
+            state_file: If set, close() writes only finished periods and saves
+                the open ones here, and they are resumed from it on the next
+                start, so a restart never writes two rows for one period
+        """
+        self.resolutions = sorted(paths, key=RESOLUTIONS.get)
+        self.paths = {resolution: Path(paths[resolution]) for resolution in paths}
+        self._seconds = [RESOLUTIONS[resolution] for resolution in self.resolutions]
+        self.machines: Dict[str, List[Optional[PeriodAggregate]]] = {}
+        self.rows_written = {resolution: 0 for resolution in self.resolutions}
+        self.state_file = Path(state_file) if state_file is not None else None
+        if self.state_file is not None:
+            self._load_state()
+
+        self._files = []
+        self._writers = []
+        for resolution in self.resolutions:
+            path = self.paths[resolution]
+            new = not append or not path.exists() or path.stat().st_size == 0
+            f = open(path, "a" if append else "w", newline="", encoding="utf-8")
+            writer = csv.writer(f)
+            if new:
+                writer.writerow(ROLLUP_FIELDS)
+            self._files.append(f)
+            self._writers.append(writer)
+
+    @classmethod
+    def for_output(
+        cls, output_file: Union[str, Path], resolutions: Iterable[str]
+    ) -> "RollupAggregator":
+        """
+        Create an aggregator writing <stem>_<resolution>.csv next to a dataset.
+
+        Args:
+            output_file: Raw telemetry file the rollups belong to
+            resolutions: Resolutions to write
+
+        Returns:
+            RollupAggregator replacing any existing tables
+        """
+        output_path = Path(output_file)
+        return cls(
+            {
+                resolution: output_path.with_name(
+                    f"{output_path.stem}_{resolution}.csv"
+                )
+                for resolution in resolutions
+            }
+        )
+
+    @classmethod
+    def from_config(
+        cls, config: Dict, worker_index: Optional[int] = None
+    ) -> Optional["RollupAggregator"]:
+        """
+        Create the live rollup sink if the configuration enables it.
+
+        Args:
+            config: Configuration dictionary from ConfigLoader
+            worker_index: Fleet worker index; each worker writes its own tables
+
+        Returns:
+            RollupAggregator appending to ROLLUP_DIR/rollup_<resolution>.csv,
+            or None when ROLLUP_DIR is not set
+        """
+        if not config["rollup_dir"]:
+            return None
+        directory = Path(config["rollup_dir"])
+        directory.mkdir(parents=True, exist_ok=True)
+        suffix = f".worker{worker_index + 1}" if worker_index is not None else ""
+        return cls(
+            {
+                resolution: directory / f"rollup_{resolution}{suffix}.csv"
+                for resolution in config["rollup_resolutions"]
+            },
+            append=True,
+            state_file=directory / f"rollup_state{suffix}.json",
+        )
+
+    def _load_state(self) -> None:
+        """
+        Resume the open periods saved by the previous run's close().
+        """
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable rollup state {self.state_file}: {e}")
+            state = None
+        # Consumed: after a crash the periods are lost rather than resumed twice
+        self.state_file.unlink(missing_ok=True)
+        if state is None:
+            return
+        if state.get("resolutions") != self.resolutions:
+            logger.warning(
+                f"Ignoring rollup state {self.state_file}: saved for resolutions "
+                f"{state.get('resolutions')}, now {self.resolutions}"
+            )
+            return
+        for machine_id, levels in state["machines"].items():
+            self.machines[machine_id] = [
+                PeriodAggregate.from_state(period) if period else None
+                for period in levels
+            ]
+        logger.info(
+            f"Resumed open rollup periods of {len(self.machines)} machines "
+            f"from {self.state_file}"
+        )
+
+    def _save_state(self) -> None:
+        """
+        Save the open periods for the next run (removes the file if none).
+        """
+        machines = {
+            machine_id: [period.state() if period else None for period in levels]
+            for machine_id, levels in self.machines.items()
+            if any(levels)
+        }
+        if not machines:
+            self.state_file.unlink(missing_ok=True)
+            return
+        tmp_path = self.state_file.with_name(self.state_file.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"resolutions": self.resolutions, "machines": machines}, f)
+        os.replace(tmp_path, self.state_file)
+
+    def record(
+        self, telemetry: Dict[str, Any], epoch_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Add a telemetry event as produced by TelemetryGenerator.
+
+        Args:
+            telemetry: Telemetry event dictionary
+            epoch_seconds: Event time (default: parsed from Timestamp)
+        """
+        if epoch_seconds is None:
+            epoch_seconds = datetime.fromisoformat(telemetry["Timestamp"]).timestamp()
+        self.add(
+            telemetry["MachineID"],
+            epoch_seconds,
+            telemetry["ActualTorque"],
+            telemetry["CycleTime_ms"],
+            telemetry["CycleOK"],
+            telemetry["ErrorCode"],
+            telemetry["SpindleRotationCounter"],
+            telemetry["BitRotationCounter"],
+        )
+
+    def add(
+        self,
+        machine_id: str,
+        epoch_seconds: float,
+        torque: float,
+        cycle_time_ms: int,
+        cycle_ok: bool,
+        error_code: int,
+        rotations: int,
+        bit_rotation_counter: int,
+    ) -> None:
+        """
+        Add one screwing cycle from its individual fields.
+
+        Args:
+            machine_id: Machine identifier
+            epoch_seconds: Event time as Unix epoch seconds
+            torque: Actual torque (Nm)
+            cycle_time_ms: Cycle time in milliseconds
+            cycle_ok: Whether the cycle passed
+            error_code: ErrorCode of the cycle
+            rotations: Spindle rotations in this cycle
+            bit_rotation_counter: Cumulative bit rotations after this cycle
+        """
+        levels = self.machines.get(machine_id)
+        if levels is None:
+            levels = self.machines[machine_id] = [None] * len(self._seconds)
+
+        start = epoch_seconds - epoch_seconds % self._seconds[0]
+        period = levels[0]
+        if period is None or period.start != start:
+            if period is not None:
+                self._close(machine_id, levels, 0)
+            period = levels[0] = PeriodAggregate(start)
+        period.add(
+            torque, cycle_time_ms, cycle_ok, error_code, rotations, bit_rotation_counter
+        )
+
+    def _close(
+        self, machine_id: str, levels: List[Optional[PeriodAggregate]], level: int
+    ) -> None:
+        """
+        Write a finished period and merge it into the next coarser period.
+        """
+        period = levels[level]
+        levels[level] = None
+        self._writers[level].writerow(period.row(machine_id))
+        self.rows_written[self.resolutions[level]] += 1
+
+        if level + 1 == len(levels):
+            return
+        parent_start = period.start - period.start % self._seconds[level + 1]
+        parent = levels[level + 1]
+        if parent is not None and parent.start != parent_start:
+            self._close(machine_id, levels, level + 1)
+            parent = None
+        if parent is None:
+            parent = levels[level + 1] = PeriodAggregate(parent_start)
+        parent.merge(period)
+
+    def flush_due(self, now: float = math.inf) -> None:
+        """
+        Write all periods that ended by a point in time, finest first.
+
+        Args:
+            now: Unix epoch seconds (default: close every open period)
+        """
+        for machine_id in sorted(self.machines):
+            levels = self.machines[machine_id]
+            for level, seconds in enumerate(self._seconds):
+                period = levels[level]
+                if period is not None and period.start + seconds <= now:
+                    self._close(machine_id, levels, level)
+        for f in self._files:
+            f.flush()
+
+    def close(self) -> None:
+        """
+        Write the remaining periods and close the tables.
+
+        Without a state file every open period is written, partial or not
+        (the end of a historical dataset). With one, only periods that have
+        ended are written and the open ones are saved for the next run.
+        """
+        if self.state_file is None:
+            self.flush_due()
+        else:
+            self.flush_due(time.time())
+            self._save_state()
+        for f in self._files:
+            f.close()
+
+    def log_summary(self) -> None:
+        """
+        Log the rows written per rollup table.
+        """
+        for resolution in self.resolutions:
+            path = self.paths[resolution]
+            logger.info(
+                f"  - {resolution} rollups: {self.rows_written[resolution]:,} rows, "
+                f"{path.stat().st_size / 1024:.1f} KB ({path})"
+            )
+
+    async def run(self) -> None:
+        """
+        Write each finished period shortly after its end until cancelled.
+        Machines without events in a period write no row for it.
+        """
+        # Only the live sink needs asyncio; keep it off the generator's imports
+        import asyncio
+
+        period = self._seconds[0]
+        try:
+            while True:
+                await asyncio.sleep(
+                    period - time.time() % period + FLUSH_GRACE_SECONDS
+                )
+                self.flush_due(time.time() - FLUSH_GRACE_SECONDS)
+        except asyncio.CancelledError:
+            # Open periods are carried over to the next run, not written
+            self.close()
+            raise
+
+
+def aggregate_csv(
+    input_file: Union[str, Path], resolutions: Iterable[str]
+) -> RollupAggregator:
+    """
+    Build rollup tables in one pass over a historical telemetry CSV.
+    Rows must be in time order per machine (as generate_historical_data.py writes).
+
+    Args:
+        input_file: Telemetry CSV from generate_historical_data.py
+        resolutions: Resolutions to write (<stem>_<resolution>.csv)
+
+    Returns:
+        Aggregator holding the row counts (closed)
+    """
+    aggregator = RollupAggregator.for_output(input_file, resolutions)
+    add = aggregator.add
+    timestamps: Dict[str, float] = {}
+    rows = 0
+
+    with open(input_file, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        col = {name: header.index(name) for name in header}
+        ts, machine_id = col["Timestamp"], col["MachineID"]
+        torque, cycle_time = col["ActualTorque"], col["CycleTime_ms"]
+        cycle_ok, error_code = col["CycleOK"], col["ErrorCode"]
+        spindle, bit_counter = col["SpindleRotationCounter"], col["BitRotationCounter"]
+
+        for row in reader:
+            # All machines share each timestamp in historical files
+            timestamp = row[ts]
+            epoch = timestamps.get(timestamp)
+            if epoch is None:
+                timestamps.clear()
+                epoch = timestamps[timestamp] = datetime.fromisoformat(
+                    timestamp
+                ).timestamp()
+
+            add(
+                row[machine_id],
+                epoch,
+                float(row[torque]),
+                int(row[cycle_time]),
+                row[cycle_ok] == "True",
+                int(row[error_code]),
+                int(row[spindle]),
+                int(row[bit_counter]),
+            )
+            rows += 1
+
+    aggregator.close()
+    logger.info(f"Aggregated {rows:,} events from {len(aggregator.machines)} machines")
+    aggregator.log_summary()
+    return aggregator
+
+
+def main():
+    """Command-line entry point."""
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Build per-machine minute/hour/day rollups from historical "
+        "telemetry"
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="historical_telemetry.csv",
+        help="Telemetry CSV (default: historical_telemetry.csv)",
+    )
+    parser.add_argument(
+        "--resolutions",
+        type=str,
+        default="minute,hour,day",
+        help="Comma-separated resolutions; each is written to "
+        "<input stem>_<resolution>.csv (default: minute,hour,day)",
+    )
+    args = parser.parse_args()
+
+    try:
+        resolutions = parse_resolutions(args.resolutions)
+    except ValueError as e:
+        parser.error(str(e))
+    aggregate_csv(args.input, resolutions)
+
+
+if __name__ == "__main__":
+    main()
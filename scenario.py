@@ -0,0 +1,337 @@
+"""
+Declarative scenario engine for screw robot simulations.
+Compiles a scenario file (anomaly bursts, drift, product mixes and downtime per
+device and time window) into compact per-device schedules with O(1) lookup.
+"""
+
+import json
+import logging
+from array import array
+from datetime import datetime, timedelta, timezone
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Regime fields a scenario window may set, with their defaults
+REGIME_DEFAULTS: Dict[str, Any] = {
+    "anomaly_rate": None,  # None: use ANOMALY_RATE from the configuration
+    "speed_anomaly_share": 0.3,  # Share of anomalies that drop speed
+    "temperature_anomaly_share": 0.4,  # Share of anomalies that spike temperature
+    "vibration_anomaly_share": 0.5,  # Share of anomalies that spike vibration
+    "torque_drift_percent_per_hour": 0.0,  # Torque drift, ramping from window start
+    "products": None,  # None: uniform over the product catalog
+    "downtime": False,  # True: the device produces no events
+}
+
+
+class Regime:
+    """
+    Immutable set of generation parameters active for a time slot.
+    """
+
+    __slots__ = (
+        "anomaly_rate",
+        "speed_anomaly_share",
+        "temperature_anomaly_share",
+        "vibration_anomaly_share",
+        "torque_drift_percent_per_hour",
+        "drift_origin",
+        "products",
+        "product_cum_weights",
+        "downtime",
+    )
+
+    def __init__(self, params: Dict[str, Any], drift_origin: float = 0.0):
+        """
+        Initialize the regime.
+
+        Args:
+            params: Regime fields (see REGIME_DEFAULTS)
+            drift_origin: Epoch seconds at which torque drift starts ramping
+        """
+        self.anomaly_rate = params["anomaly_rate"]
+        self.speed_anomaly_share = params["speed_anomaly_share"]
+        self.temperature_anomaly_share = params["temperature_anomaly_share"]
+        self.vibration_anomaly_share = params["vibration_anomaly_share"]
+        self.torque_drift_percent_per_hour = params["torque_drift_percent_per_hour"]
+        self.drift_origin = drift_origin
+        self.downtime = params["downtime"]
+
+        products = params["products"]
+        if products:
+            # Precompute cumulative weights for random.choices
+            self.products = list(products)
+            cumulative, total = [], 0.0
+            for weight in products.values():
+                total += weight
+                cumulative.append(total)
+            self.product_cum_weights = cumulative
+        else:
+            self.products = None
+            self.product_cum_weights = None
+
+    def torque_factor(self, epoch_seconds: float) -> float:
+        """
+        Get the torque multiplier for drift at a point in time.
+
+        Args:
+            epoch_seconds: Event time as Unix epoch seconds
+
+        Returns:
+            Multiplier applied to the actual torque
+        """
+        if not self.torque_drift_percent_per_hour:
+            return 1.0
+        hours = max(0.0, epoch_seconds - self.drift_origin) / 3600.0
+        return 1.0 + self.torque_drift_percent_per_hour * hours / 100.0
+
+
+# Regime used when no scenario applies (matches the built-in behaviour)
+DEFAULT_REGIME = Regime(REGIME_DEFAULTS)
+
+
+class DeviceSchedule:
+    """
+    Precomputed regime schedule for one device.
+    Slot i covers [origin + i * resolution, origin + (i + 1) * resolution).
+    """
+
+    __slots__ = ("origin", "resolution", "slots", "regimes")
+
+    def __init__(
+        self, origin: float, resolution: float, slots: array, regimes: List[Regime]
+    ):
+        """
+        Initialize the schedule.
+
+        Args:
+            origin: Epoch seconds of the first slot
+            resolution: Slot length in seconds
+            slots: Regime index per slot (array of unsigned shorts)
+            regimes: Regime table shared by the compiled scenario
+        """
+        self.origin = origin
+        self.resolution = resolution
+        self.slots = slots
+        self.regimes = regimes
+
+    def regime_at(self, epoch_seconds: float) -> Regime:
+        """
+        Look up the regime active at a point in time in O(1).
+
+        Args:
+            epoch_seconds: Event time as Unix epoch seconds
+
+        Returns:
+            Active regime (DEFAULT_REGIME outside the scenario horizon)
+        """
+        index = int((epoch_seconds - self.origin) // self.resolution)
+        if 0 <= index < len(self.slots):
+            return self.regimes[self.slots[index]]
+        return DEFAULT_REGIME
+
+
+def _parse_time(value: Union[str, float, int], origin: datetime) -> datetime:
+    """
+    Parse a window boundary.
+
+    Args:
+        value: ISO-8601 timestamp, or hours relative to the scenario origin
+        origin: Scenario origin (simulation start)
+
+    Returns:
+        Timezone-aware datetime
+    """
+    if isinstance(value, (int, float)):
+        return origin + timedelta(hours=value)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class Scenario:
+    """
+    Scenario definition loaded from a JSON file.
+
+    Example:
+        {
+          "resolution_seconds": 60,
+          "windows": [
+            {"devices": ["screw-robot-00[1-3]"], "start": 2, "end": 4,
+             "anomaly_rate": 0.4, "temperature_anomaly_share": 0.9},
+            {"devices": ["*"], "start": "2025-11-18T22:00:00Z",
+             "end": "2025-11-19T06:00:00Z", "downtime": true},
+            {"devices": ["screw-robot-007"], "start": 0, "end": 48,
+             "torque_drift_percent_per_hour": 0.2,
+             "products": {"PROD-A100": 0.8, "PROD-C300": 0.2}}
+          ]
+        }
+
+    Window boundaries are ISO-8601 timestamps or hours relative to the
+    simulation start. Later windows override fields of earlier ones.
+    """
+
+    def __init__(self, windows: List[Dict[str, Any]], resolution_seconds: float = 60.0):
+        """
+        Initialize the scenario.
+
+        Args:
+            windows: Window definitions
+            resolution_seconds: Schedule slot length in seconds
+
+        Raises:
+            ValueError: If a window is invalid
+        """
+        if resolution_seconds <= 0:
+            raise ValueError("Scenario resolution_seconds must be positive")
+        self.resolution_seconds = float(resolution_seconds)
+        self.windows = windows
+
+        for i, window in enumerate(windows):
+            if "start" not in window or "end" not in window:
+                raise ValueError(f"Scenario window {i} needs 'start' and 'end'")
+            unknown = set(window) - set(REGIME_DEFAULTS) - {"devices", "start", "end"}
+            if unknown:
+                raise ValueError(
+                    f"Scenario window {i} has unknown fields: {sorted(unknown)}"
+                )
+            rate = window.get("anomaly_rate")
+            if rate is not None and not 0.0 <= rate <= 1.0:
+                raise ValueError(f"Scenario window {i}: anomaly_rate must be 0.0-1.0")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Scenario":
+        """
+        Load a scenario from a JSON file.
+
+        Args:
+            path: Scenario file path
+
+        Returns:
+            Parsed Scenario
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("windows", []), data.get("resolution_seconds", 60))
+
+    def compile(
+        self, device_ids: Sequence[str], origin: datetime
+    ) -> Dict[str, DeviceSchedule]:
+        """
+        Compile the scenario into per-device schedules.
+        Devices matching the same set of windows share one slot array.
+
+        Args:
+            device_ids: Devices to compile schedules for
+            origin: Simulation start (reference for relative window times)
+
+        Returns:
+            Dictionary of device_id to DeviceSchedule
+        """
+        origin_epoch = origin.timestamp()
+        resolution = self.resolution_seconds
+
+        # Resolve windows to slot ranges
+        spans: List[Tuple[int, int, Dict[str, Any], float]] = []
+        for window in self.windows:
+            start = _parse_time(window["start"], origin).timestamp()
+            end = _parse_time(window["end"], origin).timestamp()
+            first = max(0, int((start - origin_epoch) // resolution))
+            last = max(first, int(-(-(end - origin_epoch) // resolution)))
+            spans.append((first, last, window, start))
+        horizon = max((last for _, last, _, _ in spans), default=0)
+
+        regimes: List[Regime] = [DEFAULT_REGIME]
+        regime_index: Dict[Tuple, int] = {(): 0}
+        shared_slots: Dict[Tuple[int, ...], array] = {}
+        schedules: Dict[str, DeviceSchedule] = {}
+
+        for device_id in device_ids:
+            matching = tuple(
+                i
+                for i, window in enumerate(self.windows)
+                if any(fnmatch(device_id, p) for p in window.get("devices", ["*"]))
+            )
+            slots = shared_slots.get(matching)
+            if slots is None:
+                slots = shared_slots[matching] = self._compile_slots(
+                    [spans[i] for i in matching], horizon, regimes, regime_index
+                )
+            schedules[device_id] = DeviceSchedule(origin_epoch, resolution, slots, regimes)
+
+        logger.info(
+            f"Compiled scenario: {len(self.windows)} windows, {len(regimes)} regimes, "
+            f"{len(shared_slots)} distinct schedules x {horizon:,} slots"
+        )
+        return schedules
+
+    @staticmethod
+    def _compile_slots(
+        spans: List[Tuple[int, int, Dict[str, Any], float]],
+        horizon: int,
+        regimes: List[Regime],
+        regime_index: Dict[Tuple, int],
+    ) -> array:
+        """
+        Build the slot array for one set of matching windows.
+
+        Args:
+            spans: (first slot, end slot, window, start epoch) per matching window
+            horizon: Number of slots in the schedule
+            regimes: Shared regime table (extended in place)
+            regime_index: Regime lookup by active-window key (extended in place)
+
+        Returns:
+            Array of regime indices, one per slot
+        """
+        slots = array("H", bytes(2 * horizon))
+
+        # Slot boundaries where the set of active windows changes
+        boundaries = sorted({0, horizon, *(b for s in spans for b in s[:2])})
+        for begin, end in zip(boundaries, boundaries[1:]):
+            active = tuple(i for i, s in enumerate(spans) if s[0] <= begin < s[1])
+            if not active:
+                continue
+
+            key = tuple(id(spans[i][2]) for i in active)
+            index = regime_index.get(key)
+            if index is None:
+                params = dict(REGIME_DEFAULTS)
+                drift_origin = 0.0
+                for i in active:
+                    window = spans[i][2]
+                    params.update(
+                        {k: v for k, v in window.items() if k in REGIME_DEFAULTS}
+                    )
+                    if "torque_drift_percent_per_hour" in window:
+                        drift_origin = spans[i][3]
+                if len(regimes) >= 65535:
+                    raise ValueError("Scenario produces too many distinct regimes")
+                index = regime_index[key] = len(regimes)
+                regimes.append(Regime(params, drift_origin))
+
+            slots[begin:end] = array("H", [index]) * (end - begin)
+
+        return slots
+
+
+def load_schedules(
+    path: Optional[str], device_ids: Sequence[str], origin: datetime
+) -> Dict[str, DeviceSchedule]:
+    """
+    Load and compile a scenario file, if one is configured.
+
+    Args:
+        path: Scenario file path (empty or None for no scenario)
+        device_ids: Devices to compile schedules for
+        origin: Simulation start
+
+    Returns:
+        Dictionary of device_id to DeviceSchedule (empty without a scenario)
+    """
+    if not path:
+        return {}
+    return Scenario.load(path).compile(device_ids, origin)
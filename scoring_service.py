@@ -0,0 +1,648 @@
+"""
+Incremental predictive-maintenance scoring service.
+Loads the replacement-date model once, keeps the latest ML features per
+machine up to date from a telemetry file (followed like `tail -f`), and
+re-scores only machines with new events in vectorized micro-batches, writing
+ML_PredictedDays and RiskLevel rows as they change instead of once a day.
+"""
+
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Model inputs, in the order of the scoring notebook (FABRIC_ML_PREDICTIVE_LAB.md)
+FEATURE_COLUMNS = [
+    "CumulativeBitRotation",
+    "RotationCount",
+    "Rot_LastHour_Sum",
+    "Rot_LastHour_Avg",
+    "Torque_LastHour_Avg",
+    "Torque_LastHour_Std",
+    "CycleTime_LastHour_Avg",
+    "CycleTime_LastHour_Max",
+    "PassRate_LastHour",
+    "ActualTorque",
+    "ActualAngle",
+    "CycleTime_ms",
+]
+
+# Columns of the ml_predictions table
+PREDICTION_FIELDS = [
+    "PredictionTimestamp",
+    "Timestamp",
+    "MachineID",
+    "CumulativeBitRotation",
+    "RotationCount",
+    "Rot_LastHour_Sum",
+    "PassRate_LastHour",
+    "DaysUntilReplacement",
+    "ML_PredictedDays",
+    "RiskLevel",
+]
+
+# Upper bounds (days) of the CRITICAL, URGENT and WARNING risk levels
+RISK_BINS = (2, 7, 14)
+RISK_LABELS = ("🔴 CRITICAL", "🟠 URGENT", "🟡 WARNING", "🟢 GOOD")
+
+# Default bit lifetime (rotations) behind the rule-based DaysUntilReplacement
+BIT_LIFETIME = 100000
+
+# Event time covered by the *_LastHour features
+FEATURE_WINDOW_SECONDS = 3600.0
+
+# Seconds between progress summaries
+LOG_INTERVAL_SECONDS = 60.0
+
+
+class MachineFeatures:
+    """
+    Latest ML features of one machine, updated in O(1) per event.
+    The one-hour rolling features (pandas rolling("1H") in the notebook) use
+    running sums over a deque of events evicted by event time, and a
+    monotonic deque for the cycle-time maximum.
+    """
+
+    __slots__ = (
+        "machine_id",
+        "timestamp",
+        "epoch",
+        "bit_rotation_counter",
+        "rotation_count",
+        "torque",
+        "angle",
+        "cycle_time_ms",
+        "window",
+        "rotation_sum",
+        "torque_sum",
+        "torque_sum_squares",
+        "cycle_time_sum",
+        "ok_sum",
+        "cycle_time_max",
+    )
+
+    def __init__(self, machine_id: str):
+        """
+        Initialize empty features.
+
+        Args:
+            machine_id: Machine identifier
+        """
+        self.machine_id = machine_id
+        self.timestamp = ""
+        self.epoch = 0.0
+        self.bit_rotation_counter = 0
+        self.rotation_count = 0.0
+        self.torque = 0.0
+        self.angle = 0
+        self.cycle_time_ms = 0
+        self.window: deque = deque()
+        self.rotation_sum = 0.0
+        self.torque_sum = 0.0
+        self.torque_sum_squares = 0.0
+        self.cycle_time_sum = 0
+        self.ok_sum = 0
+        self.cycle_time_max: deque = deque()
+
+    def update(
+        self,
+        timestamp: str,
+        epoch_seconds: float,
+        torque: float,
+        angle: int,
+        cycle_time_ms: int,
+        cycle_ok: bool,
+        bit_rotation_counter: int,
+    ) -> None:
+        """
+        Add one screwing cycle.
+
+        Args:
+            timestamp: Event Timestamp as sent by the device
+            epoch_seconds: Event time as Unix epoch seconds
+            torque: Actual torque (Nm)
+            angle: Actual angle (degrees)
+            cycle_time_ms: Cycle time in milliseconds
+            cycle_ok: Whether the cycle passed
+            bit_rotation_counter: Cumulative bit rotations after this cycle
+        """
+        rotation_count = angle / 360.0
+        ok = 1 if cycle_ok else 0
+
+        self.timestamp = timestamp
+        self.epoch = epoch_seconds
+        self.bit_rotation_counter = bit_rotation_counter
+        self.rotation_count = rotation_count
+        self.torque = torque
+        self.angle = angle
+        self.cycle_time_ms = cycle_time_ms
+
+        self.window.append((epoch_seconds, rotation_count, torque, cycle_time_ms, ok))
+        self.rotation_sum += rotation_count
+        self.torque_sum += torque
+        self.torque_sum_squares += torque * torque
+        self.cycle_time_sum += cycle_time_ms
+        self.ok_sum += ok
+
+        cycle_time_max = self.cycle_time_max
+        while cycle_time_max and cycle_time_max[-1][1] <= cycle_time_ms:
+            cycle_time_max.pop()
+        cycle_time_max.append((epoch_seconds, cycle_time_ms))
+
+        # Slide the window to (t - 1 hour, t]
+        cutoff = epoch_seconds - FEATURE_WINDOW_SECONDS
+        window = self.window
+        while window[0][0] <= cutoff:
+            _, old_rotations, old_torque, old_cycle_time, old_ok = window.popleft()
+            self.rotation_sum -= old_rotations
+            self.torque_sum -= old_torque
+            self.torque_sum_squares -= old_torque * old_torque
+            self.cycle_time_sum -= old_cycle_time
+            self.ok_sum -= old_ok
+        while cycle_time_max[0][0] <= cutoff:
+            cycle_time_max.popleft()
+
+    def features(self) -> List[float]:
+        """
+        Get the model inputs.
+
+        Returns:
+            Values in FEATURE_COLUMNS order
+        """
+        n = len(self.window)
+        torque_mean = self.torque_sum / n
+        # Sample standard deviation, 0 for a single event (as fillna(0))
+        torque_std = 0.0
+        if n > 1:
+            variance = (self.torque_sum_squares - n * torque_mean * torque_mean) / (
+                n - 1
+            )
+            torque_std = max(0.0, variance) ** 0.5
+        return [
+            self.bit_rotation_counter,
+            self.rotation_count,
+            self.rotation_sum,
+            self.rotation_sum / n,
+            torque_mean,
+            torque_std,
+            self.cycle_time_sum / n,
+            self.cycle_time_max[0][1],
+            self.ok_sum / n,
+            self.torque,
+            self.angle,
+            self.cycle_time_ms,
+        ]
+
+
+def days_until_replacement(
+    features: np.ndarray, bit_lifetime: int = BIT_LIFETIME
+) -> np.ndarray:
+    """
+    Rule-based days until bit replacement (the notebook's training target).
+
+    Args:
+        features: Matrix with FEATURE_COLUMNS columns
+        bit_lifetime: Rotations a bit lasts (BIT_LIFETIME_ROTATIONS)
+
+    Returns:
+        Days until replacement at the last hour's rotation rate, 0 to 365
+    """
+    cumulative = features[:, FEATURE_COLUMNS.index("CumulativeBitRotation")]
+    rotations_per_hour = features[:, FEATURE_COLUMNS.index("Rot_LastHour_Sum")]
+    hours = (bit_lifetime - cumulative) / (rotations_per_hour + 0.1)
+    return np.clip(hours / 24, 0, 365)
+
+
+def risk_levels(predicted_days: np.ndarray) -> List[str]:
+    """
+    Map predicted days to RiskLevel labels.
+
+    Args:
+        predicted_days: ML_PredictedDays per machine
+
+    Returns:
+        CRITICAL up to 2 days, URGENT up to 7, WARNING up to 14, else GOOD
+    """
+    bins = np.digitize(predicted_days, RISK_BINS, right=True)
+    return [RISK_LABELS[i] for i in bins]
+
+
+class RuleBasedModel:
+    """
+    Stand-in model predicting the rule-based DaysUntilReplacement.
+    Used when no trained model is given, e.g. before the first AutoML run.
+    """
+
+    def __init__(self, bit_lifetime: int = BIT_LIFETIME):
+        self.bit_lifetime = bit_lifetime
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return days_until_replacement(features, self.bit_lifetime)
+
+
+class DataFrameModel:
+    """
+    Passes features to a model trained on a pandas DataFrame with named columns
+    (AutoML/MLflow models), which rejects or warns about bare arrays. Without
+    pandas installed, the array is passed as is.
+    """
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        try:
+            import pandas as pd
+        except ImportError:
+            model_input = features
+        else:
+            model_input = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+        return np.asarray(self.model.predict(model_input), dtype=float)
+
+
+def load_model(uri: str = "", bit_lifetime: int = BIT_LIFETIME) -> Any:
+    """
+    Load the replacement-date model once.
+
+    Args:
+        uri: MLflow model URI (runs:/... or models:/...), a pickled or joblib
+            sklearn model file, or empty for the rule-based model
+        bit_lifetime: Rotations a bit lasts, for the rule-based model
+
+    Returns:
+        Object with predict(features) taking a FEATURE_COLUMNS matrix
+
+    Raises:
+        ImportError: If mlflow is needed but not installed
+    """
+    if not uri:
+        logger.info("No model given, scoring with the rule-based model")
+        return RuleBasedModel(bit_lifetime)
+
+    if "://" in uri or uri.startswith(("runs:/", "models:/")):
+        try:
+            import mlflow.sklearn
+        except ImportError as e:
+            raise ImportError(
+                f"Loading {uri} requires mlflow (pip install mlflow)"
+            ) from e
+        model = mlflow.sklearn.load_model(uri)
+    else:
+        try:
+            import joblib
+        except ImportError:
+            import pickle
+
+            with open(uri, "rb") as f:
+                model = pickle.load(f)
+        else:
+            model = joblib.load(uri)
+
+    logger.info(f"Model loaded: {uri}")
+    return DataFrameModel(model)
+
+
+class ScoringService:
+    """
+    Latest-feature index per machine with incremental micro-batch scoring.
+    Events mark their machine dirty; score() predicts all dirty machines with
+    one model call and appends their rows to the predictions table.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        output_path: Union[str, Path],
+        latest_path: Optional[Union[str, Path]] = None,
+        bit_lifetime: int = BIT_LIFETIME,
+    ):
+        """
+        Initialize the service.
+
+        Args:
+            model: Model from load_model()
+            output_path: Predictions CSV, appended to per micro-batch
+            latest_path: CSV with the latest prediction per machine, replaced
+                atomically per micro-batch (optional)
+            bit_lifetime: Rotations a bit lasts (for DaysUntilReplacement)
+        """
+        self.model = model
+        self.bit_lifetime = bit_lifetime
+        self.output_path = Path(output_path)
+        self.latest_path = Path(latest_path) if latest_path else None
+        self.machines: Dict[str, MachineFeatures] = {}
+        self.latest: Dict[str, List[Any]] = {}
+        self.dirty: Dict[str, MachineFeatures] = {}
+        self.events = 0
+        self.batches = 0
+        self.machines_scored = 0
+        self.last_batch_seconds = 0.0
+        self.last_lag_seconds = 0.0
+
+        new = not self.output_path.exists() or self.output_path.stat().st_size == 0
+        self._output = open(self.output_path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._output)
+        if new:
+            self._writer.writerow(PREDICTION_FIELDS)
+
+    def update(
+        self, telemetry: Dict[str, Any], epoch_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Add a telemetry event as produced by TelemetryGenerator.
+
+        Args:
+            telemetry: Telemetry event dictionary (CSV strings or JSON values)
+            epoch_seconds: Event time (default: parsed from Timestamp)
+        """
+        timestamp = telemetry["Timestamp"]
+        if epoch_seconds is None:
+            epoch_seconds = datetime.fromisoformat(timestamp).timestamp()
+        machine_id = telemetry["MachineID"]
+        machine = self.machines.get(machine_id)
+        if machine is None:
+            machine = self.machines[machine_id] = MachineFeatures(machine_id)
+
+        cycle_ok = telemetry["CycleOK"]
+        machine.update(
+            timestamp,
+            epoch_seconds,
+            float(telemetry["ActualTorque"]),
+            int(telemetry["ActualAngle"]),
+            int(telemetry["CycleTime_ms"]),
+            cycle_ok == "True" if isinstance(cycle_ok, str) else bool(cycle_ok),
+            int(telemetry["BitRotationCounter"]),
+        )
+        self.dirty[machine_id] = machine
+        self.events += 1
+
+    def score(self) -> int:
+        """
+        Re-score the machines with new events since the last batch.
+
+        Returns:
+            Number of machines scored
+        """
+        if not self.dirty:
+            return 0
+        started = time.perf_counter()
+        machines = list(self.dirty.values())
+        self.dirty = {}
+
+        features = np.array([machine.features() for machine in machines], dtype=float)
+        predicted = np.asarray(self.model.predict(features), dtype=float)
+        rule_based = days_until_replacement(features, self.bit_lifetime)
+        risk = risk_levels(predicted)
+
+        now = datetime.now(timezone.utc)
+        prediction_timestamp = now.isoformat()
+        rows = []
+        for i, machine in enumerate(machines):
+            row = [
+                prediction_timestamp,
+                machine.timestamp,
+                machine.machine_id,
+                machine.bit_rotation_counter,
+                round(machine.rotation_count, 3),
+                round(features[i, 2], 3),
+                round(features[i, 8], 4),
+                round(float(rule_based[i]), 2),
+                round(float(predicted[i]), 2),
+                risk[i],
+            ]
+            rows.append(row)
+            self.latest[machine.machine_id] = row
+        self._writer.writerows(rows)
+        self._output.flush()
+        if self.latest_path is not None:
+            self.write_latest()
+
+        self.batches += 1
+        self.machines_scored += len(machines)
+        self.last_batch_seconds = time.perf_counter() - started
+        self.last_lag_seconds = now.timestamp() - max(m.epoch for m in machines)
+        return len(machines)
+
+    def write_latest(self) -> None:
+        """
+        Write the latest prediction per machine atomically.
+        """
+        tmp_path = self.latest_path.with_name(self.latest_path.name + ".tmp")
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(PREDICTION_FIELDS)
+            writer.writerows(self.latest[m] for m in sorted(self.latest))
+        os.replace(tmp_path, self.latest_path)
+
+    def log_summary(self) -> None:
+        """
+        Log totals and the latency of the last micro-batch.
+        """
+        logger.info(
+            f"Scoring: {self.events:,} events, {len(self.machines)} machines, "
+            f"{self.batches:,} batches, {self.machines_scored:,} machine scores; "
+            f"last batch {self.last_batch_seconds * 1000:.1f} ms, "
+            f"event-to-prediction lag {self.last_lag_seconds:.1f}s"
+        )
+
+    def close(self) -> None:
+        """
+        Score the remaining dirty machines and close the predictions table.
+        """
+        self.score()
+        self._output.close()
+
+
+def read_events(
+    path: Union[str, Path], follow: bool = False, poll_seconds: float = 0.5
+) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Read telemetry events from a file, optionally following appends.
+
+    Accepts generate_historical_data.py CSV or ingest_server.py JSON Lines
+    (raw telemetry only; summaries and heartbeats are skipped). Incomplete
+    last lines are held back until the writer finishes them.
+
+    Args:
+        path: Telemetry CSV or JSON Lines file
+        follow: Keep waiting for appended events at the end of the file
+        poll_seconds: Wait between checks for new data while following
+
+    Returns:
+        Iterator of events; None marks "caught up" (end of the data so far)
+    """
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        header = None
+        if Path(path).suffix.lower() == ".csv":
+            header = next(csv.reader([f.readline()]))
+
+        pending = ""
+        while True:
+            line = f.readline()
+            if not line:
+                yield None
+                if not follow:
+                    return
+                time.sleep(poll_seconds)
+                continue
+            if not line.endswith("\n"):
+                pending += line
+                continue
+            line, pending = pending + line, ""
+            if not line.strip():
+                continue
+
+            if header is not None:
+                yield dict(zip(header, next(csv.reader([line]))))
+                continue
+            message = json.loads(line)
+            body = message.get("body", message)
+            telemetry = json.loads(body) if isinstance(body, str) else body
+            if isinstance(telemetry, dict) and "MessageType" not in telemetry:
+                yield telemetry
+
+
+def run(
+    service: ScoringService,
+    input_file: Union[str, Path],
+    follow: bool = False,
+    batch_seconds: float = 1.0,
+    max_batch: int = 10000,
+) -> None:
+    """
+    Feed a telemetry file into the service, scoring in micro-batches.
+
+    A batch is scored every batch_seconds, when max_batch machines are dirty,
+    and whenever the reader catches up with the file.
+
+    Args:
+        service: Scoring service
+        input_file: Telemetry CSV or JSON Lines file
+        follow: Keep following the file until interrupted
+        batch_seconds: Maximum seconds between micro-batches
+        max_batch: Dirty machines that trigger a batch early
+    """
+    next_batch = time.monotonic() + batch_seconds
+    next_log = time.monotonic() + LOG_INTERVAL_SECONDS
+    epochs: Dict[str, float] = {}
+    for telemetry in read_events(input_file, follow):
+        if telemetry is not None:
+            # Historical files share each timestamp across machines
+            timestamp = telemetry["Timestamp"]
+            epoch = epochs.get(timestamp)
+            if epoch is None:
+                epochs.clear()
+                epoch = epochs[timestamp] = datetime.fromisoformat(
+                    timestamp
+                ).timestamp()
+            service.update(telemetry, epoch)
+            if len(service.dirty) < max_batch and time.monotonic() < next_batch:
+                continue
+
+        service.score()
+        now = time.monotonic()
+        next_batch = now + batch_seconds
+        if now >= next_log:
+            service.log_summary()
+            next_log = now + LOG_INTERVAL_SECONDS
+
+
+def main():
+    """Command-line entry point."""
+    import argparse
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Score bit replacement dates incrementally from telemetry"
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="historical_telemetry.csv",
+        help="Telemetry CSV or ingest_server.py JSON Lines file "
+        "(default: historical_telemetry.csv)",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default="",
+        help="MLflow model URI (runs:/<run>/model, models:/<name>/<version>) or "
+        "pickled sklearn model; default: rule-based DaysUntilReplacement",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="ml_predictions.csv",
+        help="Predictions CSV appended per micro-batch (default: ml_predictions.csv)",
+    )
+    parser.add_argument(
+        "--latest",
+        type=str,
+        default="",
+        help="Also keep a CSV with the latest prediction per machine",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep following the input file for new events (Ctrl+C to stop)",
+    )
+    parser.add_argument(
+        "--batch-seconds",
+        type=float,
+        default=1.0,
+        help="Maximum seconds between micro-batches (default: 1)",
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=10000,
+        help="Dirty machines that trigger a micro-batch early (default: 10000)",
+    )
+    parser.add_argument(
+        "--bit-lifetime",
+        type=int,
+        default=None,
+        help="Rotations a bit lasts (default: BIT_LIFETIME_ROTATIONS from .env, "
+        f"or {BIT_LIFETIME:,} if bit replacements are disabled)",
+    )
+    args = parser.parse_args()
+
+    bit_lifetime = args.bit_lifetime
+    if bit_lifetime is None:
+        from config_loader import ConfigLoader
+
+        config = ConfigLoader(validate_transport=False).get_config()
+        bit_lifetime = config["bit_lifetime_rotations"] or BIT_LIFETIME
+    if bit_lifetime <= 0:
+        parser.error("--bit-lifetime must be positive")
+
+    try:
+        model = load_model(args.model, bit_lifetime)
+    except ImportError as e:
+        logger.error(str(e))
+        return
+
+    service = ScoringService(model, args.output, args.latest, bit_lifetime)
+    try:
+        run(service, args.input, args.follow, args.batch_seconds, args.max_batch)
+    except KeyboardInterrupt:
+        logger.info("Interrupted")
+    finally:
+        service.close()
+        service.log_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""
+Disk-backed store-and-forward spool for telemetry that could not be sent.
+Events go to append-only segment files (fsync batched) and are drained back to
+IoT Hub at a configurable rate once devices are connected again, in per-device
+order and without blocking new events.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+CURSOR_FILE = "cursor.json"
+
+# Lines read per drain batch
+DRAIN_BATCH = 256
+
+# Seconds between drain attempts while no spooled device is connected
+IDLE_DELAY = 1.0
+
+# Position of a record: (segment number, byte offset)
+Position = Tuple[int, int]
+
+
+class TelemetrySpool:
+    """
+    Segmented append-only spool for one process.
+
+    Each record is one line "<device_id>\\t<spooled epoch>\\t<JSON message>".
+    The writer appends to the newest segment and rotates at SPOOL_SEGMENT_MB.
+    The drainer sweeps the sealed segments oldest first; a device whose send
+    fails (or that is not connected) is skipped for the rest of the sweep and
+    retried from its oldest record in the next one. Each device's records are
+    delivered in order, so the drain state is one "delivered up to" position
+    per device, and a segment is deleted once all its records are delivered.
+    While a device has spooled events, its new events are spooled too, so the
+    hub sees each device's events in order. Delivery is at-least-once: events
+    drained after the last cursor sync are sent again after a crash.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_bytes: int = 1024 * 1024 * 1024,
+        fsync_interval_seconds: float = 1.0,
+        drain_rate: float = 200.0,
+    ):
+        """
+        Initialize the spool, resuming any segments left by a previous run.
+
+        Args:
+            directory: Spool directory (created if missing)
+            segment_bytes: Segment size before rotating to a new file
+            max_bytes: Spool size limit; new events are dropped beyond it
+            fsync_interval_seconds: Seconds between flush + fsync of new records
+            drain_rate: Maximum drained messages per second
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self.bucket = TokenBucket(drain_rate)
+
+        self.pending: Dict[str, int] = {}
+        self.pending_total = 0
+        self.size_bytes = 0
+        self.spooled = 0
+        self.drained = 0
+        self.dropped = 0
+        self._drained_window: Deque[Tuple[float, int]] = deque()
+
+        # Segment numbers oldest first, with the undelivered record count and
+        # first undelivered record epoch of each segment
+        self.segments: Deque[int] = deque(
+            sorted(
+                self._segment_number(path)
+                for path in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")
+            )
+        )
+        self._segment_pending: Dict[int, int] = {}
+        self._segment_epochs: Dict[int, float] = {}
+        self._delivered: Dict[str, Position] = self._load_cursor()
+
+        # Drain sweep state
+        self._reader = None
+        self._read_segment: Optional[int] = None
+        self._read_offset = 0
+        self._blocked: Set[str] = set()
+
+        self._writer = None
+        self._writer_number = self.segments[-1] + 1 if self.segments else 1
+        self._scan()
+        self._open_segment(self._writer_number)
+        self._dirty = False
+
+    @classmethod
+    def from_config(
+        cls, config: Dict, worker_index: Optional[int] = None
+    ) -> Optional["TelemetrySpool"]:
+        """
+        Create a spool if the configuration enables it.
+
+        Args:
+            config: Configuration dictionary from ConfigLoader
+            worker_index: Fleet worker index; each worker spools to its own
+                subdirectory
+
+        Returns:
+            TelemetrySpool, or None when SPOOL_DIR is not set
+        """
+        if not config["spool_dir"]:
+            return None
+        directory = Path(config["spool_dir"])
+        if worker_index is not None:
+            directory = directory / f"worker{worker_index + 1}"
+        return cls(
+            directory,
+            segment_bytes=int(config["spool_segment_mb"] * 1024 * 1024),
+            max_bytes=int(config["spool_max_mb"] * 1024 * 1024),
+            fsync_interval_seconds=config["spool_fsync_interval_seconds"],
+            drain_rate=config["spool_drain_rate"],
+        )
+
+    @staticmethod
+    def _segment_number(path: Path) -> int:
+        return int(path.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+
+    def _path(self, number: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+
+    def _load_cursor(self) -> Dict[str, Position]:
+        """
+        Read the per-device drain positions left by a previous run.
+
+        Returns:
+            Dictionary of device ID to the position of its last delivered record
+        """
+        cursor_path = self.directory / CURSOR_FILE
+        if not cursor_path.exists():
+            return {}
+        with open(cursor_path, "r", encoding="utf-8") as f:
+            cursor = json.load(f)
+        return {
+            device_id: tuple(position)
+            for device_id, position in cursor.get("delivered", {}).items()
+        }
+
+    def _scan(self) -> None:
+        """
+        Count undelivered records per device in the segments left on disk and
+        delete segments that were fully drained.
+        """
+        for number in self.segments:
+            path = self._path(number)
+            self._segment_pending[number] = 0
+            offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Torn write at a crash
+                    device_id, epoch, _ = line.split(b"\t", 2)
+                    device_id = device_id.decode("utf-8")
+                    delivered = self._delivered.get(device_id)
+                    if delivered is None or (number, offset) > delivered:
+                        if not self._segment_pending[number]:
+                            self._segment_epochs[number] = float(epoch)
+                        self._segment_pending[number] += 1
+                        self.pending[device_id] = self.pending.get(device_id, 0) + 1
+                        self.pending_total += 1
+                    offset += len(line)
+            self.size_bytes += path.stat().st_size
+        self._delete_drained()
+
+        if self.pending_total:
+            logger.info(
+                f"Spool {self.directory}: resuming {self.pending_total:,} events "
+                f"for {len(self.pending)} devices"
+            )
+
+    def _open_segment(self, number: int) -> None:
+        """
+        Start a new active segment for appends.
+        """
+        self._writer_number = number
+        self._writer = open(self._path(number), "ab")
+        self._writer_bytes = 0
+        self._writer_opened = time.monotonic()
+        self._segment_pending[number] = 0
+        self.segments.append(number)
+
+    def _rotate(self) -> None:
+        """
+        Seal the active segment and open the next one.
+        """
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+        self._writer.close()
+        self._open_segment(self._writer_number + 1)
+
+    def has_pending(self, device_id: str) -> bool:
+        """
+        Check whether a device has spooled events not yet drained.
+
+        Args:
+            device_id: Device identifier
+
+        Returns:
+            True if new events of the device must be spooled to keep order
+        """
+        return device_id in self.pending
+
+    def append(self, device_id: str, message: Dict[str, Any]) -> bool:
+        """
+        Spool a message for later delivery.
+
+        Args:
+            device_id: Device that owns the message
+            message: Telemetry message dictionary
+
+        Returns:
+            True if spooled, False if dropped because the spool is full
+        """
+        if self.size_bytes >= self.max_bytes:
+            self.dropped += 1
+            return False
+
+        epoch = time.time()
+        line = b"%s\t%.3f\t%s\n" % (
+            device_id.encode("utf-8"),
+            epoch,
+            json.dumps(message).encode("utf-8"),
+        )
+        if self._writer_bytes and self._writer_bytes + len(line) > self.segment_bytes:
+            self._rotate()
+        if not self._segment_pending[self._writer_number]:
+            self._segment_epochs[self._writer_number] = epoch
+        self._writer.write(line)
+        self._writer_bytes += len(line)
+        self._dirty = True
+
+        self._segment_pending[self._writer_number] += 1
+        self.pending[device_id] = self.pending.get(device_id, 0) + 1
+        self.pending_total += 1
+        self.size_bytes += len(line)
+        self.spooled += 1
+        return True
+
+    def sync(self) -> None:
+        """
+        Flush and fsync new records and persist the drain positions.
+        """
+        if self._dirty:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            self._dirty = False
+
+        cursor_path = self.directory / CURSOR_FILE
+        tmp_path = cursor_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"delivered": self._delivered}, f)
+        os.replace(tmp_path, cursor_path)
+
+    def close(self) -> None:
+        """
+        Sync and close the spool files.
+        """
+        self.sync()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._writer.close()
+
+    def _next_segment(self) -> Optional[int]:
+        """
+        Find the next segment of the sweep with undelivered records, sealing
+        the active segment once it is old enough to have been synced.
+
+        Returns:
+            Segment number, or None when the sweep reached the end
+        """
+        for number in self.segments:
+            if self._read_segment is not None and number <= self._read_segment:
+                continue
+            if not self._segment_pending[number]:
+                continue
+            if number == self._writer_number:
+                if time.monotonic() - self._writer_opened < self.fsync_interval_seconds:
+                    return None
+                self._rotate()
+            return number
+        return None
+
+    def _read_batch(self) -> List[Tuple[str, bytes, Position]]:
+        """
+        Read the next lines of the sweep, skipping delivered records and
+        devices blocked in this sweep.
+
+        Returns:
+            List of (device_id, JSON payload, position)
+        """
+        if self._reader is None:
+            number = self._next_segment()
+            if number is None:
+                # End of the sweep: the next one starts at the oldest segment
+                self._read_segment = None
+                self._blocked.clear()
+                return []
+            self._reader = open(self._path(number), "rb")
+            self._read_segment = number
+            self._read_offset = 0
+
+        records = []
+        for _ in range(DRAIN_BATCH):
+            line = self._reader.readline()
+            if not line.endswith(b"\n"):
+                # End of the segment (or a torn last record)
+                self._reader.close()
+                self._reader = None
+                break
+            position = (self._read_segment, self._read_offset)
+            self._read_offset += len(line)
+
+            device_id, _, payload = line[:-1].split(b"\t", 2)
+            device_id = device_id.decode("utf-8")
+            delivered = self._delivered.get(device_id)
+            if device_id in self._blocked or (
+                delivered is not None and position <= delivered
+            ):
+                continue
+            records.append((device_id, payload, position))
+        return records
+
+    def _consumed(self, device_id: str, position: Position) -> None:
+        self._delivered[device_id] = position
+        self._segment_pending[position[0]] -= 1
+        self.pending_total -= 1
+        remaining = self.pending[device_id] - 1
+        if remaining:
+            self.pending[device_id] = remaining
+        else:
+            del self.pending[device_id]
+
+    def _delete_drained(self) -> None:
+        """
+        Delete sealed segments whose records were all delivered.
+        """
+        for number in list(self.segments):
+            if (
+                self._segment_pending[number]
+                or number == self._writer_number
+                or (number == self._read_segment and self._reader is not None)
+            ):
+                continue
+            path = self._path(number)
+            self.size_bytes -= path.stat().st_size
+            path.unlink()
+            self.segments.remove(number)
+            del self._segment_pending[number]
+            self._segment_epochs.pop(number, None)
+
+        # Positions before the oldest segment no longer matter
+        oldest = self.segments[0] if self.segments else self._writer_number
+        self._delivered = {
+            device_id: position
+            for device_id, position in self._delivered.items()
+            if position[0] >= oldest
+        }
+
+    async def drain_once(self, lookup: Callable[[str], Any]) -> int:
+        """
+        Drain one batch of spooled records.
+
+        Devices are sent concurrently but each device's records in order. A
+        device that is not connected or fails to send is skipped until the
+        next sweep; records of unknown devices are dropped.
+
+        Args:
+            lookup: Returns the DeviceSimulator for a device ID, or None
+
+        Returns:
+            Number of records sent
+        """
+        records = self._read_batch()
+
+        by_device: Dict[str, List[Tuple[bytes, Position]]] = {}
+        for device_id, payload, position in records:
+            by_device.setdefault(device_id, []).append((payload, position))
+
+        sent = 0
+
+        async def drain_device(
+            device_id: str, items: List[Tuple[bytes, Position]]
+        ) -> None:
+            nonlocal sent
+            simulator = lookup(device_id)
+            for payload, position in items:
+                if simulator is None:
+                    self._consumed(device_id, position)
+                    self.dropped += 1
+                    continue
+                if not simulator.is_connected():
+                    break
+                await self.bucket.acquire()
+                if not await simulator.send_telemetry(json.loads(payload)):
+                    break
+                self._consumed(device_id, position)
+                sent += 1
+            else:
+                return
+            self._blocked.add(device_id)
+
+        await asyncio.gather(
+            *(drain_device(device_id, items) for device_id, items in by_device.items())
+        )
+
+        self._delete_drained()
+        if sent:
+            self.drained += sent
+            self._drained_window.append((time.monotonic(), sent))
+        return sent
+
+    async def run(self, lookup: Callable[[str], Any]) -> None:
+        """
+        Drain and sync until cancelled, then sync and close.
+
+        Args:
+            lookup: Returns the DeviceSimulator for a device ID, or None
+        """
+        next_sync = time.monotonic() + self.fsync_interval_seconds
+        try:
+            while True:
+                sent = 0
+                if any(
+                    simulator is None or simulator.is_connected()
+                    for simulator in map(lookup, list(self.pending))
+                ):
+                    sent = await self.drain_once(lookup)
+
+                if time.monotonic() >= next_sync:
+                    self.sync()
+                    next_sync = time.monotonic() + self.fsync_interval_seconds
+
+                if sent or self._read_segment is not None:
+                    # Mid-sweep: let live sends run between batches
+                    await asyncio.sleep(0)
+                else:
+                    await asyncio.sleep(min(IDLE_DELAY, self.fsync_interval_seconds))
+        except asyncio.CancelledError:
+            self.close()
+            if self.pending_total:
+                logger.info(
+                    f"Spool {self.directory}: {self.pending_total:,} events kept "
+                    "for the next run"
+                )
+            raise
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get spool statistics.
+
+        Returns:
+            Dictionary with size, pending events, oldest age and drain rate
+        """
+        now = time.monotonic()
+        while self._drained_window and self._drained_window[0][0] < now - 60:
+            self._drained_window.popleft()
+
+        # Segments are only deleted once drained, so the first segment with
+        # pending records was started no later than the oldest pending event
+        oldest_epoch = next(
+            (
+                self._segment_epochs[number]
+                for number in self.segments
+                if self._segment_pending[number]
+            ),
+            None,
+        )
+        return {
+            "directory": str(self.directory),
+            "segments": len(self.segments),
+            "sizeBytes": self.size_bytes,
+            "pendingEvents": self.pending_total,
+            "pendingDevices": len(self.pending),
+            "oldestAgeSeconds": (
+                round(time.time() - oldest_epoch, 1)
+                if oldest_epoch is not None
+                else None
+            ),
+            "drainRatePerSecond": round(
+                sum(n for _, n in self._drained_window) / 60.0, 1
+            ),
+            "spooled": self.spooled,
+            "drained": self.drained,
+            "dropped": self.dropped,
+        }
+
+    def add_routes(self, server) -> None:
+        """
+        Register GET /spool (statistics) on a local HTTP server.
+
+        Args:
+            server: LocalHttpServer to register the route on
+        """
+        server.route("GET", r"/spool", lambda params, body: self.get_statistics())
@@ -0,0 +1,261 @@
+"""
+In-process ring buffer of recently sent telemetry.
+Stores a fixed number of events per device in preallocated columns and serves
+last-N events, windowed aggregates and per-device stats over local HTTP.
+"""
+
+import logging
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from local_http import LocalHttpServer
+
+logger = logging.getLogger(__name__)
+
+# Numeric telemetry columns and their array type codes
+NUMERIC_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("ScrewPosition", "b"),
+    ("TargetTorque", "d"),
+    ("ActualTorque", "d"),
+    ("TargetAngle", "q"),
+    ("ActualAngle", "q"),
+    ("PulseCount", "q"),
+    ("CycleOK", "b"),
+    ("CycleTime_ms", "l"),
+    ("SpindleRotationCounter", "l"),
+    ("BitRotationCounter", "q"),
+    ("ErrorCode", "b"),
+)
+
+
+class DeviceRing:
+    """
+    Fixed-size columnar ring buffer for one device.
+    Each column is a preallocated array; no per-event objects are retained.
+    """
+
+    def __init__(self, device_id: str, capacity: int):
+        """
+        Initialize the ring buffer.
+
+        Args:
+            device_id: Device identifier
+            capacity: Number of most recent events kept
+        """
+        self.device_id = device_id
+        self.capacity = capacity
+        self.position = 0
+        self.count = 0
+        self.total = 0
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.columns = {
+            name: array(code, bytes(array(code).itemsize * capacity))
+            for name, code in NUMERIC_COLUMNS
+        }
+        # ProductID is stored as an index into a small per-device string table
+        self.products = array("H", bytes(2 * capacity))
+        self.product_names: List[str] = []
+        self.product_index: Dict[str, int] = {}
+
+    def append(self, telemetry: Dict[str, Any], epoch_seconds: float) -> None:
+        """
+        Store an event, overwriting the oldest one when full.
+
+        Args:
+            telemetry: Telemetry event dictionary
+            epoch_seconds: Event time as Unix epoch seconds
+        """
+        i = self.position
+        self.timestamps[i] = epoch_seconds
+        for name, column in self.columns.items():
+            column[i] = telemetry[name]
+
+        product = telemetry["ProductID"]
+        index = self.product_index.get(product)
+        if index is None:
+            index = self.product_index[product] = len(self.product_names)
+            self.product_names.append(product)
+        self.products[i] = index
+
+        self.position = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.total += 1
+
+    def _slots_newest_first(self, n: int) -> List[int]:
+        n = min(n, self.count)
+        return [(self.position - 1 - k) % self.capacity for k in range(n)]
+
+    def last(self, n: int) -> List[Dict[str, Any]]:
+        """
+        Get the most recent events.
+
+        Args:
+            n: Maximum number of events
+
+        Returns:
+            Events as dictionaries, newest first
+        """
+        events = []
+        for i in self._slots_newest_first(n):
+            event = {
+                "Timestamp": datetime.fromtimestamp(
+                    self.timestamps[i], timezone.utc
+                ).isoformat(),
+                "MachineID": self.device_id,
+                "ProductID": self.product_names[self.products[i]],
+            }
+            for name, column in self.columns.items():
+                event[name] = column[i]
+            event["CycleOK"] = bool(event["CycleOK"])
+            events.append(event)
+        return events
+
+    def window(self, seconds: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Aggregate the buffered events within a time window.
+
+        Args:
+            seconds: Window length in seconds
+            now: Window end as Unix epoch seconds (default: current time)
+
+        Returns:
+            Dictionary with count, NOK rate, averages and rotation sum
+        """
+        cutoff = (time.time() if now is None else now) - seconds
+        timestamps = self.timestamps
+        torque = self.columns["ActualTorque"]
+        cycle_time = self.columns["CycleTime_ms"]
+        cycle_ok = self.columns["CycleOK"]
+        rotations = self.columns["SpindleRotationCounter"]
+
+        count = nok = rotation_sum = cycle_time_sum = 0
+        torque_sum = 0.0
+        for i in self._slots_newest_first(self.count):
+            if timestamps[i] < cutoff:
+                break
+            count += 1
+            nok += not cycle_ok[i]
+            torque_sum += torque[i]
+            cycle_time_sum += cycle_time[i]
+            rotation_sum += rotations[i]
+
+        return {
+            "MachineID": self.device_id,
+            "windowSeconds": seconds,
+            "count": count,
+            "nokRate": round(nok / count, 4) if count else 0.0,
+            "avgTorque": round(torque_sum / count, 3) if count else None,
+            "avgCycleTime_ms": round(cycle_time_sum / count, 1) if count else None,
+            "rotations": rotation_sum,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get buffer statistics for the device.
+
+        Returns:
+            Dictionary with event counts and the latest event summary
+        """
+        stats = {
+            "MachineID": self.device_id,
+            "eventsRecorded": self.total,
+            "eventsBuffered": self.count,
+            "capacity": self.capacity,
+        }
+        if self.count:
+            i = (self.position - 1) % self.capacity
+            stats["lastTimestamp"] = datetime.fromtimestamp(
+                self.timestamps[i], timezone.utc
+            ).isoformat()
+            stats["bitRotationCounter"] = self.columns["BitRotationCounter"][i]
+        return stats
+
+
+class TelemetryBuffer:
+    """
+    Recent-telemetry buffers for all devices in a process.
+    Shared by every DeviceSimulator when QUERY_API_PORT is set.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Initialize the buffer.
+
+        Args:
+            capacity: Events kept per device
+        """
+        self.capacity = capacity
+        self.devices: Dict[str, DeviceRing] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["TelemetryBuffer"]:
+        """
+        Create a buffer if the configuration enables the query API.
+
+        Args:
+            config: Configuration dictionary from ConfigLoader
+
+        Returns:
+            TelemetryBuffer, or None when QUERY_API_PORT is 0
+        """
+        if not config["query_api_port"]:
+            return None
+        return cls(config["telemetry_buffer_size"])
+
+    def record(
+        self, telemetry: Dict[str, Any], epoch_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Store a sent telemetry event.
+
+        Args:
+            telemetry: Telemetry event dictionary
+            epoch_seconds: Event time (default: parsed from Timestamp)
+        """
+        if epoch_seconds is None:
+            epoch_seconds = datetime.fromisoformat(telemetry["Timestamp"]).timestamp()
+        device_id = telemetry["MachineID"]
+        ring = self.devices.get(device_id)
+        if ring is None:
+            ring = self.devices[device_id] = DeviceRing(device_id, self.capacity)
+        ring.append(telemetry, epoch_seconds)
+
+    def add_routes(self, server: LocalHttpServer) -> None:
+        """
+        Register the query endpoints on a local HTTP server.
+
+        GET /devices                       per-device buffer stats
+        GET /devices/{id}/events?n=50      last N events, newest first
+        GET /devices/{id}/window?seconds=300  aggregates over a time window
+        GET /devices/{id}/stats            buffer stats for one device
+
+        Args:
+            server: Server to register the routes on
+        """
+        device = r"/devices/(?P<device_id>[^/]+)"
+        server.route("GET", r"/devices", self._handle_devices)
+        server.route("GET", device + r"/events", self._handle_events)
+        server.route("GET", device + r"/window", self._handle_window)
+        server.route("GET", device + r"/stats", self._handle_stats)
+
+    def _ring(self, device_id: str) -> DeviceRing:
+        ring = self.devices.get(device_id)
+        if ring is None:
+            raise KeyError(f"Unknown device: {device_id}")
+        return ring
+
+    def _handle_devices(self, params: Dict[str, str], body: Any) -> Any:
+        return [self.devices[d].stats() for d in sorted(self.devices)]
+
+    def _handle_events(self, params: Dict[str, str], body: Any) -> Any:
+        return self._ring(params["device_id"]).last(int(params.get("n", 50)))
+
+    def _handle_window(self, params: Dict[str, str], body: Any) -> Any:
+        seconds = float(params.get("seconds", 300))
+        return self._ring(params["device_id"]).window(seconds)
+
+    def _handle_stats(self, params: Dict[str, str], body: Any) -> Any:
+        return self._ring(params["device_id"]).stats()
@@ -7,7 +7,18 @@ import random
 import uuid
 import logging
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from degradation_model import (
+    DEGRADATION_NOISE_HIGH,
+    DEGRADATION_NOISE_LOW,
+    DEGRADATION_RATES,
+    bit_replacements_for_rotations,
+    component_health_after,
+    operations_for_hours,
+    rotations_for_hours,
+)
+from scenario import DEFAULT_REGIME, DeviceSchedule, Regime
 
 logger = logging.getLogger(__name__)
 
@@ -18,17 +29,24 @@ class TelemetryGenerator:
     Maintains operational state and simulates sensor readings.
     """
 
-    def __init__(self, device_id: str):
+    def __init__(self, device_id: str, schedule: Optional[DeviceSchedule] = None):
         """
         Initialize the telemetry generator for a specific device.
 
         Args:
             device_id: Unique identifier for the device
+            schedule: Compiled scenario schedule (None for the built-in behaviour)
         """
         self.device_id = device_id
+        self.schedule = schedule
         self.operational_hours = 0.0  # In-memory counter, resets on restart
         self.total_operations = 0
-        self.bit_rotation_counter = 0  # Total bit rotations for wear tracking
+        self.bit_rotation_counter = 0  # Rotations of the current bit (wear tracking)
+        self.bit_replacements = 0
+        self.bit_lifetime: Optional[int] = None  # Sampled lifetime of the current bit
+        # Rotations of the bit replaced right before the last generated event
+        # (None if that event ran on the same bit as the one before)
+        self.replaced_bit_rotations: Optional[int] = None
         
         # Component health scores (0.0 to 1.0, where 1.0 is perfect health)
         self.component_health = {
@@ -45,19 +63,54 @@ class TelemetryGenerator:
 
         logger.info(f"Telemetry generator initialized for {device_id}")
 
-    def generate_screwing_event(self, config: Dict[str, Any]) -> Dict[str, Any]:
+    def regime_at(self, event_time: datetime) -> Regime:
+        """
+        Get the scenario regime active at a point in time.
+
+        Args:
+            event_time: Event timestamp (timezone-aware)
+
+        Returns:
+            Active Regime (DEFAULT_REGIME without a scenario)
+        """
+        if self.schedule is None:
+            return DEFAULT_REGIME
+        return self.schedule.regime_at(event_time.timestamp())
+
+    def is_down(self, event_time: datetime) -> bool:
+        """
+        Check whether the scenario schedules downtime at a point in time.
+
+        Args:
+            event_time: Event timestamp (timezone-aware)
+
+        Returns:
+            True if the device should produce no events
+        """
+        return self.regime_at(event_time).downtime
+
+    def generate_screwing_event(
+        self, config: Dict[str, Any], event_time: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """
         Generate a complete screwing operation event with telemetry data.
 
         Args:
             config: Current runtime configuration from ConfigLoader
+            event_time: Event timestamp (default: now, in UTC)
 
         Returns:
             Dictionary containing all telemetry data for the event
         """
+        if event_time is None:
+            event_time = datetime.now(timezone.utc)
+        regime = self.regime_at(event_time)
+
         # Extract configuration
         speed_rpm = config["constant_speed_rpm"]
-        anomaly_rate = config["anomaly_rate"]
+        anomaly_rate = regime.anomaly_rate
+        if anomaly_rate is None:
+            anomaly_rate = config["anomaly_rate"]
         temp_threshold = config["temp_anomaly_threshold"]
         vibration_threshold = config["vibration_spike_threshold"]
         speed_variance = config["speed_variance_percent"]
@@ -70,17 +123,25 @@ class TelemetryGenerator:
         duration = self._generate_duration(is_anomaly)
 
         # Generate actual speed (with potential anomaly)
-        actual_speed = self._generate_speed(speed_rpm, is_anomaly, speed_variance)
+        actual_speed = self._generate_speed(
+            speed_rpm, is_anomaly, speed_variance, regime.speed_anomaly_share
+        )
 
         # Calculate rotation count
         rotation_count = int((actual_speed * duration) / 60.0)
 
         # Generate sensor readings
         temperature = self._generate_temperature(
-            is_anomaly, temp_threshold, enable_degradation
+            is_anomaly,
+            temp_threshold,
+            enable_degradation,
+            regime.temperature_anomaly_share,
         )
         vibration = self._generate_vibration(
-            is_anomaly, vibration_threshold, enable_degradation
+            is_anomaly,
+            vibration_threshold,
+            enable_degradation,
+            regime.vibration_anomaly_share,
         )
         power_consumption = self._generate_power_consumption(
             actual_speed, duration, enable_degradation
@@ -93,18 +154,42 @@ class TelemetryGenerator:
         if enable_degradation:
             self._apply_degradation(duration)
 
+        # Replace a worn-out bit; this operation runs on the new one
+        self.replaced_bit_rotations = None
+        if config["bit_lifetime_rotations"] > 0:
+            if self.bit_lifetime is None:
+                self.bit_lifetime = self._sample_bit_lifetime(config)
+            if self.bit_rotation_counter >= self.bit_lifetime:
+                self.replaced_bit_rotations = self.bit_rotation_counter
+                self._replace_bit(config)
+                logger.debug(
+                    "%s: Bit replaced after %d rotations",
+                    self.device_id,
+                    self.replaced_bit_rotations,
+                )
+
         # Update counters
         self.total_operations += 1
         self.bit_rotation_counter += rotation_count
         
         # Generate industrial screw tightening parameters
-        product_id = random.choice(self.product_catalog)
+        if regime.products is None:
+            product_id = random.choice(self.product_catalog)
+        else:
+            product_id = random.choices(
+                regime.products, cum_weights=regime.product_cum_weights
+            )[0]
         screw_position = random.randint(1, 8)  # 8 screw positions on assembly
         
         # Torque calculations (Nm) - target based on speed
         target_torque = round(15.0 + (actual_speed / 1800.0) * 10.0, 2)  # 15-25 Nm range
         torque_variance = 0.15 if is_anomaly else 0.05  # Higher variance for anomalies
-        actual_torque = round(target_torque * random.uniform(1 - torque_variance, 1 + torque_variance), 2)
+        actual_torque = round(
+            target_torque
+            * random.uniform(1 - torque_variance, 1 + torque_variance)
+            * regime.torque_factor(event_time.timestamp()),
+            2,
+        )
         
         # Angle calculations (degrees) - target based on rotations
         target_angle = rotation_count * 360
@@ -138,7 +223,7 @@ class TelemetryGenerator:
 
         # Build telemetry payload with industrial schema
         telemetry = {
-            "Timestamp": datetime.now(timezone.utc).isoformat(),
+            "Timestamp": event_time.isoformat(),
             "MachineID": self.device_id,
             "ProductID": product_id,
             "ScrewPosition": screw_position,
@@ -155,8 +240,11 @@ class TelemetryGenerator:
         }
 
         logger.debug(
-            f"{self.device_id}: Generated event "
-            f"(CycleOK: {cycle_ok}, Torque: {actual_torque}Nm, Time: {cycle_time_ms}ms)"
+            "%s: Generated event (CycleOK: %s, Torque: %sNm, Time: %sms)",
+            self.device_id,
+            cycle_ok,
+            actual_torque,
+            cycle_time_ms,
         )
 
         return telemetry
@@ -186,7 +274,11 @@ class TelemetryGenerator:
             return random.uniform(1.0, 3.0)
 
     def _generate_speed(
-        self, nominal_speed: float, is_anomaly: bool, variance_percent: float
+        self,
+        nominal_speed: float,
+        is_anomaly: bool,
+        variance_percent: float,
+        anomaly_share: float = 0.3,
     ) -> float:
         """
         Generate actual screwing speed with potential anomaly.
@@ -195,11 +287,12 @@ class TelemetryGenerator:
             nominal_speed: Nominal constant speed in RPM
             is_anomaly: Whether this is an anomalous operation
             variance_percent: Percentage variance for speed anomalies
+            anomaly_share: Share of anomalies that affect speed
 
         Returns:
             Actual speed in RPM
         """
-        if is_anomaly and random.random() < 0.3:  # 30% of anomalies affect speed
+        if is_anomaly and random.random() < anomaly_share:
             # Speed drops during anomaly
             variance = random.uniform(0, variance_percent / 100.0)
             return nominal_speed * (1.0 - variance)
@@ -209,7 +302,11 @@ class TelemetryGenerator:
             return nominal_speed * (1.0 + variance)
 
     def _generate_temperature(
-        self, is_anomaly: bool, threshold: float, enable_degradation: bool
+        self,
+        is_anomaly: bool,
+        threshold: float,
+        enable_degradation: bool,
+        anomaly_share: float = 0.4,
     ) -> float:
         """
         Generate temperature reading in Celsius.
@@ -218,6 +315,7 @@ class TelemetryGenerator:
             is_anomaly: Whether this is an anomalous operation
             threshold: Temperature threshold for anomaly
             enable_degradation: Whether degradation affects temperature
+            anomaly_share: Share of anomalies that cause a temperature spike
 
         Returns:
             Temperature in Celsius
@@ -232,13 +330,17 @@ class TelemetryGenerator:
             base_temp += degradation_impact
 
         # Anomaly: temperature spike
-        if is_anomaly and random.random() < 0.4:  # 40% of anomalies cause temp spike
+        if is_anomaly and random.random() < anomaly_share:
             base_temp += random.uniform(threshold - base_temp, 25)
 
         return base_temp
 
     def _generate_vibration(
-        self, is_anomaly: bool, threshold: float, enable_degradation: bool
+        self,
+        is_anomaly: bool,
+        threshold: float,
+        enable_degradation: bool,
+        anomaly_share: float = 0.5,
     ) -> float:
         """
         Generate vibration reading in g-force.
@@ -247,6 +349,7 @@ class TelemetryGenerator:
             is_anomaly: Whether this is an anomalous operation
             threshold: Vibration threshold for anomaly
             enable_degradation: Whether degradation affects vibration
+            anomaly_share: Share of anomalies that cause a vibration spike
 
         Returns:
             Vibration in g-force
@@ -261,7 +364,7 @@ class TelemetryGenerator:
             base_vibration += degradation_impact
 
         # Anomaly: vibration spike
-        if is_anomaly and random.random() < 0.5:  # 50% of anomalies cause vibration
+        if is_anomaly and random.random() < anomaly_share:
             base_vibration += random.uniform(
                 threshold - base_vibration, threshold + 0.5
             )
@@ -297,33 +400,130 @@ class TelemetryGenerator:
 
         return base_power
 
+    def _sample_bit_lifetime(self, config: Dict[str, Any]) -> int:
+        """
+        Sample how many rotations a new bit lasts.
+
+        Args:
+            config: Current runtime configuration from ConfigLoader
+
+        Returns:
+            Lifetime in rotations (normal around BIT_LIFETIME_ROTATIONS)
+        """
+        lifetime = config["bit_lifetime_rotations"]
+        noise = config["bit_lifetime_noise_percent"] / 100.0
+        return max(1, int(random.gauss(lifetime, lifetime * noise)))
+
+    def _replace_bit(self, config: Dict[str, Any]) -> None:
+        """
+        Fit a new bit: reset the rotation counter and sample its lifetime.
+
+        Args:
+            config: Current runtime configuration from ConfigLoader
+        """
+        self.bit_rotation_counter = 0
+        self.bit_replacements += 1
+        self.bit_lifetime = self._sample_bit_lifetime(config)
+
     def _apply_degradation(self, duration: float) -> None:
         """
         Apply component degradation based on operational hours.
-        Different components degrade at different rates.
+        Different components degrade at different rates (see DEGRADATION_RATES).
 
         Args:
             duration: Duration of the operation in seconds
         """
-        # Degradation rates per 1000 hours of operation
-        # Motor degrades fastest, sensors slowest
-        degradation_rates = {
-            "motor": 0.15,  # 15% degradation per 1000 hours
-            "bearing": 0.12,  # 12% degradation per 1000 hours
-            "sensor": 0.05,  # 5% degradation per 1000 hours
-        }
-
-        # Calculate degradation for this operation
-        hours_fraction = duration / 3600.0  # Convert seconds to hours
-        degradation_fraction = hours_fraction / 1000.0  # Per 1000 hours
+        # Fraction of 1000 operational hours covered by this operation
+        degradation_fraction = duration / 3_600_000.0
+        health = self.component_health
 
-        for component, rate in degradation_rates.items():
+        for component, rate in DEGRADATION_RATES:
             # Apply degradation with some randomness
-            degradation = rate * degradation_fraction * random.uniform(0.8, 1.2)
-            self.component_health[component] = max(
-                0.0, self.component_health[component] - degradation
+            degradation = rate * degradation_fraction * random.uniform(
+                DEGRADATION_NOISE_LOW, DEGRADATION_NOISE_HIGH
+            )
+            health[component] = max(0.0, health[component] - degradation)
+
+    def fast_forward(self, hours: float, config: Dict[str, Any]) -> None:
+        """
+        Advance the device by operational hours without simulating each event.
+        Operation count, bit rotations, bit replacements and (if enabled)
+        component health are sampled from the closed-form degradation model
+        in O(1).
+
+        Args:
+            hours: Operational hours to skip
+            config: Current runtime configuration from ConfigLoader
+        """
+        if hours <= 0:
+            return
+
+        anomaly_rate = config["anomaly_rate"]
+        operations = operations_for_hours(hours, anomaly_rate)
+
+        self.operational_hours += hours
+        self.total_operations += operations
+        self.bit_rotation_counter += rotations_for_hours(
+            hours,
+            operations,
+            config["constant_speed_rpm"],
+            anomaly_rate,
+            config["speed_variance_percent"],
+        )
+
+        # Bits worn out while skipping ahead were replaced along the way
+        if config["bit_lifetime_rotations"] > 0:
+            if self.bit_lifetime is None:
+                self.bit_lifetime = self._sample_bit_lifetime(config)
+            if self.bit_rotation_counter >= self.bit_lifetime:
+                # The current bit wears out first; the rest renew from fresh bits
+                # (int() in _sample_bit_lifetime costs half a rotation per bit)
+                lifetime = config["bit_lifetime_rotations"] - 0.5
+                overshoot = self.bit_rotation_counter - self.bit_lifetime
+                renewals = bit_replacements_for_rotations(
+                    overshoot,
+                    lifetime,
+                    lifetime * config["bit_lifetime_noise_percent"] / 100.0,
+                )
+                self._replace_bit(config)
+                self.bit_replacements += renewals
+                self.bit_rotation_counter = min(
+                    max(0, int(overshoot - renewals * lifetime)), self.bit_lifetime - 1
+                )
+
+        if config["enable_degradation"]:
+            self.component_health = component_health_after(
+                hours, operations, anomaly_rate, self.component_health
             )
 
+        logger.info(
+            f"{self.device_id}: Fast-forwarded {hours:,.1f} operational hours "
+            f"({operations:,} operations)"
+        )
+
+    def warm_start(self, state: Dict[str, Any]) -> None:
+        """
+        Restore operational state, e.g. from a previous get_statistics() result.
+
+        Args:
+            state: Dictionary with operationalHours, totalOperations,
+                bitRotationCounter, bitReplacements, bitLifetimeRotations and
+                componentHealth (all optional)
+        """
+        self.operational_hours = float(
+            state.get("operationalHours", self.operational_hours)
+        )
+        self.total_operations = int(state.get("totalOperations", self.total_operations))
+        self.bit_rotation_counter = int(
+            state.get("bitRotationCounter", self.bit_rotation_counter)
+        )
+        self.bit_replacements = int(state.get("bitReplacements", self.bit_replacements))
+        if state.get("bitLifetimeRotations") is not None:
+            self.bit_lifetime = int(state["bitLifetimeRotations"])
+        for component, health in state.get("componentHealth", {}).items():
+            if component in self.component_health:
+                self.component_health[component] = float(health)
+
     def _determine_anomaly_type(
         self,
         duration: float,
@@ -375,5 +575,7 @@ class TelemetryGenerator:
             "operationalHours": round(self.operational_hours, 2),
             "totalOperations": self.total_operations,
             "bitRotationCounter": self.bit_rotation_counter,
+            "bitReplacements": self.bit_replacements,
+            "bitLifetimeRotations": self.bit_lifetime,
             "componentHealth": self.component_health,
         }
@@ -0,0 +1,204 @@
+"""
+Per-device event timelines for historical generation.
+Each device fires on its own jittered, variable-rate clock (like the live
+simulator) within optional shift windows; the lazy per-device timelines are
+merged into one time-ordered stream through a heap, so memory stays
+O(devices) and no final sort is needed.
+"""
+
+import heapq
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# Event timelines accepted by --timeline
+TIMELINES = ("fixed", "jittered")
+
+SECONDS_PER_DAY = 86400
+
+
+def parse_shifts(spec: str) -> List[Tuple[int, int]]:
+    """
+    Parse shift windows.
+
+    Args:
+        spec: Comma-separated HH:MM-HH:MM windows in UTC, e.g.
+            "06:00-14:00,14:00-22:00"; a window may wrap past midnight
+            ("22:00-06:00"). Empty: around the clock
+
+    Returns:
+        Sorted (start, end) seconds-of-day intervals with end > start
+
+    Raises:
+        ValueError: If a window is malformed or empty
+    """
+    shifts = []
+    for window in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            start, end = (_parse_clock(value) for value in window.split("-"))
+        except ValueError:
+            raise ValueError(f"Invalid shift window (expected HH:MM-HH:MM): {window}")
+        if start == end:
+            raise ValueError(f"Empty shift window: {window}")
+        if start < end:
+            shifts.append((start, end))
+        else:
+            shifts.append((start, SECONDS_PER_DAY))
+            if end:
+                shifts.append((0, end))
+    return sorted(shifts)
+
+
+def _parse_clock(value: str) -> int:
+    hours, minutes = value.strip().split(":")
+    seconds = int(hours) * 3600 + int(minutes) * 60
+    if not 0 <= seconds <= SECONDS_PER_DAY or not 0 <= int(minutes) < 60:
+        raise ValueError(value)
+    return seconds
+
+
+def next_shift_time(epoch: float, shifts: Sequence[Tuple[int, int]]) -> float:
+    """
+    Get the first point in time at or after epoch that lies within a shift.
+
+    Args:
+        epoch: Unix epoch seconds
+        shifts: Windows from parse_shifts() (empty: around the clock)
+
+    Returns:
+        epoch itself if it is within a shift, else the start of the next shift
+    """
+    if not shifts:
+        return epoch
+    day = epoch - epoch % SECONDS_PER_DAY
+    offset = epoch - day
+    for start, end in shifts:
+        if offset < end:
+            return day + start if offset < start else epoch
+    return day + SECONDS_PER_DAY + shifts[0][0]
+
+
+def device_timeline(
+    start: float,
+    end: float,
+    interval_seconds: float,
+    jitter_seconds: float,
+    rate_factor: float = 1.0,
+    shifts: Sequence[Tuple[int, int]] = (),
+) -> Iterator[float]:
+    """
+    Lazily generate one device's event times.
+
+    The first event falls at a random phase within one interval of start;
+    each gap is interval_seconds * rate_factor ± jitter_seconds (at least
+    1 second, as in the live simulator). Time outside the shifts is skipped.
+
+    Args:
+        start: First possible event time (epoch seconds)
+        end: Last possible event time (epoch seconds, inclusive)
+        interval_seconds: Base interval between events
+        jitter_seconds: Maximum uniform jitter per interval
+        rate_factor: Device-specific interval multiplier
+        shifts: Windows from parse_shifts() (empty: around the clock)
+
+    Yields:
+        Event times as epoch seconds, increasing
+    """
+    interval = interval_seconds * rate_factor
+    t = next_shift_time(start + random.uniform(0, interval), shifts)
+    while t <= end:
+        yield t
+        t = next_shift_time(
+            t + max(1, interval + random.uniform(-jitter_seconds, jitter_seconds)),
+            shifts,
+        )
+
+
+def _tagged(timeline: Iterator[float], device_id: str) -> Iterator[Tuple[float, str]]:
+    for epoch in timeline:
+        yield epoch, device_id
+
+
+def fixed_events(
+    device_ids: Sequence[str],
+    start_time: datetime,
+    end_time: datetime,
+    interval_minutes: int,
+    shifts: Sequence[Tuple[int, int]] = (),
+) -> Iterator[Tuple[datetime, str]]:
+    """
+    Fire every device on the same fixed tick.
+
+    Args:
+        device_ids: Devices in the order they fire at each tick
+        start_time: First tick
+        end_time: Last possible tick (inclusive)
+        interval_minutes: Minutes between ticks
+        shifts: Windows from parse_shifts(); ticks outside them are skipped
+
+    Yields:
+        (event time, device ID) in time order
+    """
+    current_time = start_time
+    step = timedelta(minutes=interval_minutes)
+    while current_time <= end_time:
+        epoch = current_time.timestamp()
+        if next_shift_time(epoch, shifts) == epoch:
+            for device_id in device_ids:
+                yield current_time, device_id
+        current_time += step
+
+
+def jittered_events(
+    device_ids: Sequence[str],
+    start_time: datetime,
+    end_time: datetime,
+    interval_seconds: float,
+    jitter_seconds: float,
+    rate_spread_percent: float = 0.0,
+    shifts: Sequence[Tuple[int, int]] = (),
+) -> Iterator[Tuple[datetime, str]]:
+    """
+    Merge independent per-device timelines into one time-ordered stream.
+
+    Args:
+        device_ids: Devices to simulate
+        start_time: Start of the period
+        end_time: End of the period (inclusive)
+        interval_seconds: Base interval between a device's events
+        jitter_seconds: Maximum uniform jitter per interval
+        rate_spread_percent: Each device's interval is scaled by a factor
+            drawn uniformly from 1 ± rate_spread_percent / 100
+        shifts: Windows from parse_shifts() (empty: around the clock)
+
+    Yields:
+        (event time, device ID) in time order
+    """
+    start, end = start_time.timestamp(), end_time.timestamp()
+    spread = rate_spread_percent / 100.0
+    timelines = []
+    for device_id in device_ids:
+        rate_factor = random.uniform(1 - spread, 1 + spread)
+        timeline = device_timeline(
+            start, end, interval_seconds, jitter_seconds, rate_factor, shifts
+        )
+        timelines.append(_tagged(timeline, device_id))
+
+    # One pending event per device on the heap
+    for epoch, device_id in heapq.merge(*timelines):
+        yield datetime.fromtimestamp(epoch, timezone.utc), device_id
+
+
+def shift_fraction(shifts: Optional[Sequence[Tuple[int, int]]]) -> float:
+    """
+    Get the share of the day covered by shifts.
+
+    Args:
+        shifts: Windows from parse_shifts() (empty: around the clock)
+
+    Returns:
+        Fraction between 0 and 1
+    """
+    if not shifts:
+        return 1.0
+    return sum(end - start for start, end in shifts) / SECONDS_PER_DAY